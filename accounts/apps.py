@@ -5,5 +5,11 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
 
-
-
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+        from .authentication import invalidate_user_cache
+
+        user_model = get_user_model()
+        post_save.connect(invalidate_user_cache, sender=user_model, dispatch_uid='accounts_invalidate_user_cache_save')
+        post_delete.connect(invalidate_user_cache, sender=user_model, dispatch_uid='accounts_invalidate_user_cache_delete')
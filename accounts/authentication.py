@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from reports.memory_cache import LRUCache
+
+REVOKE_HASH_KEY = '_revoke_hash'
+
+cached_users = LRUCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_LOCAL_TTL
+)
+
+
+def _user_cache_key(user_id):
+    return f'auth_user_{user_id}'
+
+
+def _user_fields():
+    return [field.attname for field in get_user_model()._meta.concrete_fields if field.attname != 'password']
+
+
+def _dump_user(user):
+    data = {name: getattr(user, name) for name in _user_fields()}
+    data[REVOKE_HASH_KEY] = get_md5_hash_password(user.password)
+    return data
+
+
+def _load_user(data):
+    data = dict(data)
+    revoke_hash = data.pop(REVOKE_HASH_KEY)
+    user = get_user_model().from_db('default', list(data), list(data.values()))
+    return user, revoke_hash
+
+
+def get_cached_user(user_id):
+    data = cached_users.get(user_id)
+    if data is None:
+        try:
+            data = cache.get(_user_cache_key(user_id))
+        except Exception:
+            data = None
+        if data is None:
+            return None, None
+        cached_users.set(user_id, data)
+    return _load_user(data)
+
+
+def cache_user(user):
+    data = _dump_user(user)
+    cached_users.set(user.pk, data)
+    try:
+        cache.set(_user_cache_key(user.pk), data, settings.AUTH_USER_CACHE_TTL)
+    except Exception:
+        pass
+
+
+def invalidate_cached_user(user_id):
+    cached_users.delete(user_id)
+    try:
+        cache.delete(_user_cache_key(user_id))
+    except Exception:
+        pass
+
+
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if api_settings.USER_ID_FIELD != 'id':
+            return super().get_user(validated_token)
+
+        user, revoke_hash = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revoke_hash:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
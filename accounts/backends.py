@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+
+class EmailBackend(ModelBackend):
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+
+        user_model = get_user_model()
+        try:
+            user = (
+                user_model._default_manager
+                .alias(email_lower=Lower('email'))
+                .exclude(email='')
+                .get(email_lower=email.strip().lower())
+            )
+        except (user_model.DoesNotExist, user_model.MultipleObjectsReturned):
+            user_model().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+
+class Command(BaseCommand):
+    help = 'List users that share an email address (ignoring case) and optionally clear the extra copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Keep each email on its most recently active user and clear it on the others'
+        )
+
+    def handle(self, *args, **options):
+        duplicates = (
+            User.objects
+            .exclude(email='')
+            .annotate(email_lower=Lower('email'))
+            .values('email_lower')
+            .annotate(count=Count('id'))
+            .filter(count__gt=1)
+            .order_by('email_lower')
+            .values_list('email_lower', flat=True)
+        )
+
+        cleared = []
+        for email in duplicates:
+            users = list(
+                User.objects
+                .alias(email_lower=Lower('email'))
+                .filter(email_lower=email)
+                .order_by(F('last_login').desc(nulls_last=True), '-date_joined', 'id')
+            )
+            keep, others = users[0], users[1:]
+            self.stdout.write(
+                f"{email}: keep user {keep.id} ({keep.username}), "
+                f"clear users {', '.join(f'{user.id} ({user.username})' for user in others)}"
+            )
+            cleared.extend(user.id for user in others)
+
+        if not cleared:
+            self.stdout.write(self.style.SUCCESS('No duplicate emails found'))
+        elif options['apply']:
+            # Users without an email can still sign in with their username.
+            User.objects.filter(id__in=cleared).update(email='')
+            self.stdout.write(self.style.SUCCESS(f'Cleared the email of {len(cleared)} users'))
+        else:
+            self.stdout.write(f'{len(cleared)} users share an email; run again with --apply to clear them')
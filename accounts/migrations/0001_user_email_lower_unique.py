@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+CREATE_EMAIL_INDEX_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS auth_user_email_lower_uniq ON auth_user (LOWER(email)) WHERE email <> ''"
+DROP_EMAIL_INDEX_SQL = 'DROP INDEX IF EXISTS auth_user_email_lower_uniq'
+
+
+def create_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects
+        .exclude(email='')
+        .annotate(email_lower=Lower('email'))
+        .values('email_lower')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot add a unique email index, these emails belong to more than one user: {', '.join(duplicates)}. "
+            "Review them with `python manage.py resolve_duplicate_emails`, clear the extra copies with "
+            "`python manage.py resolve_duplicate_emails --apply`, then run migrate again."
+        )
+    schema_editor.execute(CREATE_EMAIL_INDEX_SQL)
+
+
+def drop_email_index(apps, schema_editor):
+    schema_editor.execute(DROP_EMAIL_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -1,6 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+
+def email_taken(email):
+    return User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.lower()).exists()
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -11,6 +17,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         model = User
         fields = ('email', 'username', 'password', 'password2')
 
+    def validate_email(self, value):
+        value = value.strip()
+        if value and email_taken(value):
+            raise serializers.ValidationError("A user with this email already exists.")
+        return value
+
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError({"password": "Password fields didn't match."})
@@ -18,11 +30,19 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
-        )
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=validated_data['username'],
+                    email=validated_data['email'],
+                    password=validated_data['password']
+                )
+        except IntegrityError:
+            # A concurrent registration can pass the same checks; the unique
+            # indexes decide, and the loser gets the same 400 as a plain duplicate.
+            if validated_data['email'] and email_taken(validated_data['email']):
+                raise serializers.ValidationError({'email': ["A user with this email already exists."]})
+            raise serializers.ValidationError({'username': ["A user with that username already exists."]})
         return user
 
 
@@ -4,7 +4,6 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.contrib.auth.models import User
 from .serializers import UserRegistrationSerializer, UserSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -54,10 +53,7 @@ def login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    try:
-        user = authenticate(username=User.objects.get(email=email).username, password=password)
-    except User.DoesNotExist:
-        user = None
+    user = authenticate(request, email=email, password=password)
 
     if user is None:
         return Response(
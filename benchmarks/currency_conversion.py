@@ -0,0 +1,64 @@
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+
+def seed_rate_tables(dates, currencies, base):
+    from reports.currency_converter import rate_tables
+
+    rng = random.Random(42)
+    for day in dates:
+        rates = {code: Decimal(str(round(rng.uniform(0.5, 50), 6))) for code in currencies}
+        rates[base] = Decimal('1')
+        rate_tables.set((base, day), rates, pin=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare scalar and bulk currency conversion')
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--target', default='TRY')
+    args = parser.parse_args()
+
+    setup_django()
+    from reports.currency_converter import convert_currency, convert_many, get_supported_currencies
+    from reports.rate_providers import get_rate_provider
+
+    currencies = get_supported_currencies()
+    dates = [date(2025, 1, 1) + timedelta(days=offset) for offset in range(args.days)]
+    seed_rate_tables(dates, currencies, get_rate_provider().base)
+
+    rng = random.Random(7)
+    amounts = [Decimal(rng.randint(1, 10_000_000)) / 100 for _ in range(args.size)]
+    row_currencies = [rng.choice(currencies) for _ in range(args.size)]
+    row_dates = [rng.choice(dates) for _ in range(args.size)]
+
+    started = time.perf_counter()
+    scalar = [
+        convert_currency(amount, currency, args.target, day)
+        for amount, currency, day in zip(amounts, row_currencies, row_dates)
+    ]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bulk = convert_many(amounts, row_currencies, row_dates, args.target)
+    bulk_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'benchmark': 'currency_conversion',
+        'size': args.size,
+        'groups': len(set(zip(row_currencies, row_dates))),
+        'scalar_seconds': round(scalar_seconds, 4),
+        'bulk_seconds': round(bulk_seconds, 4),
+        'speedup': round(scalar_seconds / bulk_seconds, 2) if bulk_seconds else None,
+        'identical': scalar == bulk,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import csv
+import io
+import random
+from collections import deque
+from datetime import date, timedelta
+from decimal import Decimal
+
+CSV_COLUMNS = ['date', 'amount', 'currency', 'description', 'type']
+
+CURRENCIES = (('TRY', 70), ('USD', 15), ('EUR', 10), ('GBP', 5))
+
+MERCHANTS = [
+    'Migros', 'CarrefourSA', 'A101', 'BIM', 'Turkcell', 'Vodafone', 'Türk Telekom', 'Shell', 'Opet',
+    'Petrol Ofisi', 'Yemeksepeti', 'Getir', 'Trendyol', 'Hepsiburada', 'Tesco', 'Amazon', 'Uber',
+]
+
+TEMPLATES = [
+    ('credit', (1_000, 500_000), [
+        'Satış faturası {number} - {company}',
+        'Ödeme alındı {company} fatura no {number}',
+        'Invoice {number} paid by {company}',
+        'Sale {number} {company}',
+    ]),
+    ('debit', (5_000, 60_000), [
+        'Kira ödemesi {month} {year}',
+        'Office rent {month} {year}',
+        'Mortgage payment {month}',
+    ]),
+    ('debit', (17_000, 120_000), [
+        'Personel maaş ödemesi {month}',
+        'Salary payment {name}',
+        'Maaş {name} {month} {year}',
+    ]),
+    ('debit', (200, 5_000), [
+        'Elektrik faturası {month}',
+        'Su faturası {month} {year}',
+        'Electricity bill {month}',
+        'Doğalgaz gaz faturası {month}',
+    ]),
+    ('debit', (300, 3_000), [
+        'İnternet faturası {merchant}',
+        'Telefon {merchant} {month}',
+        'Phone bill {merchant}',
+    ]),
+    ('debit', (10, 2_500), [
+        'SaaS subscription {company}',
+        'CRM yazılım aboneliği {month}',
+        'Software license {company}',
+    ]),
+    ('debit', (50, 1_500), [
+        'Kırtasiye alışverişi {merchant}',
+        'Office supplies {merchant}',
+        'Stationery order {number}',
+    ]),
+    ('debit', (100, 4_000), [
+        'Market alışverişi {merchant}',
+        'Süpermarket {merchant}',
+        'Grocery {merchant}',
+    ]),
+    ('debit', (80, 2_000), [
+        'Yemek {merchant}',
+        'Restaurant {merchant}',
+        'Food delivery {merchant}',
+    ]),
+    ('debit', (50, 3_000), [
+        'Ulaşım kartı yükleme',
+        'Benzin {merchant}',
+        'Fuel {merchant}',
+        'Transport {merchant}',
+    ]),
+    ('debit', (10, 20_000), [
+        'EFT {name}',
+        'Havale {name} {number}',
+        'Card payment {merchant}',
+        'ATM para çekme {number}',
+    ]),
+]
+
+COMPANIES = ['ABC Ltd', 'Yıldız A.Ş.', 'Acme Corp', 'Deniz Ticaret', 'Globex', 'Ankara Yazılım', 'Initech']
+NAMES = ['Ayşe Yılmaz', 'Mehmet Demir', 'Zeynep Kaya', 'Ali Çelik', 'John Smith', 'Emma Brown']
+MONTHS = ['Ocak', 'Şubat', 'Mart', 'Nisan', 'Mayıs', 'Haziran', 'January', 'July', 'October', 'December']
+
+
+def generate_statement(rows, seed=42, duplicate_ratio=0.0, start_date=date(2024, 1, 1), days=365):
+    rng = random.Random(seed)
+    codes = [code for code, weight in CURRENCIES]
+    weights = [weight for code, weight in CURRENCIES]
+    recent = deque(maxlen=1000)
+
+    for index in range(rows):
+        if recent and rng.random() < duplicate_ratio:
+            row = rng.choice(recent)
+            yield row
+            continue
+
+        transaction_type, (low, high), templates = rng.choice(TEMPLATES)
+        day = start_date + timedelta(days=index * days // rows)
+        description = rng.choice(templates).format(
+            number=rng.randint(1000, 999_999),
+            company=rng.choice(COMPANIES),
+            merchant=rng.choice(MERCHANTS),
+            name=rng.choice(NAMES),
+            month=rng.choice(MONTHS),
+            year=day.year,
+        )
+        row = {
+            'date': day.isoformat(),
+            'amount': str(Decimal(rng.randint(low * 100, high * 100)).scaleb(-2)),
+            'currency': rng.choices(codes, weights)[0],
+            'description': description,
+            'type': transaction_type,
+        }
+        recent.append(row)
+        yield row
+
+
+def write_statement(output, rows, **kwargs):
+    writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    count = 0
+    for row in generate_statement(rows, **kwargs):
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def statement_csv(rows, **kwargs):
+    output = io.StringIO()
+    write_statement(output, rows, **kwargs)
+    return output.getvalue().encode('utf-8')
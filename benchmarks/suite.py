@@ -0,0 +1,271 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks import setup_django
+from benchmarks.statements import generate_statement, write_statement
+
+START_DATE = date(2024, 1, 1)
+# process_csv_file reads a whole statement and its rows into memory, so each
+# user's statement is capped; split larger sizes across more --users.
+MAX_ROWS_PER_STATEMENT = 1_000_000
+
+
+def measure(function, repeat):
+    timings = []
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = function()
+        timings.append(time.perf_counter() - started)
+    return {
+        'min_ms': round(min(timings) * 1000, 3),
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+    }, output
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def create_database(workdir):
+    from django.db import connection
+
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    return old_name
+
+
+def destroy_database(old_name):
+    from django.db import connection
+
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def bench_categorize(size, seed, repeat):
+    from transactions.utils import categorize_transaction
+
+    descriptions = [row['description'] for row in generate_statement(min(size, 100_000), seed=seed)]
+    timing, _ = measure(lambda: [categorize_transaction(description) for description in descriptions], repeat)
+    timing['rows'] = len(descriptions)
+    timing['us_per_row'] = round(timing['min_ms'] * 1000 / len(descriptions), 3)
+    return timing
+
+
+def bench_import(users, size, seed, duplicate_ratio, days, workdir):
+    from transactions.models import Transaction
+    from transactions.utils import process_csv_file
+
+    imported = failed = 0
+    seconds = 0.0
+    per_user = max(size // len(users), 1)
+    for index, user in enumerate(users):
+        path = os.path.join(workdir, f'statement_{user.id}.csv')
+        with open(path, 'w', encoding='utf-8') as output:
+            write_statement(
+                output, per_user, seed=seed + index, duplicate_ratio=duplicate_ratio,
+                start_date=START_DATE, days=days
+            )
+        with open(path, 'rb') as statement:
+            started = time.perf_counter()
+            batch, imported_rows, failed_rows, errors = process_csv_file(statement, user)
+            seconds += time.perf_counter() - started
+        os.remove(path)
+        if errors:
+            print(f"Benchmark import for user {user.id} reported {len(errors)} errors", file=sys.stderr)
+        imported += imported_rows
+        failed += failed_rows
+
+    return {
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(per_user * len(users) / seconds, 1) if seconds else None,
+        'imported_rows': imported,
+        'skipped_rows': failed,
+        'stored_rows': Transaction.objects.filter(user__in=users).count(),
+    }
+
+
+def bench_summary(client, days, repeat):
+    from django.urls import reverse
+
+    params = {
+        'start_date': START_DATE.isoformat(),
+        'end_date': (START_DATE + timedelta(days=days)).isoformat(),
+    }
+    timing, response = measure(lambda: client.get(reverse('summary-report'), params), repeat)
+    timing['status'] = response.status_code
+    return timing
+
+
+def bench_list(client, repeat, pages):
+    from django.urls import reverse
+
+    url = reverse('transaction-list')
+    first_page, response = measure(lambda: client.get(url, {'page_size': 50}), repeat)
+    first_page['status'] = response.status_code
+
+    next_url = response.json().get('next')
+    walked = 0
+    started = time.perf_counter()
+    while next_url and walked < pages:
+        next_url = client.get(next_url).json().get('next')
+        walked += 1
+    seconds = time.perf_counter() - started
+
+    return {
+        'first_page': first_page,
+        'sparse_first_page': measure(
+            lambda: client.get(url, {'page_size': 50, 'fields': 'id,date,amount,currency,type'}), repeat
+        )[0],
+        'cursor_walk': {
+            'pages': walked,
+            'ms_per_page': round(seconds * 1000 / walked, 3) if walked else None,
+        },
+    }
+
+
+def bench_balances(client, days, repeat):
+    from django.urls import reverse
+
+    end_date = START_DATE + timedelta(days=days)
+    running, response = measure(lambda: client.get(reverse('transaction-running-balance'), {
+        'currency': 'TRY',
+        'start_date': end_date.replace(day=1).isoformat(),
+        'end_date': end_date.isoformat(),
+    }), repeat)
+    running['status'] = response.status_code
+    history, response = measure(lambda: client.get(reverse('transaction-balance-history'), {
+        'currency': 'TRY',
+        'start_date': START_DATE.isoformat(),
+        'end_date': end_date.isoformat(),
+    }), repeat)
+    history['status'] = response.status_code
+    return {'running_balance': running, 'balance_history': history}
+
+
+def bench_weekly_report(days, repeat):
+    from reports.tasks import build_weekly_reports, send_weekly_report_chunk
+    from reports.models import WeeklyReportDelivery
+
+    week_end = START_DATE + timedelta(days=days)
+    week_start = week_end - timedelta(days=7)
+    build, reports = measure(lambda: list(build_weekly_reports(week_start, week_end)), repeat)
+
+    def send():
+        WeeklyReportDelivery.objects.all().delete()
+        return send_weekly_report_chunk.apply(args=[reports, str(week_start), str(week_end)]).get()
+
+    send_timing, _ = measure(send, repeat)
+    return {'users': len(reports), 'build': build, 'send': send_timing}
+
+
+def run_size(size, args, workdir):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from transactions.models import Transaction
+
+    users = [
+        User.objects.create_user(username=f'bench{size}_{index}', email=f'bench{size}_{index}@example.com', password='x')
+        for index in range(args.users)
+    ]
+    client = APIClient()
+    client.force_authenticate(user=users[0])
+
+    result = {
+        'rows': size,
+        'import': bench_import(users, size, args.seed, args.duplicate_ratio, args.days, workdir),
+        'categorize_transaction': bench_categorize(size, args.seed, args.repeat),
+    }
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE transactions_transaction')
+    result['summary_report'] = bench_summary(client, args.days, args.repeat)
+    result['transaction_list'] = bench_list(client, args.repeat, args.pages)
+    result['balances'] = bench_balances(client, args.days, args.repeat)
+    result['weekly_report'] = bench_weekly_report(args.days, args.repeat)
+
+    Transaction.objects.filter(user__in=users).delete()
+    User.objects.filter(pk__in=[user.pk for user in users]).delete()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark imports, reports and the transaction list on synthetic statements')
+    parser.add_argument('--sizes', default='1000,10000', help='Comma separated row counts, e.g. 1000,100000,1000000')
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if max(sizes) // args.users > MAX_ROWS_PER_STATEMENT:
+        parser.error(
+            f'At most {MAX_ROWS_PER_STATEMENT} rows per user statement are supported; '
+            f'raise --users to benchmark {max(sizes)} rows'
+        )
+
+    setup_django()
+    import django
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+
+    setup_test_environment()
+    # Like the test runner: with DEBUG on every query is kept in connection.queries.
+    settings.DEBUG = False
+    cache_settings = {'default': {'BACKEND': 'config.metrics.InstrumentedLocMemCache'}}
+
+    with tempfile.TemporaryDirectory() as workdir, override_settings(CACHES=cache_settings), \
+            contextlib.redirect_stdout(sys.stderr):
+        old_name = create_database(workdir)
+        try:
+            results = [run_size(size, args, workdir) for size in sizes]
+        finally:
+            destroy_database(old_name)
+
+    report = {
+        'benchmark': 'suite',
+        'commit': git_commit(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'debug': settings.DEBUG,
+        'parameters': {
+            'users': args.users,
+            'duplicate_ratio': args.duplicate_ratio,
+            'days': args.days,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+
+def build_rows(size):
+    rng = random.Random(42)
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': index + 1,
+            'date': date(2025, 1, 1) + timedelta(days=rng.randint(0, 364)),
+            'amount': Decimal(rng.randint(1, 10_000_000)).scaleb(-2),
+            'currency': rng.choice(['TRY', 'USD', 'EUR']),
+            'description': f'Transaction {index} ' + 'x' * rng.randint(10, 80),
+            'type': rng.choice(['credit', 'debit']),
+            'category': rng.choice(['Sales', 'Rent', 'Salary', 'Other']),
+            'created_at': created_at + timedelta(seconds=index),
+        }
+        for index in range(size)
+    ]
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare transaction list serialization paths')
+    parser.add_argument('--size', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from transactions.models import Transaction
+    from transactions.renderers import ORJSONRenderer, orjson
+    from transactions.serializers import (
+        TRANSACTION_FIELDS,
+        TransactionSerializer,
+        parse_requested_fields,
+        serialize_transaction_rows,
+    )
+
+    rows = build_rows(args.size)
+    instances = [Transaction(**row) for row in rows]
+    sparse_fields = parse_requested_fields('id,date,amount,currency,type,category')
+
+    results = {}
+    cases = {
+        'model_serializer_json': lambda: JSONRenderer().render(TransactionSerializer(instances, many=True).data),
+        'row_mapper_json': lambda: JSONRenderer().render(serialize_transaction_rows(rows, TRANSACTION_FIELDS)),
+        'row_mapper_orjson': lambda: ORJSONRenderer().render(serialize_transaction_rows(rows, TRANSACTION_FIELDS)),
+        'row_mapper_orjson_sparse': lambda: ORJSONRenderer().render(serialize_transaction_rows(rows, sparse_fields)),
+    }
+    for name, function in cases.items():
+        seconds, output = measure(function, args.repeat)
+        results[name] = {
+            'ms_per_1000_rows': round(seconds * 1000 * 1000 / args.size, 3),
+            'bytes_per_row': round(len(output) / args.size, 1),
+        }
+
+    baseline = results['model_serializer_json']['ms_per_1000_rows']
+    for result in results.values():
+        result['speedup'] = round(baseline / result['ms_per_1000_rows'], 2) if result['ms_per_1000_rows'] else None
+
+    print(json.dumps({
+        'benchmark': 'transaction_serialization',
+        'size': args.size,
+        'orjson': orjson is not None,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,4 +8,10 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@app.on_after_configure.connect
+def setup_metrics(sender, **kwargs):
+    from .metrics import connect_celery_signals
+    connect_celery_signals()
+
+
 
@@ -0,0 +1,71 @@
+import contextvars
+import random
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY_ONLY_APPS = {'admin', 'auth', 'accounts', 'contenttypes', 'sessions', 'token_blacklist'}
+
+replica_reads_enabled = contextvars.ContextVar('replica_reads_enabled', default=False)
+
+
+def _sticky_key(user_id):
+    return f'db_primary_sticky_{user_id}'
+
+
+def mark_primary_sticky(user_id):
+    if not settings.DATABASE_REPLICAS:
+        return
+    try:
+        cache.set(_sticky_key(user_id), True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+    except Exception:
+        pass
+
+
+def is_primary_sticky(user_id):
+    try:
+        return bool(cache.get(_sticky_key(user_id)))
+    except Exception:
+        return True
+
+
+def replica_reads(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or not request.user.is_authenticated
+            or is_primary_sticky(request.user.id)
+        ):
+            return view_func(request, *args, **kwargs)
+        token = replica_reads_enabled.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            replica_reads_enabled.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not replica_reads_enabled.get():
+            return 'default'
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,297 @@
+import contextvars
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+STAGE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+_MISSING = object()
+
+current_request = contextvars.ContextVar('metrics_current_request', default=None)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        with self._lock:
+            self.collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Counter:
+    metric_type = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    metric_type = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            values = [(labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items()]
+        for labels, (bucket_counts, total, count) in sorted(values):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(float(total))}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+http_requests = Counter('http_requests_total', 'HTTP requests by endpoint and status', ('method', 'endpoint', 'status'))
+http_latency = Histogram('http_request_duration_seconds', 'HTTP request latency', ('method', 'endpoint'))
+db_queries = Histogram('http_request_db_queries', 'SQL queries per request', ('endpoint',), COUNT_BUCKETS)
+db_query_seconds = Counter('http_request_db_query_seconds_total', 'Time spent in SQL per endpoint', ('endpoint',))
+cache_requests = Counter('cache_requests_total', 'Cache lookups by cache, endpoint and result', ('cache', 'endpoint', 'result'))
+rate_requests = Counter('exchange_rate_requests_total', 'Outbound exchange rate requests by endpoint and outcome', ('endpoint', 'outcome'))
+rate_latency = Histogram('exchange_rate_request_duration_seconds', 'Outbound exchange rate request latency', ('outcome',))
+import_stage_seconds = Histogram('import_stage_duration_seconds', 'CSV import stage duration', ('stage',), STAGE_BUCKETS)
+celery_task_seconds = Histogram('celery_task_duration_seconds', 'Celery task duration', ('task', 'state'), STAGE_BUCKETS)
+
+
+class RequestStats:
+    __slots__ = ('endpoint', 'queries', 'query_seconds')
+
+    def __init__(self, endpoint='unmatched'):
+        self.endpoint = endpoint
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def _current_endpoint():
+    stats = current_request.get()
+    return stats.endpoint if stats else 'background'
+
+
+def _record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += time.perf_counter() - started
+
+
+def record_cache_lookup(cache_name, hit):
+    cache_requests.inc(cache_name, _current_endpoint(), 'hit' if hit else 'miss')
+
+
+def record_rate_request(outcome, seconds):
+    rate_requests.inc(_current_endpoint(), outcome)
+    rate_latency.observe(seconds, outcome)
+
+
+@contextmanager
+def import_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        import_stage_seconds.observe(time.perf_counter() - started, stage)
+
+
+def _endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unmatched'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_query))
+                response = self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            endpoint = _endpoint_name(request)
+            http_requests.inc(request.method, endpoint, str(status_code))
+            http_latency.observe(elapsed, request.method, endpoint)
+            db_queries.observe(stats.queries, endpoint)
+            db_query_seconds.inc(endpoint, amount=stats.query_seconds)
+            current_request.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = current_request.get()
+        if stats is not None:
+            stats.endpoint = _endpoint_name(request)
+        return None
+
+
+class InstrumentedCacheMixin:
+    metrics_name = 'default'
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        record_cache_lookup(self.metrics_name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+def _lru_collector():
+    from accounts.authentication import cached_users
+    from reports.currency_converter import rate_tables
+
+    samples = {'hits': [], 'misses': [], 'size': []}
+    for name, lru_cache in (('exchange_rate_tables', rate_tables), ('auth_users', cached_users)):
+        samples['hits'].append(({'cache': name}, lru_cache.hits))
+        samples['misses'].append(({'cache': name}, lru_cache.misses))
+        samples['size'].append(({'cache': name}, len(lru_cache)))
+    return [
+        ('memory_cache_hits_total', 'counter', 'In-process LRU cache hits', samples['hits']),
+        ('memory_cache_misses_total', 'counter', 'In-process LRU cache misses', samples['misses']),
+        ('memory_cache_entries', 'gauge', 'In-process LRU cache entries', samples['size']),
+    ]
+
+
+registry.register_collector(_lru_collector)
+
+
+_task_started = {}
+
+
+def _task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None and task is not None:
+        celery_task_seconds.observe(time.perf_counter() - started, task.name, state or 'UNKNOWN')
+
+
+def connect_celery_signals():
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False, dispatch_uid='metrics_task_prerun')
+    task_postrun.connect(_task_postrun, weak=False, dispatch_uid='metrics_task_postrun')
+
+
+def metrics_view(request):
+    from django.conf import settings
+
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+            return HttpResponseForbidden()
+    elif not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -29,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -81,6 +83,27 @@ else:
         }
     }
 
+DB_REPLICAS = config('DB_REPLICAS', default='', cast=Csv())
+for index, location in enumerate(DB_REPLICAS, start=1):
+    replica = dict(DATABASES['default'])
+    if replica['ENGINE'] == 'django.db.backends.postgresql':
+        host, _, port = location.partition(':')
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    else:
+        replica['NAME'] = location
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{index}'] = replica
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_REPLICA_STICKY_SECONDS = config('DATABASE_REPLICA_STICKY_SECONDS', default=30, cast=int)
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,19 +127,49 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'transaction_archive': {
+        'BACKEND': config('TRANSACTION_ARCHIVE_STORAGE', default='django.core.files.storage.FileSystemStorage'),
+        'OPTIONS': {
+            'location': config('TRANSACTION_ARCHIVE_LOCATION', default=os.path.join(BASE_DIR, 'archive')),
+        },
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    'DEFAULT_THROTTLE_RATES': {
+        'uploads': config('THROTTLE_UPLOADS_RATE', default='30/hour'),
+        'reports': config('THROTTLE_REPORTS_RATE', default='120/min'),
+    },
 }
 
+TRANSACTION_COUNT_CACHE_TTL = config('TRANSACTION_COUNT_CACHE_TTL', default=60, cast=int)
+TRANSACTION_FACETS_CACHE_TTL = config('TRANSACTION_FACETS_CACHE_TTL', default=86400, cast=int)
+TRANSACTION_SYNC_PAGE_SIZE = config('TRANSACTION_SYNC_PAGE_SIZE', default=500, cast=int)
+TRANSACTION_SYNC_MAX_PAGE_SIZE = config('TRANSACTION_SYNC_MAX_PAGE_SIZE', default=5000, cast=int)
+IMPORT_DEDUP_CHUNK_SIZE = config('IMPORT_DEDUP_CHUNK_SIZE', default=1000, cast=int)
+IMPORT_ROLLBACK_CHUNK_SIZE = config('IMPORT_ROLLBACK_CHUNK_SIZE', default=5000, cast=int)
+
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+AUTH_USER_LOCAL_TTL = config('AUTH_USER_LOCAL_TTL', default=30, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=300, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -131,11 +184,21 @@ else:
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'config.metrics.InstrumentedRedisCache',
         'LOCATION': cache_location,
     }
 }
 
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_REDIS_URL = config('THROTTLE_REDIS_URL', default=cache_location)
+THROTTLE_REDIS_TIMEOUT = config('THROTTLE_REDIS_TIMEOUT', default=0.05, cast=float)
+THROTTLE_BREAKER_THRESHOLD = config('THROTTLE_BREAKER_THRESHOLD', default=3, cast=int)
+THROTTLE_BREAKER_RESET = config('THROTTLE_BREAKER_RESET', default=30, cast=int)
+THROTTLE_UPLOAD_COST_BYTES = config('THROTTLE_UPLOAD_COST_BYTES', default=1048576, cast=int)
+THROTTLE_REPORT_COST_DAYS = config('THROTTLE_REPORT_COST_DAYS', default=90, cast=int)
+
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
@@ -149,8 +212,55 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'reports.tasks.send_weekly_report',
         'schedule': crontab(hour=9, minute=0, day_of_week=1),
     },
+    'warm-exchange-rates': {
+        'task': 'reports.tasks.warm_exchange_rates',
+        'schedule': crontab(minute='*/30'),
+    },
+    'ensure-transaction-partitions': {
+        'task': 'transactions.tasks.ensure_transaction_partitions',
+        'schedule': crontab(hour=3, minute=15),
+    },
 }
 
+TRANSACTION_ARCHIVE_ENABLED = config('TRANSACTION_ARCHIVE_ENABLED', default=False, cast=bool)
+if TRANSACTION_ARCHIVE_ENABLED:
+    CELERY_BEAT_SCHEDULE['archive-old-transactions'] = {
+        'task': 'transactions.tasks.archive_old_transactions',
+        'schedule': crontab(hour=4, minute=0, day_of_month=1),
+    }
+TRANSACTION_ARCHIVE_AFTER_MONTHS = config('TRANSACTION_ARCHIVE_AFTER_MONTHS', default=24, cast=int)
+TRANSACTION_ARCHIVE_FORMAT = config('TRANSACTION_ARCHIVE_FORMAT', default='parquet')
+TRANSACTION_ARCHIVE_BATCH_SIZE = config('TRANSACTION_ARCHIVE_BATCH_SIZE', default=50000, cast=int)
+TRANSACTION_ARCHIVE_DELETE_CHUNK_SIZE = config('TRANSACTION_ARCHIVE_DELETE_CHUNK_SIZE', default=5000, cast=int)
+TRANSACTION_PARTITION_INTERVAL = config('TRANSACTION_PARTITION_INTERVAL', default='month')
+TRANSACTION_PARTITIONS_AHEAD = config('TRANSACTION_PARTITIONS_AHEAD', default=3, cast=int)
+
+EXCHANGE_RATE_PROVIDER = config('EXCHANGE_RATE_PROVIDER', default='reports.rate_providers.ExchangeRateApiProvider')
+EXCHANGE_RATE_CSV_PATH = config('EXCHANGE_RATE_CSV_PATH', default='')
+EXCHANGE_RATE_WARM_DAYS = config('EXCHANGE_RATE_WARM_DAYS', default=7, cast=int)
+EXCHANGE_RATE_API_URL = config('EXCHANGE_RATE_API_URL', default='https://api.exchangerate-api.com/v4')
+EXCHANGE_RATE_BASE = config('EXCHANGE_RATE_BASE', default='USD')
+EXCHANGE_RATE_LATEST_TTL = config('EXCHANGE_RATE_LATEST_TTL', default=3600, cast=int)
+EXCHANGE_RATE_LRU_SIZE = config('EXCHANGE_RATE_LRU_SIZE', default=512, cast=int)
+EXCHANGE_RATE_LRU_TTL = config('EXCHANGE_RATE_LRU_TTL', default=300, cast=int)
+EXCHANGE_RATE_TIMEOUT = config('EXCHANGE_RATE_TIMEOUT', default=3, cast=float)
+EXCHANGE_RATE_RETRIES = config('EXCHANGE_RATE_RETRIES', default=2, cast=int)
+EXCHANGE_RATE_POOL_SIZE = config('EXCHANGE_RATE_POOL_SIZE', default=10, cast=int)
+EXCHANGE_RATE_PREFETCH_WORKERS = config('EXCHANGE_RATE_PREFETCH_WORKERS', default=8, cast=int)
+EXCHANGE_RATE_NEGATIVE_TTL = config('EXCHANGE_RATE_NEGATIVE_TTL', default=60, cast=int)
+EXCHANGE_RATE_BREAKER_THRESHOLD = config('EXCHANGE_RATE_BREAKER_THRESHOLD', default=5, cast=int)
+EXCHANGE_RATE_BREAKER_RESET = config('EXCHANGE_RATE_BREAKER_RESET', default=30, cast=int)
+
+WEEKLY_REPORT_CHUNK_SIZE = config('WEEKLY_REPORT_CHUNK_SIZE', default=500, cast=int)
+
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='reports@example.com')
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -0,0 +1,123 @@
+from datetime import datetime
+import logging
+import redis
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+from reports.circuit_breaker import CircuitBreaker
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / refill_rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+_token_bucket = None
+
+throttle_breaker = CircuitBreaker(
+    failure_threshold=settings.THROTTLE_BREAKER_THRESHOLD,
+    reset_timeout=settings.THROTTLE_BREAKER_RESET
+)
+
+
+def get_token_bucket():
+    global _redis_client, _token_bucket
+    if _token_bucket is None:
+        _redis_client = redis.Redis.from_url(
+            settings.THROTTLE_REDIS_URL,
+            socket_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.THROTTLE_REDIS_TIMEOUT
+        )
+        _token_bucket = _redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+    return _token_bucket
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    max_cost = None
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def get_cost(self, request, view):
+        return 1
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if self.rate is None or not settings.THROTTLE_ENABLED:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        cost = min(self.get_cost(request, view), self.max_cost or self.num_requests)
+        if not throttle_breaker.allow_request():
+            return True
+
+        try:
+            allowed, wait = get_token_bucket()(
+                keys=[key],
+                args=[self.num_requests, self.num_requests / self.duration, cost]
+            )
+        except redis.RedisError as e:
+            throttle_breaker.record_failure()
+            logger.warning("Throttle store unavailable, allowing request: %s", e)
+            return True
+
+        throttle_breaker.record_success()
+        if int(allowed):
+            return True
+        self.wait_seconds = float(wait)
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UploadRateThrottle(TokenBucketThrottle):
+    scope = 'uploads'
+
+    def get_cost(self, request, view):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return 1
+        return 1 + upload.size // settings.THROTTLE_UPLOAD_COST_BYTES
+
+
+class ReportRateThrottle(TokenBucketThrottle):
+    scope = 'reports'
+
+    def get_cost(self, request, view):
+        try:
+            start = datetime.strptime(request.query_params.get('start_date', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.query_params.get('end_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return 1
+        return 1 + max(0, (end - start).days) // settings.THROTTLE_REPORT_COST_DAYS
@@ -53,11 +53,34 @@ export const transactionsAPI = {
     currency?: string;
     category?: string;
     target_currency?: string;
-    page?: number;
+    cursor?: string;
+    page_size?: number;
+    include_count?: boolean;
+    fields?: string;
   }) => {
     const response = await api.get("/api/transactions/", { params });
     return response.data;
   },
+  facets: async (params?: {
+    start_date?: string;
+    end_date?: string;
+    type?: string;
+    currency?: string;
+    category?: string;
+    search?: string;
+  }) => {
+    const response = await api.get("/api/transactions/facets/", { params });
+    return response.data;
+  },
+  changes: async (params?: {
+    since?: string;
+    limit?: number;
+    target_currency?: string;
+    fields?: string;
+  }) => {
+    const response = await api.get("/api/transactions/changes/", { params });
+    return response.data;
+  },
   get: async (id: number, target_currency?: string) => {
     const response = await api.get(`/api/transactions/${id}/`, {
       params: target_currency ? { target_currency } : {},
@@ -76,6 +99,38 @@ export const transactionsAPI = {
     });
     return response.data;
   },
+  rollbackImport: async (batchId: number) => {
+    const response = await api.delete(`/api/transactions/imports/${batchId}/`);
+    return response.data;
+  },
+  balances: async (params?: { date?: string; currency?: string }) => {
+    const response = await api.get("/api/transactions/balances/", { params });
+    return response.data;
+  },
+  runningBalance: async (params: { currency: string; start_date?: string; end_date?: string }) => {
+    const response = await api.get("/api/transactions/running-balance/", { params });
+    return response.data;
+  },
+  balanceHistory: async (params: {
+    currency: string;
+    start_date?: string;
+    end_date?: string;
+    interval?: "month" | "day";
+  }) => {
+    const response = await api.get("/api/transactions/balance-history/", { params });
+    return response.data;
+  },
+  archives: async () => {
+    const response = await api.get("/api/transactions/archives/");
+    return response.data;
+  },
+  archiveRows: async (archiveId: number, params?: { start_date?: string; end_date?: string }) => {
+    const response = await api.get(`/api/transactions/archives/${archiveId}/rows/`, {
+      params,
+      responseType: "blob",
+    });
+    return response.data;
+  },
 };
 
 export const reportsAPI = {
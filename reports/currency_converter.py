@@ -1,55 +1,249 @@
-import requests
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from decimal import Decimal, ROUND_DOWN
 from django.core.cache import cache
 from django.conf import settings
+from django.utils import timezone
+from .memory_cache import LRUCache
+from .models import ExchangeRate
+from .rate_providers import RATE_PRECISION, RateUnavailable, get_rate_provider
 
+RATE_UNAVAILABLE = 'unavailable'
 
-def get_exchange_rate(from_currency, to_currency, date=None):
-    if from_currency.upper() == to_currency.upper():
-        return Decimal('1.0')
+rate_tables = LRUCache(
+    maxsize=settings.EXCHANGE_RATE_LRU_SIZE,
+    ttl=settings.EXCHANGE_RATE_LRU_TTL
+)
+
+
+def _parse_rate_date(date):
+    if not date:
+        return None
+    if isinstance(date, str):
+        date = datetime.strptime(date, '%Y-%m-%d').date()
+    if date >= timezone.now().date():
+        return None
+    return date
+
+
+def fetch_rate_table(date=None):
+    return get_rate_provider().get_rate_table(date)
+
+
+def _shared_cache_key(base, date):
+    return f'exchange_rate_table_{base}_{date or "latest"}'
+
+
+def _get_shared_rate_table(cache_key):
+    try:
+        cached_rates = cache.get(cache_key)
+        if cached_rates == RATE_UNAVAILABLE:
+            return RATE_UNAVAILABLE
+        if cached_rates:
+            return {code: Decimal(rate) for code, rate in cached_rates.items()}
+    except Exception:
+        pass
+    return None
+
+
+def _set_shared_rate_table(cache_key, rates, timeout):
+    try:
+        cache.set(cache_key, {code: str(rate) for code, rate in rates.items()}, timeout)
+    except Exception:
+        pass
+
+
+def _remember_rate_table(base, date, rates):
+    if date is None:
+        rate_tables.set((base, 'latest'), rates, ttl=min(rate_tables.ttl, settings.EXCHANGE_RATE_LATEST_TTL))
+    else:
+        rate_tables.set((base, date), rates, pin=True)
+
+
+def _get_stored_rate_table(base, date):
+    cache_key = _shared_cache_key(base, date)
+    rates = _get_shared_rate_table(cache_key)
+    if rates is not None or date is None:
+        return rates
     
-    cache_key = f'exchange_rate_{from_currency}_{to_currency}_{date or "latest"}'
+    rates = dict(
+        ExchangeRate.objects
+        .filter(base=base, date=date)
+        .values_list('currency', 'rate')
+    )
+    if not rates:
+        return None
+    _set_shared_rate_table(cache_key, rates, None)
+    return rates
+
+
+def _store_rate_table(base, date, rates):
+    if date is None:
+        _set_shared_rate_table(_shared_cache_key(base, date), rates, settings.EXCHANGE_RATE_LATEST_TTL)
+    else:
+        ExchangeRate.objects.bulk_create(
+            [
+                ExchangeRate(base=base, currency=code, date=date, rate=rate)
+                for code, rate in rates.items()
+            ],
+            ignore_conflicts=True
+        )
+        _set_shared_rate_table(_shared_cache_key(base, date), rates, None)
+    _remember_rate_table(base, date, rates)
+
+
+def _store_rate_table_unavailable(base, date):
+    rate_tables.set((base, date or 'latest'), RATE_UNAVAILABLE, ttl=settings.EXCHANGE_RATE_NEGATIVE_TTL)
     try:
-        cached_rate = cache.get(cache_key)
-        if cached_rate:
-            return Decimal(str(cached_rate))
+        cache.set(_shared_cache_key(base, date), RATE_UNAVAILABLE, settings.EXCHANGE_RATE_NEGATIVE_TTL)
     except Exception:
         pass
+
+
+def load_rate_table(date=None):
+    base = get_rate_provider().base
+    date = _parse_rate_date(date)
+    
+    rates = rate_tables.get((base, date or 'latest'))
+    if rates == RATE_UNAVAILABLE:
+        raise RateUnavailable('Exchange rates recently unavailable')
+    if rates is not None:
+        return rates
+    
+    rates = _get_stored_rate_table(base, date)
+    if rates == RATE_UNAVAILABLE:
+        rate_tables.set((base, date or 'latest'), RATE_UNAVAILABLE, ttl=settings.EXCHANGE_RATE_NEGATIVE_TTL)
+        raise RateUnavailable('Exchange rates recently unavailable')
+    if rates is not None:
+        _remember_rate_table(base, date, rates)
+        return rates
     
     try:
-        if date:
-            url = f'https://api.exchangerate-api.com/v4/historical/{from_currency.upper()}/{date}'
-        else:
-            url = f'https://api.exchangerate-api.com/v4/latest/{from_currency.upper()}'
-        
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'rates' in data:
-            rate = Decimal(str(data['rates'].get(to_currency.upper(), 1)))
-            try:
-                cache.set(cache_key, float(rate), 3600)
-            except Exception:
-                pass
-            return rate
+        rates = fetch_rate_table(date)
+    except RateUnavailable:
+        _store_rate_table_unavailable(base, date)
+        raise
+    _store_rate_table(base, date, rates)
+    return rates
+
+
+def prefetch_rate_tables(dates):
+    base = get_rate_provider().base
+    missing = []
+    for date in {_parse_rate_date(date) for date in dates}:
+        if rate_tables.get((base, date or 'latest')) is not None:
+            continue
+        rates = _get_stored_rate_table(base, date)
+        if rates == RATE_UNAVAILABLE:
+            rate_tables.set((base, date or 'latest'), RATE_UNAVAILABLE, ttl=settings.EXCHANGE_RATE_NEGATIVE_TTL)
+        elif rates is not None:
+            _remember_rate_table(base, date, rates)
         else:
-            return Decimal('1.0')
-            
-    except (requests.RequestException, KeyError, ValueError) as e:
-        print(f"Error fetching exchange rate: {e}")
+            missing.append(date)
+    
+    if not missing:
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(len(missing), settings.EXCHANGE_RATE_PREFETCH_WORKERS)) as executor:
+        futures = {date: executor.submit(contextvars.copy_context().run, fetch_rate_table, date) for date in missing}
+    
+    for date, future in futures.items():
+        try:
+            rates = future.result()
+        except RateUnavailable:
+            _store_rate_table_unavailable(base, date)
+            continue
+        _store_rate_table(base, date, rates)
+
+
+def get_exchange_rates(pairs, to_currency):
+    to_currency = to_currency.upper()
+    pairs = set(pairs)
+    prefetch_rate_tables(date for currency, date in pairs if currency.upper() != to_currency)
+    return {
+        (currency, date): get_exchange_rate(currency, to_currency, date)
+        for currency, date in pairs
+    }
+
+
+def refresh_latest_rate_table():
+    provider = get_rate_provider()
+    try:
+        rates = provider.get_rate_table()
+    except RateUnavailable:
+        return None
+    _store_rate_table(provider.base, None, rates)
+    return rates
+
+
+def get_rate_cache_stats():
+    return rate_tables.stats()
+
+
+def get_exchange_rate(from_currency, to_currency, date=None):
+    from_currency = from_currency.upper()
+    to_currency = to_currency.upper()
+    if from_currency == to_currency:
         return Decimal('1.0')
+    
+    try:
+        rates = load_rate_table(date)
+    except RateUnavailable:
+        return None
+    
+    if from_currency not in rates or to_currency not in rates:
+        return None
+    
+    return (rates[to_currency] / rates[from_currency]).quantize(RATE_PRECISION)
+
+
+def apply_exchange_rate(amount, rate):
+    if not amount:
+        return Decimal('0.0')
+    if rate is None:
+        return None
+    
+    converted = Decimal(str(amount)) * rate
+    return converted.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
 
 
 def convert_currency(amount, from_currency, to_currency, date=None):
     if not amount:
         return Decimal('0.0')
     
-    amount = Decimal(str(amount))
-    rate = get_exchange_rate(from_currency, to_currency, date)
-    converted = amount * rate
+    return apply_exchange_rate(amount, get_exchange_rate(from_currency, to_currency, date))
+
+
+def convert_many(amounts, currencies, dates, to_currency):
+    amounts = list(amounts)
+    currencies = list(currencies)
+    dates = list(dates) if dates is not None else [None] * len(amounts)
+    if not len(amounts) == len(currencies) == len(dates):
+        raise ValueError('amounts, currencies and dates must have the same length')
     
-    return converted.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    groups = defaultdict(list)
+    for index, key in enumerate(zip(currencies, dates)):
+        groups[key].append(index)
+    
+    rates = get_exchange_rates(groups.keys(), to_currency)
+    
+    zero = Decimal('0.0')
+    cent = Decimal('0.01')
+    results = [None] * len(amounts)
+    for key, indexes in groups.items():
+        rate = rates[key]
+        for index in indexes:
+            amount = amounts[index]
+            if not amount:
+                results[index] = zero
+            elif rate is not None:
+                if not isinstance(amount, Decimal):
+                    amount = Decimal(str(amount))
+                results[index] = (amount * rate).quantize(cent, rounding=ROUND_DOWN)
+    
+    return results
 
 
 def get_supported_currencies():
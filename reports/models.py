@@ -0,0 +1,34 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class WeeklyReportDelivery(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_report_deliveries')
+    week_start = models.DateField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-week_start']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'week_start'], name='unique_weekly_report_delivery'),
+        ]
+
+    def __str__(self):
+        return f"Weekly report {self.week_start} - {self.user_id}"
+
+
+class ExchangeRate(models.Model):
+    base = models.CharField(max_length=3)
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=24, decimal_places=10)
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', 'currency']
+        constraints = [
+            models.UniqueConstraint(fields=['base', 'date', 'currency'], name='unique_exchange_rate'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} 1 {self.base} = {self.rate} {self.currency}"
@@ -0,0 +1,134 @@
+import csv
+import logging
+import time
+import requests
+from bisect import bisect_right
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.metrics import record_rate_request
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+RATE_PRECISION = Decimal('0.0000000001')
+
+
+class RateUnavailable(Exception):
+    pass
+
+
+class RateProvider:
+    base = None
+
+    def get_rate_table(self, date=None):
+        raise NotImplementedError
+
+
+def _build_http_session():
+    session = requests.Session()
+    retries = Retry(
+        total=settings.EXCHANGE_RATE_RETRIES,
+        backoff_factor=0.2,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=('GET',)
+    )
+    adapter = HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=settings.EXCHANGE_RATE_POOL_SIZE,
+        max_retries=retries
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+http_session = _build_http_session()
+
+provider_breaker = CircuitBreaker(
+    failure_threshold=settings.EXCHANGE_RATE_BREAKER_THRESHOLD,
+    reset_timeout=settings.EXCHANGE_RATE_BREAKER_RESET
+)
+
+
+class ExchangeRateApiProvider(RateProvider):
+    @property
+    def base(self):
+        return settings.EXCHANGE_RATE_BASE
+
+    def get_rate_table(self, date=None):
+        if not provider_breaker.allow_request():
+            record_rate_request('circuit_open', 0)
+            raise RateUnavailable('Exchange rate provider circuit is open')
+
+        if date:
+            url = f'{settings.EXCHANGE_RATE_API_URL}/historical/{self.base}/{date}'
+        else:
+            url = f'{settings.EXCHANGE_RATE_API_URL}/latest/{self.base}'
+
+        started = time.perf_counter()
+        try:
+            response = http_session.get(url, timeout=settings.EXCHANGE_RATE_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+            rates = {
+                code.upper(): Decimal(str(rate)).quantize(RATE_PRECISION)
+                for code, rate in data['rates'].items()
+            }
+        except (requests.RequestException, KeyError, ValueError, TypeError, AttributeError, InvalidOperation) as e:
+            provider_breaker.record_failure()
+            record_rate_request('error', time.perf_counter() - started)
+            logger.warning("Error fetching exchange rate: %s", e)
+            raise RateUnavailable(str(e)) from e
+
+        provider_breaker.record_success()
+        record_rate_request('ok', time.perf_counter() - started)
+        rates[self.base] = Decimal('1')
+        return rates
+
+
+class CSVRateProvider(RateProvider):
+    def __init__(self, path=None, base='EUR'):
+        self.base = base
+        self.path = path or settings.EXCHANGE_RATE_CSV_PATH
+        self.tables = {}
+
+        with open(self.path, newline='', encoding='utf-8-sig') as csv_file:
+            for row in csv.DictReader(csv_file):
+                date = datetime.strptime(row.pop('Date').strip(), '%Y-%m-%d').date()
+                rates = {}
+                for code, rate in row.items():
+                    if not code or not code.strip() or not rate or rate.strip() in ('', 'N/A'):
+                        continue
+                    try:
+                        rates[code.strip().upper()] = Decimal(rate.strip()).quantize(RATE_PRECISION)
+                    except InvalidOperation:
+                        continue
+                rates[self.base] = Decimal('1')
+                self.tables[date] = rates
+
+        self.dates = sorted(self.tables)
+
+    def get_rate_table(self, date=None):
+        if not self.dates:
+            raise RateUnavailable(f'No exchange rates in {self.path}')
+        if date is None:
+            return self.tables[self.dates[-1]]
+
+        index = bisect_right(self.dates, date)
+        if index == 0:
+            raise RateUnavailable(f'No exchange rates on or before {date} in {self.path}')
+        return self.tables[self.dates[index - 1]]
+
+
+@lru_cache(maxsize=None)
+def load_rate_provider(provider_path):
+    return import_string(provider_path)()
+
+
+def get_rate_provider():
+    return load_rate_provider(settings.EXCHANGE_RATE_PROVIDER)
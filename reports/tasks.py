@@ -1,34 +1,177 @@
-from celery import shared_task
-from django.contrib.auth.models import User
+import logging
+from celery import shared_task, group
 from django.utils import timezone
 from datetime import timedelta
-from django.core.mail import send_mail
+from decimal import Decimal
+from itertools import groupby
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
 from transactions.models import Transaction
 from django.db.models import Sum, Count
+from .currency_converter import get_supported_currencies, prefetch_rate_tables, refresh_latest_rate_table
+from .models import WeeklyReportDelivery
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+
+def build_weekly_reports(start_date, end_date, top_n=5):
+    rows = (
+        Transaction.objects
+        .filter(date__gte=start_date, date__lte=end_date)
+        .values('user_id', 'user__email', 'user__username', 'currency', 'type', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by('user_id')
+    )
+
+    for user_id, user_rows in groupby(rows.iterator(chunk_size=2000), key=lambda row: row['user_id']):
+        user_rows = list(user_rows)
+        totals = {}
+        categories = []
+
+        for row in user_rows:
+            amount = Decimal(str(row['total'])).quantize(CENT)
+            currency_totals = totals.setdefault(row['currency'], {'income': Decimal('0'), 'expense': Decimal('0')})
+            if row['type'] == 'credit':
+                currency_totals['income'] += amount
+            else:
+                currency_totals['expense'] += amount
+                categories.append({
+                    'category': row['category'] or 'Uncategorized',
+                    'currency': row['currency'],
+                    'amount': amount,
+                    'count': row['count'],
+                })
+
+        top_categories = sorted(categories, key=lambda item: (item['count'], item['amount']), reverse=True)[:top_n]
+
+        yield {
+            'user_id': user_id,
+            'email': user_rows[0]['user__email'],
+            'username': user_rows[0]['user__username'],
+            'totals': {
+                currency: {
+                    'income': str(values['income']),
+                    'expense': str(values['expense']),
+                    'net': str(values['income'] - values['expense']),
+                }
+                for currency, values in totals.items()
+            },
+            'top_categories': [
+                {**item, 'amount': str(item['amount'])}
+                for item in top_categories
+            ],
+        }
+
+
+def format_weekly_report(report, week_start, week_end):
+    lines = [
+        f"Hello {report['username']},",
+        '',
+        f"Your financial summary for {week_start} - {week_end}:",
+        '',
+    ]
+
+    for currency, values in sorted(report['totals'].items()):
+        lines.append(f"{currency}: Income={values['income']}, Expense={values['expense']}, Net={values['net']}")
+
+    if report['top_categories']:
+        lines.extend(['', 'Top expense categories:'])
+        for item in report['top_categories']:
+            lines.append(f"- {item['category']}: {item['amount']} {item['currency']} ({item['count']} transactions)")
+
+    return '\n'.join(lines)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def send_weekly_report_chunk(self, reports, week_start, week_end):
+    already_sent = set(
+        WeeklyReportDelivery.objects
+        .filter(week_start=week_start, user_id__in=[report['user_id'] for report in reports])
+        .values_list('user_id', flat=True)
+    )
+    pending = [report for report in reports if report['user_id'] not in already_sent]
+    if not pending:
+        return f"Weekly reports already sent to {len(reports)} users"
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        raise self.retry(exc=e)
+
+    sent = []
+    failed = []
+    try:
+        for report in pending:
+            message = EmailMessage(
+                subject=f"Weekly financial report ({week_start} - {week_end})",
+                body=format_weekly_report(report, week_start, week_end),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[report['email']],
+                connection=connection,
+            )
+            try:
+                message.send()
+                sent.append(report['user_id'])
+            except Exception as e:
+                print(f"Error sending weekly report to user {report['user_id']}: {e}")
+                failed.append(report)
+    finally:
+        connection.close()
+        WeeklyReportDelivery.objects.bulk_create(
+            [WeeklyReportDelivery(user_id=user_id, week_start=week_start) for user_id in sent],
+            ignore_conflicts=True
+        )
+
+    if failed and self.request.retries < self.max_retries:
+        raise self.retry(args=(failed, week_start, week_end))
+
+    return f"Sent weekly reports to {len(sent)} users, {len(failed)} failed"
 
 
 @shared_task
 def send_weekly_report():
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=7)
-    
-    users = User.objects.all()
-    
-    for user in users:
-        transactions = Transaction.objects.filter(
-            user=user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        total_income = transactions.filter(type='credit').aggregate(total=Sum('amount'))['total'] or 0
-        total_expense = transactions.filter(type='debit').aggregate(total=Sum('amount'))['total'] or 0
-        net_cash_flow = total_income - total_expense
-        
-        print(f"Weekly report for {user.email}: Income={total_income}, Expense={total_expense}, Net={net_cash_flow}")
-    
-    return f"Sent weekly reports to {users.count()} users"
+    chunk_size = settings.WEEKLY_REPORT_CHUNK_SIZE
+
+    chunks = []
+    chunk = []
+    user_count = 0
+    for report in build_weekly_reports(start_date, end_date):
+        if not report['email']:
+            continue
+        chunk.append(report)
+        user_count += 1
+        if len(chunk) >= chunk_size:
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        chunks.append(chunk)
 
+    if chunks:
+        group(
+            send_weekly_report_chunk.s(chunk, str(start_date), str(end_date))
+            for chunk in chunks
+        ).apply_async()
 
+    return f"Queued weekly reports for {user_count} users in {len(chunks)} chunks"
 
+
+@shared_task
+def warm_exchange_rates(days=None):
+    days = settings.EXCHANGE_RATE_WARM_DAYS if days is None else days
+    today = timezone.now().date()
+    
+    latest_rates = refresh_latest_rate_table()
+    prefetch_rate_tables(today - timedelta(days=offset) for offset in range(1, days + 1))
+    
+    if latest_rates is None:
+        return f"Warmed {days} days of exchange rates, latest rates unavailable"
+    
+    missing = [code for code in get_supported_currencies() if code not in latest_rates]
+    if missing:
+        logger.warning("Latest exchange rates are missing: %s", ', '.join(missing))
+    return f"Warmed latest and {days} days of exchange rates"
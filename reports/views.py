@@ -1,17 +1,49 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
+from django.views.decorators.http import condition
 from datetime import datetime, timedelta
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from transactions.models import Transaction
-from .currency_converter import convert_currency, get_supported_currencies
+from config.db_router import replica_reads
+from config.throttling import ReportRateThrottle
+from transactions.models import DailyTransactionRollup, Transaction
+from transactions.versioning import data_version_etag, data_version_last_modified
+from .currency_converter import convert_currency, convert_many, get_supported_currencies
 from decimal import Decimal, InvalidOperation
 
 
+def _add_rollups(items, rollups, keys, amount_field, with_count=False):
+    merged = {tuple(item[key] for key in keys): item for item in items}
+    for rollup in rollups:
+        key = tuple(rollup[field] for field in keys)
+        item = merged.get(key)
+        if item is None:
+            item = merged[key] = {**dict(zip(keys, key)), amount_field: Decimal('0')}
+            if with_count:
+                item['count'] = 0
+        item[amount_field] = Decimal(str(item[amount_field])) + rollup['total']
+        if with_count:
+            item['count'] += rollup['count']
+    return list(merged.values())
+
+
+def _convert_grouped_amounts(items, amount_field, target_currency, date, unavailable_currencies):
+    converted = convert_many(
+        [item[amount_field] for item in items],
+        [item['currency'] for item in items],
+        [str(date)] * len(items),
+        target_currency
+    )
+    for item, amount in zip(items, converted):
+        if amount is None:
+            unavailable_currencies.add(item['currency'])
+    return converted
+
+
 @swagger_auto_schema(
     method='get',
     manual_parameters=[
@@ -60,6 +92,8 @@ from decimal import Decimal, InvalidOperation
                             }
                         )
                     ),
+                    'rate_unavailable': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='True if some amounts could not be converted and were left out of the totals'),
+                    'unavailable_currencies': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
                 }
             )
         ),
@@ -68,6 +102,9 @@ from decimal import Decimal, InvalidOperation
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ReportRateThrottle])
+@condition(etag_func=data_version_etag, last_modified_func=data_version_last_modified)
+@replica_reads
 def summary_report(request):
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
@@ -112,28 +149,27 @@ def summary_report(request):
     income_by_currency = income_transactions.values('currency').annotate(total=Sum('amount'))
     expense_by_currency = expense_transactions.values('currency').annotate(total=Sum('amount'))
     
+    unavailable_currencies = set()
+    income_by_currency = list(income_by_currency)
+    expense_by_currency = list(expense_by_currency)
+    
+    archived_rollups = list(
+        DailyTransactionRollup.objects
+        .filter(user=request.user, date__gte=start_date, date__lte=end_date)
+        .values('type', 'currency', 'category')
+        .annotate(total=Sum('total'), count=Sum('count'))
+        .order_by()
+    )
+    archived_income = [rollup for rollup in archived_rollups if rollup['type'] == 'credit']
+    archived_expense = [rollup for rollup in archived_rollups if rollup['type'] == 'debit']
+    income_by_currency = _add_rollups(income_by_currency, archived_income, ['currency'], 'total')
+    expense_by_currency = _add_rollups(expense_by_currency, archived_expense, ['currency'], 'total')
+    
     if target_currency:
-        total_income = Decimal('0')
-        total_expense = Decimal('0')
-        
-        for item in income_by_currency:
-            converted = convert_currency(
-                item['total'],
-                item['currency'],
-                target_currency,
-                date=str(end_date)
-            )
-            total_income += converted
-        
-        for item in expense_by_currency:
-            converted = convert_currency(
-                item['total'],
-                item['currency'],
-                target_currency,
-                date=str(end_date)
-            )
-            total_expense += converted
-        
+        converted_income = _convert_grouped_amounts(income_by_currency, 'total', target_currency, end_date, unavailable_currencies)
+        converted_expense = _convert_grouped_amounts(expense_by_currency, 'total', target_currency, end_date, unavailable_currencies)
+        total_income = sum((amount for amount in converted_income if amount is not None), Decimal('0'))
+        total_expense = sum((amount for amount in converted_expense if amount is not None), Decimal('0'))
         currency = target_currency
     else:
         total_income = sum(Decimal(str(item['total'])) for item in income_by_currency)
@@ -142,7 +178,7 @@ def summary_report(request):
     
     net_cash_flow = total_income - total_expense
     
-    top_expense_categories_raw = (
+    top_expense_categories_raw = list(
         expense_transactions
         .values('category', 'currency')
         .annotate(
@@ -150,19 +186,20 @@ def summary_report(request):
             count=Count('id')
         )
     )
+    top_expense_categories_raw = _add_rollups(
+        top_expense_categories_raw, archived_expense, ['category', 'currency'], 'amount', with_count=True
+    )
+    
+    if target_currency:
+        category_amounts = _convert_grouped_amounts(top_expense_categories_raw, 'amount', target_currency, end_date, unavailable_currencies)
+    else:
+        category_amounts = [Decimal(str(item['amount'])) for item in top_expense_categories_raw]
     
     category_totals = {}
-    for item in top_expense_categories_raw:
+    for item, amount in zip(top_expense_categories_raw, category_amounts):
+        if amount is None:
+            continue
         category = item['category'] or 'Uncategorized'
-        amount = Decimal(str(item['amount']))
-        
-        if target_currency:
-            amount = convert_currency(
-                amount,
-                item['currency'],
-                target_currency,
-                date=str(end_date)
-            )
         
         if category not in category_totals:
             category_totals[category] = {'amount': Decimal('0'), 'count': 0}
@@ -190,7 +227,9 @@ def summary_report(request):
         'total_expense': float(total_expense),
         'net_cash_flow': float(net_cash_flow),
         'currency': currency,
-        'top_expense_categories': top_expense_categories
+        'top_expense_categories': top_expense_categories,
+        'rate_unavailable': bool(unavailable_currencies),
+        'unavailable_currencies': sorted(unavailable_currencies),
     }
     
     return Response(response_data, status=status.HTTP_200_OK)
@@ -241,10 +280,12 @@ def summary_report(request):
                     'converted_amount': openapi.Schema(type=openapi.TYPE_NUMBER),
                     'exchange_rate': openapi.Schema(type=openapi.TYPE_NUMBER),
                     'date': openapi.Schema(type=openapi.TYPE_STRING),
+                    'rate_unavailable': openapi.Schema(type=openapi.TYPE_BOOLEAN),
                 }
             )
         ),
         400: 'Bad Request',
+        503: 'Exchange rate unavailable',
     }
 )
 @api_view(['GET'])
@@ -300,6 +341,15 @@ def convert_currency_endpoint(request):
     from .currency_converter import get_exchange_rate
     exchange_rate = get_exchange_rate(from_currency, to_currency, date)
     
+    if exchange_rate is None:
+        return Response(
+            {
+                'error': f'Exchange rate for {from_currency}/{to_currency} is currently unavailable',
+                'rate_unavailable': True,
+            },
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
     converted_amount = convert_currency(amount, from_currency, to_currency, date)
     
     response_data = {
@@ -308,7 +358,8 @@ def convert_currency_endpoint(request):
         'to_currency': to_currency,
         'converted_amount': float(converted_amount),
         'exchange_rate': float(exchange_rate),
-        'date': date or 'latest'
+        'date': date or 'latest',
+        'rate_unavailable': False,
     }
     
     return Response(response_data, status=status.HTTP_200_OK)
@@ -1,20 +1,103 @@
+from collections import defaultdict
 from django.contrib import admin
-from .models import Transaction, ImportBatch
+from django.contrib.auth.models import User
+from django.db.models import Q
+from reports.currency_converter import get_supported_currencies
+from .balances import rebuild_balance_checkpoints
+from .models import Transaction, ImportBatch, TransactionArchive
+from .pagination import EstimatedCountPaginator
+from .search import search_transactions
+from .sync import record_changes
+from .utils import CATEGORIES
+from .versioning import bump_data_version
+
+
+class CategoryListFilter(admin.SimpleListFilter):
+    title = 'category'
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in CATEGORIES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(category=self.value())
+        return queryset
+
+
+class CurrencyListFilter(admin.SimpleListFilter):
+    title = 'currency'
+    parameter_name = 'currency'
+
+    def lookups(self, request, model_admin):
+        return [(code, code) for code in get_supported_currencies()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(currency=self.value())
+        return queryset
 
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('date', 'user', 'amount', 'currency', 'type', 'category', 'description')
-    list_filter = ('type', 'currency', 'category', 'date')
+    list_filter = ('type', CurrencyListFilter, CategoryListFilter)
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'import_batch')
+    date_hierarchy = 'date'
     search_fields = ('description', 'user__username', 'user__email')
+    search_help_text = 'Search descriptions, or enter an exact username or email'
     readonly_fields = ('unique_hash', 'created_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        user_ids = list(
+            User.objects.filter(Q(username=search_term) | Q(email__iexact=search_term)).values_list('id', flat=True)[:10]
+        )
+        if user_ids:
+            return queryset.filter(user_id__in=user_ids), False
+        return search_transactions(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        record_changes(obj.user_id, [obj.pk], 'update' if change else 'create')
+        rebuild_balance_checkpoints(obj.user_id)
+        bump_data_version(obj.user_id)
+
+    def delete_model(self, request, obj):
+        transaction_id = obj.pk
+        super().delete_model(request, obj)
+        record_changes(obj.user_id, [transaction_id], 'delete')
+        rebuild_balance_checkpoints(obj.user_id)
+        bump_data_version(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        deleted_ids = defaultdict(list)
+        for transaction_id, user_id in queryset.values_list('id', 'user_id'):
+            deleted_ids[user_id].append(transaction_id)
+        super().delete_queryset(request, queryset)
+        for user_id, transaction_ids in deleted_ids.items():
+            record_changes(user_id, transaction_ids, 'delete')
+            rebuild_balance_checkpoints(user_id)
+            bump_data_version(user_id)
 
 
 @admin.register(ImportBatch)
 class ImportBatchAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'filename', 'uploaded_at', 'total_rows', 'imported_rows', 'failed_rows')
+    list_display = ('id', 'user', 'filename', 'uploaded_at', 'total_rows', 'imported_rows', 'failed_rows', 'rolled_back_at')
     list_filter = ('uploaded_at',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
     search_fields = ('filename', 'user__username')
 
 
-
+@admin.register(TransactionArchive)
+class TransactionArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'start_date', 'end_date', 'row_count', 'format', 'created_at', 'restored_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('file_path', 'checksum', 'row_count', 'format', 'created_at', 'restored_at')
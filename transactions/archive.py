@@ -0,0 +1,283 @@
+import csv
+import gzip
+import hashlib
+import io
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import transaction as db_transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+from .models import DailyTransactionRollup, ImportBatch, Transaction, TransactionArchive
+from .partitioning import drop_empty_partitions
+from .sync import record_changes
+from .versioning import bump_data_version
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ARCHIVE_FIELDS = [
+    'id',
+    'date',
+    'amount',
+    'currency',
+    'description',
+    'type',
+    'category',
+    'unique_hash',
+    'import_batch_id',
+    'created_at',
+]
+
+CSV_PARSERS = {
+    'id': int,
+    'date': date.fromisoformat,
+    'amount': Decimal,
+    'import_batch_id': int,
+    'created_at': datetime.fromisoformat,
+}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def get_archive_storage():
+    return storages['transaction_archive']
+
+
+def archive_cutoff(today=None, months=None):
+    months = settings.TRANSACTION_ARCHIVE_AFTER_MONTHS if months is None else months
+    today = today or timezone.now().date()
+    month = today.year * 12 + today.month - 1 - months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def archive_format():
+    if settings.TRANSACTION_ARCHIVE_FORMAT == 'parquet' and pyarrow is not None:
+        return 'parquet'
+    return 'csv.gz'
+
+
+def archived_until(user_id):
+    return (
+        TransactionArchive.objects
+        .filter(user_id=user_id, restored_at__isnull=True)
+        .aggregate(end_date=Max('end_date'))['end_date']
+    )
+
+
+def _parquet_schema():
+    return pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('date', pyarrow.date32()),
+        ('amount', pyarrow.decimal128(12, 2)),
+        ('currency', pyarrow.string()),
+        ('description', pyarrow.string()),
+        ('type', pyarrow.string()),
+        ('category', pyarrow.string()),
+        ('unique_hash', pyarrow.string()),
+        ('import_batch_id', pyarrow.int64()),
+        ('created_at', pyarrow.timestamp('us', tz='UTC')),
+    ])
+
+
+def _write_parquet(rows, handle):
+    schema = _parquet_schema()
+    batch_size = settings.TRANSACTION_ARCHIVE_BATCH_SIZE
+    row_count = 0
+    with pyarrow.parquet.ParquetWriter(handle, schema, compression='zstd') as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                row_count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            row_count += len(batch)
+    return row_count
+
+
+def _write_csv(rows, handle):
+    row_count = 0
+    with gzip.GzipFile(fileobj=handle, mode='wb') as compressed:
+        text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(ARCHIVE_FIELDS)
+        for row in rows:
+            writer.writerow([
+                value.isoformat() if isinstance(value, (date, datetime)) else ('' if value is None else value)
+                for value in (row[field] for field in ARCHIVE_FIELDS)
+            ])
+            row_count += 1
+        text.flush()
+        text.detach()
+    return row_count
+
+
+def _read_csv(handle):
+    with gzip.GzipFile(fileobj=handle, mode='rb') as compressed:
+        for row in csv.DictReader(io.TextIOWrapper(compressed, encoding='utf-8', newline='')):
+            for field, value in row.items():
+                if value == '' and field in ('category', 'import_batch_id'):
+                    row[field] = None
+                elif field in CSV_PARSERS:
+                    row[field] = CSV_PARSERS[field](value)
+            yield row
+
+
+def _read_parquet(handle):
+    if pyarrow is None:
+        raise ArchiveError('pyarrow is required to read Parquet archives')
+    parquet_file = pyarrow.parquet.ParquetFile(handle)
+    for batch in parquet_file.iter_batches(batch_size=settings.TRANSACTION_ARCHIVE_BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+def iter_archive_rows(archive, start_date=None, end_date=None):
+    reader = _read_parquet if archive.format == 'parquet' else _read_csv
+    with get_archive_storage().open(archive.file_path, 'rb') as handle:
+        for row in reader(handle):
+            if start_date and row['date'] < start_date:
+                continue
+            if end_date and row['date'] > end_date:
+                continue
+            yield row
+
+
+def _checksum(handle):
+    digest = hashlib.sha256()
+    handle.seek(0)
+    for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+        digest.update(chunk)
+    handle.seek(0)
+    return digest.hexdigest()
+
+
+def archive_user_transactions(user, cutoff):
+    transactions = Transaction.objects.filter(user=user, date__lt=cutoff)
+    bounds = transactions.aggregate(max_id=Max('id'), start_date=Min('date'))
+    if bounds['max_id'] is None:
+        return None
+    # Rows imported after this point get higher ids and stay in the hot table.
+    transactions = transactions.filter(id__lte=bounds['max_id'])
+
+    archive_type = archive_format()
+    writer = _write_parquet if archive_type == 'parquet' else _write_csv
+    name = f"transactions/{user.id}/{bounds['start_date']:%Y%m%d}-{cutoff:%Y%m%d}-{timezone.now():%Y%m%d%H%M%S}.{archive_type}"
+    storage = get_archive_storage()
+
+    rows = transactions.order_by('date', 'id').values(*ARCHIVE_FIELDS).iterator(chunk_size=settings.TRANSACTION_ARCHIVE_BATCH_SIZE)
+    with tempfile.TemporaryFile() as handle:
+        row_count = writer(rows, handle)
+        checksum = _checksum(handle)
+        file_path = storage.save(name, File(handle, name=name))
+
+    try:
+        with db_transaction.atomic():
+            if transactions.count() != row_count:
+                raise ArchiveError(f'Transactions for user {user.id} changed while archiving')
+
+            archive = TransactionArchive.objects.create(
+                user=user,
+                start_date=bounds['start_date'],
+                end_date=cutoff - timedelta(days=1),
+                row_count=row_count,
+                file_path=file_path,
+                format=archive_type,
+                checksum=checksum
+            )
+            DailyTransactionRollup.objects.bulk_create(
+                [
+                    DailyTransactionRollup(archive=archive, user=user, **rollup)
+                    for rollup in (
+                        transactions
+                        .values('date', 'type', 'currency', 'category')
+                        .annotate(total=Sum('amount'), count=Count('id'))
+                        .order_by()
+                    )
+                ],
+                batch_size=1000
+            )
+
+            chunk_size = settings.TRANSACTION_ARCHIVE_DELETE_CHUNK_SIZE
+            while True:
+                transaction_ids = list(transactions.values_list('id', flat=True)[:chunk_size])
+                if not transaction_ids:
+                    break
+                Transaction.objects.filter(id__in=transaction_ids).delete()
+                record_changes(user.id, transaction_ids, 'delete')
+
+            db_transaction.on_commit(lambda: bump_data_version(user.id))
+    except Exception:
+        storage.delete(file_path)
+        raise
+
+    return archive
+
+
+def archive_old_transactions(cutoff=None):
+    cutoff = cutoff or archive_cutoff()
+    archives = []
+    failed_user_ids = []
+    user_ids = Transaction.objects.filter(date__lt=cutoff).values_list('user_id', flat=True).distinct()
+    for user in User.objects.filter(id__in=list(user_ids)):
+        try:
+            archive = archive_user_transactions(user, cutoff)
+        except Exception as e:
+            print(f"Error archiving transactions for user {user.id}: {e}")
+            failed_user_ids.append(user.id)
+            continue
+        if archive is not None:
+            archives.append(archive)
+
+    drop_empty_partitions(cutoff)
+    return archives, failed_user_ids
+
+
+def restore_archive(archive):
+    if archive.restored_at is not None:
+        raise ArchiveError(f'Archive {archive.id} was already restored')
+
+    batch_ids = set(ImportBatch.objects.filter(user=archive.user_id).values_list('id', flat=True))
+    chunk_size = settings.TRANSACTION_ARCHIVE_BATCH_SIZE
+    restored = 0
+
+    def insert(chunk):
+        Transaction.objects.bulk_create(chunk, ignore_conflicts=True)
+        # Rows skipped by ignore_conflicts are not in the table under their archived id.
+        inserted_ids = list(
+            Transaction.objects
+            .filter(user_id=archive.user_id, id__in=[transaction.id for transaction in chunk])
+            .values_list('id', flat=True)
+        )
+        record_changes(archive.user_id, inserted_ids, 'create')
+        return len(inserted_ids)
+
+    with db_transaction.atomic():
+        chunk = []
+        for row in iter_archive_rows(archive):
+            if row['import_batch_id'] not in batch_ids:
+                row['import_batch_id'] = None
+            chunk.append(Transaction(user_id=archive.user_id, **row))
+            if len(chunk) >= chunk_size:
+                restored += insert(chunk)
+                chunk = []
+        if chunk:
+            restored += insert(chunk)
+
+        archive.rollups.all().delete()
+        archive.restored_at = timezone.now()
+        archive.save(update_fields=['restored_at'])
+        db_transaction.on_commit(lambda: bump_data_version(archive.user_id))
+
+    return restored
@@ -0,0 +1,205 @@
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, transaction as db_transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import BalanceCheckpoint, DailyTransactionRollup, Transaction
+
+ZERO = Decimal('0.00')
+BALANCE_FIELD = DecimalField(max_digits=16, decimal_places=2)
+HISTORY_INTERVALS = ('day', 'month')
+BALANCE_LOCK_NAMESPACE = 0x62616C  # first key of pg_advisory_xact_lock(namespace, user_id)
+
+
+def signed_amount(field='amount'):
+    return Case(
+        When(type='credit', then=F(field)),
+        default=-F(field),
+        output_field=BALANCE_FIELD
+    )
+
+
+def month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def balance_deltas(rows):
+    deltas = defaultdict(Decimal)
+    for currency, day, transaction_type, amount in rows:
+        deltas[(currency, month_end(day))] += amount if transaction_type == 'credit' else -amount
+    return deltas
+
+
+def _net_sources(user_id):
+    return (
+        (Transaction.objects.filter(user_id=user_id), 'amount'),
+        (DailyTransactionRollup.objects.filter(user_id=user_id), 'total'),
+    )
+
+
+def lock_user_balances(user_id):
+    # Row locks only cover checkpoints that already exist, so a checkpoint
+    # created by a concurrent import would miss this import's update. One
+    # lock per user, held until commit, serialises all checkpoint writers.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [BALANCE_LOCK_NAMESPACE, user_id])
+
+
+def apply_balance_deltas(user_id, deltas):
+    # Runs inside the caller's transaction so the user's balance lock is
+    # held until the transactions themselves are committed.
+    if not deltas:
+        return
+
+    lock_user_balances(user_id)
+    currencies = {currency for currency, _ in deltas}
+    checkpoints = defaultdict(list)
+    for currency, day, balance in (
+        BalanceCheckpoint.objects
+        .filter(user_id=user_id, currency__in=currencies)
+        .order_by('currency', 'date')
+        .values_list('currency', 'date', 'balance')
+    ):
+        checkpoints[currency].append((day, balance))
+
+    # A month without a checkpoint had no rows, so it starts from the
+    # closest earlier checkpoint before this change is added.
+    missing = []
+    for currency, day in sorted(deltas):
+        existing = checkpoints[currency]
+        if any(checkpoint_date == day for checkpoint_date, _ in existing):
+            continue
+        previous = [balance for checkpoint_date, balance in existing if checkpoint_date < day]
+        missing.append(BalanceCheckpoint(
+            user_id=user_id,
+            currency=currency,
+            date=day,
+            balance=previous[-1] if previous else ZERO
+        ))
+    if missing:
+        BalanceCheckpoint.objects.bulk_create(missing, ignore_conflicts=True)
+
+    # Every checkpoint on or after a changed month moves by the sum of the
+    # changes up to it; one UPDATE covers all currencies and months.
+    affected = Q()
+    whens = []
+    for currency in currencies:
+        running = ZERO
+        thresholds = []
+        for day in sorted(day for delta_currency, day in deltas if delta_currency == currency):
+            running += deltas[(currency, day)]
+            thresholds.append((day, running))
+        affected |= Q(currency=currency, date__gte=thresholds[0][0])
+        for day, amount in reversed(thresholds):
+            whens.append(When(currency=currency, date__gte=day, then=Value(amount)))
+
+    BalanceCheckpoint.objects.filter(affected, user_id=user_id).update(
+        balance=F('balance') + Case(*whens, default=Value(ZERO), output_field=BALANCE_FIELD),
+        updated_at=timezone.now()
+    )
+
+
+def rebuild_balance_checkpoints(user_id):
+    with db_transaction.atomic():
+        lock_user_balances(user_id)
+        nets = defaultdict(Decimal)
+        for queryset, amount_field in _net_sources(user_id):
+            for row in (
+                queryset
+                .values('currency', month=TruncMonth('date'))
+                .annotate(net=Sum(signed_amount(amount_field)))
+                .order_by()
+            ):
+                nets[(row['currency'], month_end(row['month']))] += row['net']
+
+        checkpoints = []
+        balances = defaultdict(Decimal)
+        for currency, day in sorted(nets):
+            balances[currency] += nets[(currency, day)]
+            checkpoints.append(BalanceCheckpoint(user_id=user_id, currency=currency, date=day, balance=balances[currency]))
+
+        BalanceCheckpoint.objects.filter(user_id=user_id).delete()
+        BalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+    return len(checkpoints)
+
+
+def balances_at(user_id, day, currencies=None):
+    checkpoints = BalanceCheckpoint.objects.filter(user_id=user_id, date__lte=day)
+    if currencies:
+        checkpoints = checkpoints.filter(currency__in=currencies)
+    latest = checkpoints.filter(currency=OuterRef('currency')).order_by('-date').values('date')[:1]
+
+    balances = {}
+    since = {}
+    for currency, checkpoint_date, balance in (
+        checkpoints.filter(date=Subquery(latest)).values_list('currency', 'date', 'balance')
+    ):
+        balances[currency] = balance
+        since[currency] = checkpoint_date
+
+    # Only rows after each currency's checkpoint are summed.
+    after_checkpoint = ~Q(currency__in=list(since))
+    for currency, checkpoint_date in since.items():
+        after_checkpoint |= Q(currency=currency, date__gt=checkpoint_date)
+
+    for queryset, amount_field in _net_sources(user_id):
+        queryset = queryset.filter(after_checkpoint, date__lte=day)
+        if currencies:
+            queryset = queryset.filter(currency__in=currencies)
+        for row in queryset.values('currency').annotate(net=Sum(signed_amount(amount_field))).order_by():
+            balances[row['currency']] = balances.get(row['currency'], ZERO) + row['net']
+    return balances
+
+
+def running_balances(user_id, currency, start_date, end_date):
+    opening = balances_at(user_id, start_date - timedelta(days=1), [currency]).get(currency, ZERO)
+    rows = list(
+        Transaction.objects
+        .filter(user_id=user_id, currency=currency, date__gte=start_date, date__lte=end_date)
+        .annotate(running=Window(Sum(signed_amount()), order_by=[F('date').asc(), F('id').asc()]))
+        .order_by('date', 'id')
+        .values('id', 'date', 'amount', 'type', 'description', 'category', 'running')
+    )
+    for row in rows:
+        row['balance'] = opening + row.pop('running')
+    return opening, rows
+
+
+def balance_history(user_id, currency, start_date, end_date, interval='month'):
+    opening = balances_at(user_id, start_date - timedelta(days=1), [currency]).get(currency, ZERO)
+    points = []
+    balance = opening
+
+    if interval == 'month':
+        checkpoints = dict(
+            BalanceCheckpoint.objects
+            .filter(user_id=user_id, currency=currency, date__gte=start_date, date__lt=end_date)
+            .values_list('date', 'balance')
+        )
+        day = month_end(start_date)
+        while day < end_date:
+            balance = checkpoints.get(day, balance)
+            points.append((day, balance))
+            day = month_end(day + timedelta(days=1))
+        points.append((end_date, balances_at(user_id, end_date, [currency]).get(currency, ZERO)))
+        return opening, points
+
+    nets = defaultdict(Decimal)
+    for queryset, amount_field in _net_sources(user_id):
+        for day, net in (
+            queryset
+            .filter(currency=currency, date__gte=start_date, date__lte=end_date)
+            .values('date')
+            .annotate(net=Sum(signed_amount(amount_field)))
+            .values_list('date', 'net')
+            .order_by()
+        ):
+            nets[day] += net
+    for day in sorted(nets):
+        balance += nets[day]
+        points.append((day, balance))
+    return opening, points
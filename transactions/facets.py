@@ -0,0 +1,86 @@
+import hashlib
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from .utils import UNCATEGORIZED
+from .versioning import get_data_version
+
+FACET_FIELDS = ['type', 'currency', 'category', 'month']
+IGNORED_FACET_PARAMS = ['cursor', 'page_size', 'ordering', 'include_count', 'target_currency']
+
+
+def build_facets(queryset):
+    rows = (
+        queryset
+        .order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('type', 'currency', 'category', 'month')
+        .annotate(count=Count('id'), total=Sum('amount'))
+    )
+
+    counts = {field: defaultdict(int) for field in FACET_FIELDS}
+    totals = {field: defaultdict(lambda: defaultdict(Decimal)) for field in FACET_FIELDS}
+    total_count = 0
+
+    for row in rows:
+        total_count += row['count']
+        values = {
+            'type': row['type'],
+            'currency': row['currency'],
+            'category': row['category'] or UNCATEGORIZED,
+            'month': row['month'].strftime('%Y-%m'),
+        }
+        for field, value in values.items():
+            counts[field][value] += row['count']
+            totals[field][value][row['currency']] += row['total'] or Decimal('0')
+
+    facets = {}
+    for field in FACET_FIELDS:
+        facets[field] = [
+            {
+                'value': value,
+                'count': count,
+                'totals': {
+                    currency: str(total.quantize(Decimal('0.01')))
+                    for currency, total in sorted(totals[field][value].items())
+                },
+            }
+            for value, count in sorted(counts[field].items(), key=lambda item: (-item[1], item[0]))
+        ]
+    facets['month'].sort(key=lambda facet: facet['value'], reverse=True)
+
+    return {'total_count': total_count, 'facets': facets}
+
+
+def _facets_cache_key(user_id, version, params):
+    filters = sorted(
+        (key, value)
+        for key, value in params.items()
+        if key not in IGNORED_FACET_PARAMS and value
+    )
+    digest = hashlib.sha1(repr(filters).encode()).hexdigest()
+    return f'transaction_facets_{user_id}_{version}_{digest}'
+
+
+def get_transaction_facets(queryset, user_id, params):
+    version = get_data_version(user_id)
+    if version is None:
+        return build_facets(queryset)
+
+    cache_key = _facets_cache_key(user_id, version, params)
+    try:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    except Exception:
+        pass
+
+    facets = build_facets(queryset)
+    try:
+        cache.set(cache_key, facets, settings.TRANSACTION_FACETS_CACHE_TTL)
+    except Exception:
+        pass
+    return facets
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from transactions.archive import ArchiveError, archive_cutoff, archive_old_transactions, restore_archive
+from transactions.models import TransactionArchive
+
+
+class Command(BaseCommand):
+    help = 'Move transactions older than the archive cutoff into compressed files, or restore an archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Archive transactions older than this many months (default: TRANSACTION_ARCHIVE_AFTER_MONTHS)')
+        parser.add_argument('--restore', type=int, metavar='ARCHIVE_ID', help='Load an archive back into the transactions table')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            archive = TransactionArchive.objects.filter(pk=options['restore']).first()
+            if archive is None:
+                raise CommandError(f"Archive {options['restore']} not found")
+            try:
+                restored = restore_archive(archive)
+            except ArchiveError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} transactions from archive {archive.id}'))
+            return
+
+        cutoff = archive_cutoff(months=options['months'])
+        archives, failed_user_ids = archive_old_transactions(cutoff)
+        for archive in archives:
+            self.stdout.write(f'User {archive.user_id}: {archive.row_count} transactions -> {archive.file_path}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {sum(archive.row_count for archive in archives)} transactions older than {cutoff}'
+        ))
+        if failed_user_ids:
+            raise CommandError(f"Archiving failed for users: {', '.join(map(str, failed_user_ids))}")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from transactions.partitioning import (
+    INTERVALS,
+    PartitioningError,
+    ensure_partitions,
+    is_partitioned,
+    partition_transactions_table,
+)
+
+
+class Command(BaseCommand):
+    help = 'Range-partition the transactions table by date on PostgreSQL and create upcoming partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild the existing unpartitioned table as a partitioned table (locks the table while copying)'
+        )
+        parser.add_argument('--interval', choices=INTERVALS, help='Partition size (default: TRANSACTION_PARTITION_INTERVAL)')
+        parser.add_argument('--ahead', type=int, help='Partitions to create ahead of today (default: TRANSACTION_PARTITIONS_AHEAD)')
+
+    def handle(self, *args, **options):
+        try:
+            if options['convert']:
+                partition_transactions_table(interval=options['interval'], ahead=options['ahead'])
+                self.stdout.write(self.style.SUCCESS('Transactions table is now partitioned by date'))
+            elif not is_partitioned():
+                raise CommandError('Transactions table is not partitioned. Run with --convert on PostgreSQL first.')
+            created = ensure_partitions(ahead=options['ahead'], interval=options['interval'])
+        except PartitioningError as e:
+            raise CommandError(str(e))
+
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+        self.stdout.write(f'{len(created)} partitions created')
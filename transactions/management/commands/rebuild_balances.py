@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from transactions.balances import rebuild_balance_checkpoints
+from transactions.models import DailyTransactionRollup, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Recompute month-end balance checkpoints from transactions and archived rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or sorted(
+            set(Transaction.objects.values_list('user_id', flat=True).distinct())
+            | set(DailyTransactionRollup.objects.values_list('user_id', flat=True).distinct())
+        )
+        total = 0
+        for user_id in user_ids:
+            total += rebuild_balance_checkpoints(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} balance checkpoints'))
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+POSTGRES_SEARCH_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """CREATE INDEX IF NOT EXISTS transaction_description_fts_idx
+        ON transactions_transaction
+        USING gin (to_tsvector('simple'::regconfig, COALESCE(description, '')))""",
+    """CREATE INDEX IF NOT EXISTS transaction_description_trgm_idx
+        ON transactions_transaction
+        USING gin (description gin_trgm_ops)""",
+]
+
+POSTGRES_DROP_SEARCH_SQL = [
+    'DROP INDEX IF EXISTS transaction_description_trgm_idx',
+    'DROP INDEX IF EXISTS transaction_description_fts_idx',
+]
+
+SQLITE_SEARCH_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_transaction_fts
+        USING fts5(description, content='transactions_transaction', content_rowid='id', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_insert
+        AFTER INSERT ON transactions_transaction BEGIN
+            INSERT INTO transactions_transaction_fts(rowid, description) VALUES (new.id, new.description);
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_delete
+        AFTER DELETE ON transactions_transaction BEGIN
+            INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_transaction_fts_update
+        AFTER UPDATE OF description ON transactions_transaction BEGIN
+            INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO transactions_transaction_fts(rowid, description) VALUES (new.id, new.description);
+        END""",
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SEARCH_SQL = [
+    'DROP TRIGGER IF EXISTS transactions_transaction_fts_update',
+    'DROP TRIGGER IF EXISTS transactions_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS transactions_transaction_fts_insert',
+    'DROP TABLE IF EXISTS transactions_transaction_fts',
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_SEARCH_SQL, 'sqlite': SQLITE_SEARCH_SQL})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_DROP_SEARCH_SQL, 'sqlite': SQLITE_DROP_SEARCH_SQL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_transaction_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
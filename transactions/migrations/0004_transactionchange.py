@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_CHANGES_SQL = """
+    INSERT INTO transactions_transactionchange (user_id, transaction_id, op, changed_at)
+    SELECT user_id, id, 'create', created_at
+    FROM transactions_transaction
+    ORDER BY id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0003_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('transaction_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['user', 'seq'], name='transaction_change_user_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_CHANGES_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_transactionchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='rolled_back_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='rolled_back_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_importbatch_rollback'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='transaction_date_keyset_idx'),
+        ),
+    ]
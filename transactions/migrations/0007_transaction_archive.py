@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0006_transaction_date_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('row_count', models.IntegerField(default=0)),
+                ('file_path', models.CharField(max_length=500)),
+                ('format', models.CharField(choices=[('parquet', 'Parquet'), ('csv.gz', 'Gzip CSV')], max_length=10)),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('restored_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_archives', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-end_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(choices=[('credit', 'Credit'), ('debit', 'Debit')], max_length=10)),
+                ('currency', models.CharField(max_length=3)),
+                ('category', models.CharField(blank=True, max_length=100, null=True)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('count', models.IntegerField()),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='transactions.transactionarchive')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='transaction_rollup_user_idx')],
+            },
+        ),
+    ]
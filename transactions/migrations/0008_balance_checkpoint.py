@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+import calendar
+from collections import defaultdict
+from decimal import Decimal
+
+
+def backfill_checkpoints(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    DailyTransactionRollup = apps.get_model('transactions', 'DailyTransactionRollup')
+    BalanceCheckpoint = apps.get_model('transactions', 'BalanceCheckpoint')
+
+    nets = defaultdict(Decimal)
+    for model, amount_field in ((Transaction, 'amount'), (DailyTransactionRollup, 'total')):
+        signed = models.Case(
+            models.When(type='credit', then=models.F(amount_field)),
+            default=-models.F(amount_field),
+            output_field=models.DecimalField(max_digits=16, decimal_places=2)
+        )
+        for row in (
+            model.objects
+            .values('user_id', 'currency', month=TruncMonth('date'))
+            .annotate(net=models.Sum(signed))
+            .order_by()
+        ):
+            month = row['month']
+            month_end = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+            nets[(row['user_id'], row['currency'], month_end)] += row['net']
+
+    checkpoints = []
+    balances = defaultdict(Decimal)
+    for user_id, currency, day in sorted(nets):
+        balances[(user_id, currency)] += nets[(user_id, currency, day)]
+        checkpoints.append(BalanceCheckpoint(
+            user_id=user_id,
+            currency=currency,
+            date=day,
+            balance=balances[(user_id, currency)]
+        ))
+    BalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0007_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['currency', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='balancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('user', 'currency', 'date'), name='balance_checkpoint_unique'),
+        ),
+        migrations.RunPython(backfill_checkpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:05
+
+from django.db import migrations, models
+
+
+def copy_seq(apps, schema_editor):
+    TransactionChange = apps.get_model('transactions', 'TransactionChange')
+    TransactionChange.objects.update(seq=models.F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_balance_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transactionchange',
+            name='transaction_change_user_idx',
+        ),
+        migrations.RenameField(
+            model_name='transactionchange',
+            old_name='seq',
+            new_name='id',
+        ),
+        migrations.AddField(
+            model_name='transactionchange',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        # Existing sync tokens carry the old sequence numbers, so they stay valid.
+        migrations.RunPython(copy_seq, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transactionchange',
+            index=models.Index(fields=['user', 'seq'], name='transaction_change_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionchange',
+            index=models.Index(condition=models.Q(('seq__isnull', True)), fields=['id'], name='transaction_change_pending_idx'),
+        ),
+    ]
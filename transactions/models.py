@@ -13,6 +13,8 @@ class ImportBatch(models.Model):
     imported_rows = models.IntegerField(default=0)
     failed_rows = models.IntegerField(default=0)
     idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    rolled_back_at = models.DateTimeField(null=True, blank=True)
+    rolled_back_rows = models.IntegerField(default=0)
 
     class Meta:
         ordering = ['-uploaded_at']
@@ -41,7 +43,8 @@ class Transaction(models.Model):
     class Meta:
         ordering = ['-date', '-created_at']
         indexes = [
-            models.Index(fields=['user', 'date']),
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='transaction_user_keyset_idx'),
+            models.Index(fields=['-date', '-created_at', '-id'], name='transaction_date_keyset_idx'),
             models.Index(fields=['user', 'type']),
             models.Index(fields=['user', 'category']),
         ]
@@ -66,4 +69,87 @@ class Transaction(models.Model):
         super().save(*args, **kwargs)
 
 
+class TransactionChange(models.Model):
+    OPERATIONS = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Assigned after commit by sync.sequence_changes, so the sync cursor
+    # only ever moves past changes that are already visible.
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_changes')
+    transaction_id = models.BigIntegerField()
+    op = models.CharField(max_length=10, choices=OPERATIONS)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='transaction_change_user_idx'),
+            models.Index(fields=['id'], condition=models.Q(seq__isnull=True), name='transaction_change_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seq} - {self.op} {self.transaction_id}"
+
+
+class TransactionArchive(models.Model):
+    FORMATS = [
+        ('parquet', 'Parquet'),
+        ('csv.gz', 'Gzip CSV'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_archives')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    row_count = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500)
+    format = models.CharField(max_length=10, choices=FORMATS)
+    checksum = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    restored_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-end_date']
+
+    def __str__(self):
+        return f"Archive {self.id} - {self.start_date} / {self.end_date}"
 
+
+class DailyTransactionRollup(models.Model):
+    archive = models.ForeignKey(TransactionArchive, on_delete=models.CASCADE, related_name='rollups')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_rollups')
+    date = models.DateField()
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    currency = models.CharField(max_length=3)
+    category = models.CharField(max_length=100, blank=True, null=True)
+    total = models.DecimalField(max_digits=16, decimal_places=2)
+    count = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='transaction_rollup_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.type} {self.total} {self.currency}"
+
+
+class BalanceCheckpoint(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_checkpoints')
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=16, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['currency', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency', 'date'], name='balance_checkpoint_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.balance} {self.currency}"
@@ -0,0 +1,188 @@
+import base64
+import hashlib
+import json
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+KeysetCursor = namedtuple('KeysetCursor', ['position', 'reverse'])
+
+
+def estimate_count(queryset):
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    cache_key = 'transaction_count_' + hashlib.sha1(f'{sql}{params}'.encode()).hexdigest()
+    try:
+        count = cache.get(cache_key)
+        if count is not None:
+            return count
+    except Exception:
+        pass
+
+    count = queryset.count()
+    try:
+        cache.set(cache_key, count, settings.TRANSACTION_COUNT_CACHE_TTL)
+    except Exception:
+        pass
+    return count
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+def _serialize_position_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, int):
+        return value
+    return str(value)
+
+
+class TransactionCursorPagination(CursorPagination):
+    ordering = ('-date', '-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    count_query_param = 'include_count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = estimate_count(queryset)
+
+        reverse = self.cursor.reverse if self.cursor else False
+        if reverse:
+            queryset = queryset.order_by(*[self._invert(field) for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.cursor:
+            queryset = queryset.filter(self.keyset_filter(self.cursor.position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_keyset_ordering(self, request, queryset, view):
+        ordering = list(self.get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def keyset_filter(self, position, reverse):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for previous_index, previous_field in enumerate(self.ordering[:index]):
+                clause &= Q(**{previous_field.lstrip('-'): position[previous_index]})
+            condition |= clause
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(KeysetCursor(self._position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(KeysetCursor(self._position(self.page[0]), True))
+
+    def decode_cursor(self, request, queryset=None):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if payload['o'] != list(self.ordering):
+                raise ValueError('Cursor ordering does not match')
+            position = [
+                self._to_python(queryset, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, payload['p'])
+            ]
+            if len(position) != len(self.ordering):
+                raise ValueError('Cursor position does not match')
+            return KeysetCursor(position, bool(payload['r']))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        payload = {
+            'o': list(self.ordering),
+            'p': [_serialize_position_value(value) for value in cursor.position],
+            'r': int(cursor.reverse),
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['results'] = data
+        return Response(response_data)
+
+    @staticmethod
+    def _to_python(queryset, name, value):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field.to_python(value)
+        return queryset.model._meta.get_field(name).to_python(value)
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return [row[field.lstrip('-')] for field in self.ordering]
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
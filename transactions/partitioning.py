@@ -0,0 +1,222 @@
+import re
+from datetime import date
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+from .models import Transaction
+
+PARENT_TABLE = Transaction._meta.db_table
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+LEGACY_TABLE = f'{PARENT_TABLE}_unpartitioned'
+PARTITION_KEY = 'date'
+INTERVALS = ('month', 'year')
+
+MONTHLY_NAME = re.compile(rf'^{PARENT_TABLE}_p\d{{4}}_\d{{2}}$')
+YEARLY_NAME = re.compile(rf'^{PARENT_TABLE}_p\d{{4}}$')
+PARTITION_NAME = re.compile(rf'^{PARENT_TABLE}_p(\d{{4}})(?:_(\d{{2}}))?$')
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_range(day, interval):
+    if interval == 'month':
+        start = day.replace(day=1)
+        return start, _add_months(start, 1), f'{PARENT_TABLE}_p{start:%Y_%m}'
+    if interval == 'year':
+        start = date(day.year, 1, 1)
+        return start, date(day.year + 1, 1, 1), f'{PARENT_TABLE}_p{start:%Y}'
+    raise PartitioningError(f"Unknown partition interval: {interval}. Use one of {', '.join(INTERVALS)}")
+
+
+def partition_ranges(start, end, interval):
+    ranges = []
+    day = start
+    while day <= end:
+        partition = partition_range(day, interval)
+        ranges.append(partition)
+        day = partition[1]
+    return ranges
+
+
+def _ahead_end(today, interval, ahead):
+    if interval == 'month':
+        return _add_months(today, ahead)
+    return date(today.year + ahead, 1, 1)
+
+
+def is_partitioned(using=None):
+    using = using or connection
+    if using.vendor != 'postgresql':
+        return False
+    with using.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [PARENT_TABLE])
+        return cursor.fetchone() is not None
+
+
+def existing_partitions(cursor):
+    cursor.execute(
+        """SELECT child.relname FROM pg_inherits
+           JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+           WHERE pg_inherits.inhparent = to_regclass(%s)""",
+        [PARENT_TABLE]
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def detect_interval(partitions):
+    if any(MONTHLY_NAME.match(name) for name in partitions):
+        return 'month'
+    if any(YEARLY_NAME.match(name) for name in partitions):
+        return 'year'
+    return settings.TRANSACTION_PARTITION_INTERVAL
+
+
+def create_partition(cursor, start, end, name):
+    quote = connection.ops.quote_name
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s)',
+        [start, end]
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE {quote(name)} PARTITION OF {quote(PARENT_TABLE)} FOR VALUES {bounds}')
+        return
+
+    # Rows for this range landed in the default partition: move them into a
+    # standalone table first, then attach it so the range check passes.
+    cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(PARENT_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s RETURNING *) '
+        f'INSERT INTO {quote(name)} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(f'ALTER TABLE {quote(PARENT_TABLE)} ATTACH PARTITION {quote(name)} FOR VALUES {bounds}')
+
+
+def ensure_partitions(ahead=None, interval=None, today=None):
+    if not is_partitioned():
+        return []
+
+    ahead = settings.TRANSACTION_PARTITIONS_AHEAD if ahead is None else ahead
+    today = today or timezone.now().date()
+    created = []
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        partitions = existing_partitions(cursor)
+        interval = interval or detect_interval(partitions)
+        for start, end, name in partition_ranges(today, _ahead_end(today, interval, ahead), interval):
+            if name not in partitions:
+                create_partition(cursor, start, end, name)
+                created.append(name)
+    return created
+
+
+def drop_empty_partitions(before):
+    if not is_partitioned():
+        return []
+
+    quote = connection.ops.quote_name
+    dropped = []
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        for name in sorted(existing_partitions(cursor)):
+            match = PARTITION_NAME.match(name)
+            if not match:
+                continue
+            year, month = match.groups()
+            interval = 'month' if month else 'year'
+            start, end, _ = partition_range(date(int(year), int(month or 1), 1), interval)
+            if end > before:
+                continue
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {quote(name)})')
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(f'DROP TABLE {quote(name)}')
+            dropped.append(name)
+    return dropped
+
+
+def _table_definition(cursor):
+    cursor.execute(
+        """SELECT pg_get_indexdef(indexrelid) FROM pg_index
+           WHERE indrelid = to_regclass(%s)
+           AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE pg_constraint.conindid = pg_index.indexrelid)""",
+        [PARENT_TABLE]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        """SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint
+           WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f', 'c')""",
+        [PARENT_TABLE]
+    )
+    constraints = []
+    for name, kind, definition in cursor.fetchall():
+        if kind in ('p', 'u') and PARTITION_KEY not in re.findall(r'\w+', definition):
+            # Unique keys on a partitioned table must include the partition key.
+            # unique_hash already covers the date, so (unique_hash, date) is as strict.
+            definition = re.sub(r'\)\s*$', f', {PARTITION_KEY})', definition)
+        constraints.append((name, definition))
+    return indexes, constraints
+
+
+def partition_transactions_table(interval=None, ahead=None):
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Transaction partitioning requires PostgreSQL')
+    if is_partitioned():
+        raise PartitioningError(f'{PARENT_TABLE} is already partitioned')
+
+    interval = interval or settings.TRANSACTION_PARTITION_INTERVAL
+    ahead = settings.TRANSACTION_PARTITIONS_AHEAD if ahead is None else ahead
+    quote = connection.ops.quote_name
+    sequence = f'{PARENT_TABLE}_id_seq'
+
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        # Deferred foreign key checks queued on the old table would block
+        # dropping it, so run them now.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE {quote(PARENT_TABLE)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            'SELECT conrelid::regclass::text FROM pg_constraint WHERE confrelid = to_regclass(%s)',
+            [PARENT_TABLE]
+        )
+        referencing = [row[0] for row in cursor.fetchall()]
+        if referencing:
+            raise PartitioningError(f"Tables reference {PARENT_TABLE} by foreign key: {', '.join(referencing)}")
+
+        indexes, constraints = _table_definition(cursor)
+        cursor.execute(f'SELECT MIN({PARTITION_KEY}), MAX({PARTITION_KEY}) FROM {quote(PARENT_TABLE)}')
+        first_day, last_day = cursor.fetchone()
+        today = timezone.now().date()
+        first_day = min(first_day or today, today)
+        last_day = max(last_day or today, _ahead_end(today, interval, ahead))
+
+        cursor.execute(f'ALTER TABLE {quote(PARENT_TABLE)} RENAME TO {quote(LEGACY_TABLE)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(PARENT_TABLE)} (LIKE {quote(LEGACY_TABLE)} INCLUDING DEFAULTS INCLUDING STORAGE) '
+            f'PARTITION BY RANGE ({PARTITION_KEY})'
+        )
+        for start, end, name in partition_ranges(first_day, last_day, interval):
+            cursor.execute(
+                f"CREATE TABLE {quote(name)} PARTITION OF {quote(PARENT_TABLE)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        cursor.execute(f'CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {quote(PARENT_TABLE)} DEFAULT')
+        cursor.execute(f'INSERT INTO {quote(PARENT_TABLE)} SELECT * FROM {quote(LEGACY_TABLE)}')
+        cursor.execute(f'DROP TABLE {quote(LEGACY_TABLE)}')
+
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE {quote(PARENT_TABLE)} ADD CONSTRAINT {quote(name)} {definition}')
+        for definition in indexes:
+            cursor.execute(definition)
+
+        cursor.execute(f'CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(PARENT_TABLE)}.id')
+        cursor.execute(f'SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {quote(PARENT_TABLE)}), 0) + 1, false)', [sequence])
+        cursor.execute(f"ALTER TABLE {quote(PARENT_TABLE)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {quote(PARENT_TABLE)}')
@@ -0,0 +1,67 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+SEARCH_CONFIG = 'simple'
+SQLITE_FTS_TABLE = 'transactions_transaction_fts'
+SQLITE_MIN_TERM_LENGTH = 3
+
+
+def _sqlite_match_expression(term):
+    tokens = [token for token in term.split() if len(token) >= SQLITE_MIN_TERM_LENGTH]
+    if not tokens:
+        return None
+    return ' '.join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+def search_transactions(queryset, term):
+    term = term.strip()
+    if not term:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    table = queryset.model._meta.db_table
+
+    if vendor == 'postgresql':
+        query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+        vector = SearchVector('description', config=SEARCH_CONFIG)
+        return (
+            queryset
+            .annotate(search_vector=vector)
+            .filter(Q(search_vector=query) | Q(description__trigram_word_similar=term))
+            .annotate(search_rank=SearchRank(F('search_vector'), query) + TrigramWordSimilarity(term, 'description'))
+        )
+
+    if vendor == 'sqlite':
+        match = _sqlite_match_expression(term)
+        if match is not None:
+            for token in term.split():
+                if len(token) < SQLITE_MIN_TERM_LENGTH:
+                    queryset = queryset.filter(description__icontains=token)
+            return (
+                queryset
+                .filter(id__in=RawSQL(f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s', [match]))
+                .annotate(search_rank=RawSQL(
+                    f'SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} '
+                    f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND {SQLITE_FTS_TABLE}.rowid = "{table}"."id"',
+                    [match],
+                    output_field=FloatField()
+                ))
+            )
+
+    return queryset.filter(description__icontains=term).annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+
+class TransactionSearchFilter(filters.SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '')
+        return search_transactions(queryset, term)
+
+
+class TransactionOrderingFilter(filters.OrderingFilter):
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(TransactionSearchFilter.search_param, '').strip():
+            return ['-search_rank', '-id']
+        return super().get_default_ordering(view)
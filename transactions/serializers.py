@@ -1,37 +1,122 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Transaction, ImportBatch
+from .models import Transaction, ImportBatch, TransactionArchive
+
+CENT = Decimal('0.01')
+
+
+class TransactionListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return self.child.serialize_rows([transaction_row(instance) for instance in iterable])
 
 
 class TransactionSerializer(serializers.ModelSerializer):
-    converted_amount = serializers.SerializerMethodField()
-    converted_currency = serializers.SerializerMethodField()
+    converted_amount = serializers.FloatField(read_only=True, allow_null=True)
+    converted_currency = serializers.CharField(read_only=True, allow_null=True)
+    rate_unavailable = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Transaction
-        fields = ('id', 'date', 'amount', 'currency', 'converted_amount', 'converted_currency', 'description', 'type', 'category', 'created_at')
-        read_only_fields = ('id', 'created_at', 'converted_amount', 'converted_currency')
+        fields = ('id', 'date', 'amount', 'currency', 'converted_amount', 'converted_currency', 'rate_unavailable', 'description', 'type', 'category', 'created_at')
+        read_only_fields = ('id', 'created_at', 'converted_amount', 'converted_currency', 'rate_unavailable')
+        list_serializer_class = TransactionListSerializer
     
-    def get_converted_amount(self, obj):
-        request = self.context.get('request')
-        if request and hasattr(request, 'target_currency') and request.target_currency:
-            from reports.currency_converter import convert_currency
-            try:
-                return float(convert_currency(obj.amount, obj.currency, request.target_currency, date=str(obj.date)))
-            except Exception:
-                return None
-        return None
+    def to_representation(self, instance):
+        return self.serialize_rows([transaction_row(instance)])[0]
     
-    def get_converted_currency(self, obj):
+    def serialize_rows(self, rows):
         request = self.context.get('request')
-        if request and hasattr(request, 'target_currency') and request.target_currency:
-            return request.target_currency
+        target_currency = getattr(request, 'target_currency', None)
+        return serialize_transaction_rows(
+            rows,
+            TRANSACTION_FIELDS,
+            target_currency,
+            convert_transaction_rows(rows, TRANSACTION_FIELDS, target_currency)
+        )
+
+
+TRANSACTION_FIELDS = TransactionSerializer.Meta.fields
+TRANSACTION_VALUE_FIELDS = ('id', 'date', 'amount', 'currency', 'description', 'type', 'category', 'created_at')
+
+
+def parse_requested_fields(value):
+    if not value:
+        return TRANSACTION_FIELDS
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(TRANSACTION_FIELDS)
+    if unknown:
+        raise serializers.ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+    return tuple(name for name in TRANSACTION_FIELDS if name in requested)
+
+
+def transaction_value_fields(fields, extra_fields=()):
+    value_fields = {'id', 'date', 'amount', 'currency', 'created_at'}
+    value_fields.update(name for name in fields if name in TRANSACTION_VALUE_FIELDS)
+    value_fields.update(extra_fields)
+    return sorted(value_fields)
+
+
+def transaction_row(instance):
+    return {name: getattr(instance, name) for name in TRANSACTION_VALUE_FIELDS}
+
+
+def convert_transaction_rows(rows, fields, target_currency):
+    if not target_currency or not any(name in fields for name in ('converted_amount', 'rate_unavailable')):
         return None
+    from reports.currency_converter import convert_many
+    converted = convert_many(
+        [row['amount'] for row in rows],
+        [row['currency'] for row in rows],
+        [row['date'] for row in rows],
+        target_currency
+    )
+    return {row['id']: amount for row, amount in zip(rows, converted)}
+
+
+def serialize_transaction_rows(rows, fields, target_currency=None, converted_amounts=None):
+    created_at_field = serializers.DateTimeField(
+        default_timezone=timezone.get_current_timezone() if settings.USE_TZ else None
+    )
+    mappers = {
+        'id': lambda row: row['id'],
+        'date': lambda row: row['date'].isoformat(),
+        'amount': lambda row: str(row['amount'].quantize(CENT)),
+        'currency': lambda row: row['currency'],
+        'description': lambda row: row['description'],
+        'type': lambda row: row['type'],
+        'category': lambda row: row['category'],
+        'created_at': lambda row: created_at_field.to_representation(row['created_at']),
+    }
+    if target_currency:
+        converted_amounts = converted_amounts or {}
+        mappers['converted_amount'] = lambda row: (
+            float(converted_amounts[row['id']]) if converted_amounts.get(row['id']) is not None else None
+        )
+        mappers['converted_currency'] = lambda row: target_currency
+        mappers['rate_unavailable'] = lambda row: converted_amounts.get(row['id']) is None
+    else:
+        mappers['converted_amount'] = lambda row: None
+        mappers['converted_currency'] = lambda row: None
+        mappers['rate_unavailable'] = lambda row: False
+
+    field_mappers = [(name, mappers[name]) for name in fields]
+    return [{name: mapper(row) for name, mapper in field_mappers} for row in rows]
 
 
 class ImportBatchSerializer(serializers.ModelSerializer):
     class Meta:
         model = ImportBatch
-        fields = ('id', 'uploaded_at', 'filename', 'total_rows', 'imported_rows', 'failed_rows')
+        fields = ('id', 'uploaded_at', 'filename', 'total_rows', 'imported_rows', 'failed_rows', 'rolled_back_at', 'rolled_back_rows')
+
+
+class TransactionArchiveSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TransactionArchive
+        fields = ('id', 'start_date', 'end_date', 'row_count', 'format', 'created_at', 'restored_at')
 
 
 
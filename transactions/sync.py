@@ -0,0 +1,76 @@
+import base64
+from django.db import connection, transaction as db_transaction
+from django.db.models import F, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+from .models import TransactionChange
+
+SEQUENCE_LOCK_ID = 0x7472616E73  # pg_advisory_xact_lock key for sequence_changes
+
+
+def encode_sync_token(seq):
+    return base64.urlsafe_b64encode(f'seq:{seq}'.encode()).decode('ascii').rstrip('=')
+
+
+def decode_sync_token(token):
+    if not token:
+        return 0
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        prefix, seq = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split(':')
+        if prefix != 'seq' or int(seq) < 0:
+            raise ValueError(token)
+        return int(seq)
+    except (ValueError, UnicodeError):
+        raise ValidationError({'since': 'Invalid sync token'})
+
+
+def record_changes(user_id, transaction_ids, op):
+    TransactionChange.objects.bulk_create(
+        [TransactionChange(user_id=user_id, transaction_id=transaction_id, op=op) for transaction_id in transaction_ids],
+        batch_size=1000
+    )
+    db_transaction.on_commit(sequence_changes)
+
+
+def sequence_changes():
+    # Changes are numbered only once committed, one sequencer at a time, so
+    # every seq a reader can see is lower than any seq handed out later. A
+    # cursor can then never move past a change that commits afterwards.
+    pending = TransactionChange.objects.filter(seq__isnull=True)
+    if not pending.exists():
+        return
+
+    with db_transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SEQUENCE_LOCK_ID])
+        last_seq = Coalesce(
+            Subquery(TransactionChange.objects.filter(seq__isnull=False).order_by('-seq').values('seq')[:1]),
+            Value(0)
+        )
+        first_pending = Subquery(pending.order_by('id').values('id')[:1])
+        # One statement numbers everything committed so far after the last seq,
+        # keeping insertion order within and across transactions.
+        pending.update(seq=F('id') - first_pending + last_seq + 1)
+
+
+def get_changes(user, since, limit):
+    sequence_changes()
+    changes = list(
+        TransactionChange.objects
+        .filter(user=user, seq__gt=since)
+        .order_by('seq')
+        .values_list('seq', 'transaction_id', 'op')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    latest_ops = {}
+    for _, transaction_id, op in changes:
+        latest_ops[transaction_id] = op
+
+    upserted_ids = [transaction_id for transaction_id, op in latest_ops.items() if op != 'delete']
+    deleted_ids = [transaction_id for transaction_id, op in latest_ops.items() if op == 'delete']
+    next_seq = changes[-1][0] if changes else since
+    return upserted_ids, deleted_ids, next_seq, has_more
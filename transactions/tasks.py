@@ -0,0 +1,23 @@
+from celery import shared_task
+from django.conf import settings
+from . import archive
+from .partitioning import ensure_partitions, is_partitioned
+
+
+@shared_task
+def ensure_transaction_partitions():
+    if not is_partitioned():
+        return "Transactions table is not partitioned; run partition_transactions --convert first"
+    created = ensure_partitions()
+    return f"Created {len(created)} transaction partitions"
+
+
+@shared_task
+def archive_old_transactions():
+    if not settings.TRANSACTION_ARCHIVE_ENABLED:
+        return "Transaction archiving is disabled (TRANSACTION_ARCHIVE_ENABLED)"
+    archives, failed_user_ids = archive.archive_old_transactions()
+    message = f"Archived {sum(item.row_count for item in archives)} transactions into {len(archives)} archives"
+    if failed_user_ids:
+        message += f"; failed for users {', '.join(map(str, failed_user_ids))}"
+    return message
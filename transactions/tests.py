@@ -1,13 +1,31 @@
-from django.test import TestCase
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from datetime import date, timedelta
+from django.utils import timezone
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from .models import Transaction, ImportBatch
+from .utils import CATEGORIES
 import io
 import csv
+import os
+
+
+class CSVUploadMixin:
+    """Post CSV rows (without the header) to the upload endpoint as self.client"""
+    
+    def upload(self, rows, idempotency_key=None):
+        csv_content = "date,amount,currency,description,type\n" + ''.join(f'{row}\n' for row in rows)
+        csv_file = io.BytesIO(csv_content.encode('utf-8'))
+        csv_file.name = 'test.csv'
+        headers = {'HTTP_IDEMPOTENCY_KEY': idempotency_key} if idempotency_key else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('upload-transactions'), {'file': csv_file}, format='multipart', **headers)
+        return ImportBatch.objects.get(pk=response.data['batch']['id'])
 
 
 class TransactionModelTest(TestCase):
@@ -120,6 +138,30 @@ class TransactionUploadTest(TestCase):
         # Should return existing batch
         self.assertEqual(response2.data['batch']['id'], response1.data['batch']['id'])
     
+    def test_upload_skips_duplicate_rows(self):
+        """Test rows already stored or repeated in the file are skipped"""
+        row = {
+            'date': '2025-07-01',
+            'amount': '1000.00',
+            'currency': 'TRY',
+            'description': 'Test',
+            'type': 'credit'
+        }
+        url = reverse('upload-transactions')
+        file = self.create_csv_file([row, row])
+        file.name = 'test.csv'
+        response = self.client.post(url, {'file': file}, format='multipart')
+        
+        self.assertEqual(response.data['imported_count'], 1)
+        self.assertEqual(response.data['failed_count'], 1)
+        
+        file = self.create_csv_file([row, {**row, 'amount': '2000.00'}])
+        file.name = 'test.csv'
+        response = self.client.post(url, {'file': file}, format='multipart')
+        
+        self.assertEqual(response.data['imported_count'], 1)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+    
     def test_upload_invalid_csv_format(self):
         """Test uploading invalid CSV format"""
         file = io.BytesIO(b'invalid csv content')
@@ -195,6 +237,675 @@ class TransactionListViewTest(TestCase):
         self.assertEqual(len(response.data['results']), 2)
 
 
+class TransactionCursorPaginationTest(TestCase):
+    """Test keyset pagination of the transaction list"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        for index in range(7):
+            Transaction.objects.create(
+                user=self.user,
+                date=date(2025, 7, 1 + index // 3),
+                amount=Decimal(100 + index),
+                currency='TRY',
+                description=f'Transaction {index}',
+                type='debit'
+            )
+        self.expected_ids = list(
+            Transaction.objects.filter(user=self.user)
+            .order_by('-date', '-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+    
+    def walk(self, params):
+        ids = []
+        url = reverse('transaction-list')
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+    
+    def test_walks_all_pages_in_order(self):
+        """Test following next links returns every row exactly once"""
+        ids, last_response = self.walk({'page_size': 3})
+        
+        self.assertEqual(ids, self.expected_ids)
+        self.assertNotIn('count', last_response.data)
+    
+    def test_previous_link_returns_prior_page(self):
+        """Test the previous cursor walks backwards"""
+        first = self.client.get(reverse('transaction-list'), {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual([row['id'] for row in back.data['results']], self.expected_ids[:3])
+    
+    def test_respects_ordering_filter(self):
+        """Test keyset pagination follows the requested ordering"""
+        ids, _ = self.walk({'page_size': 2, 'ordering': 'amount'})
+        
+        self.assertEqual(
+            ids,
+            list(Transaction.objects.filter(user=self.user).order_by('amount', 'id').values_list('id', flat=True))
+        )
+    
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        """Test later pages run the same number of queries as the first"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(reverse('transaction-list'), {'page_size': 2})
+        next_url = self.client.get(response.data['next']).data['next']
+        with CaptureQueriesContext(connection) as later_page:
+            self.client.get(next_url)
+        
+        self.assertEqual(len(first_page), len(later_page))
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in later_page.captured_queries))
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in later_page.captured_queries))
+    
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_optional_count(self):
+        """Test include_count adds a total that is cached between requests"""
+        response = self.client.get(reverse('transaction-list'), {'include_count': 'true'})
+        self.assertEqual(response.data['count'], 7)
+        
+        Transaction.objects.filter(user=self.user).first().delete()
+        response = self.client.get(reverse('transaction-list'), {'include_count': 'true'})
+        self.assertEqual(response.data['count'], 7)
+    
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get(reverse('transaction-list'), {'cursor': 'not-a-cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TransactionSearchTest(TestCase):
+    """Test indexed transaction search"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        descriptions = [
+            'Elektrik faturası ödemesi',
+            'Market alışverişi',
+            'Elektrik ve su faturası elektrik',
+            'Ofis kırtasiye',
+            'Kira ödemesi',
+        ]
+        for index, description in enumerate(descriptions):
+            Transaction.objects.create(
+                user=self.user,
+                date=date(2025, 8, 1 + index),
+                amount=Decimal(100 + index),
+                currency='TRY',
+                description=description,
+                type='debit'
+            )
+    
+    def search(self, term, **params):
+        params['search'] = term
+        response = self.client.get(reverse('transaction-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+    
+    def test_search_ranks_matches(self):
+        """Test search returns only matches with the best match first"""
+        response = self.search('elektrik')
+        descriptions = [row['description'] for row in response.data['results']]
+        
+        self.assertEqual(len(descriptions), 2)
+        self.assertEqual(descriptions[0], 'Elektrik ve su faturası elektrik')
+    
+    def test_search_matches_substrings(self):
+        """Test search finds terms inside words"""
+        response = self.search('faturas')
+        
+        self.assertEqual(len(response.data['results']), 2)
+    
+    def test_short_terms_fall_back_to_contains(self):
+        """Test terms shorter than the index trigram still match"""
+        response = self.search('su')
+        
+        self.assertEqual(
+            [row['description'] for row in response.data['results']],
+            ['Elektrik ve su faturası elektrik']
+        )
+    
+    def test_search_index_tracks_imports(self):
+        """Test rows added by a CSV import are searchable"""
+        csv_content = "date,amount,currency,description,type\n2025-08-10,250.00,TRY,Doğalgaz faturası,debit\n"
+        csv_file = io.BytesIO(csv_content.encode('utf-8'))
+        csv_file.name = 'test.csv'
+        self.client.post(reverse('upload-transactions'), {'file': csv_file}, format='multipart')
+        
+        response = self.search('doğalgaz')
+        
+        self.assertEqual([row['description'] for row in response.data['results']], ['Doğalgaz faturası'])
+    
+    def test_search_results_paginate(self):
+        """Test cursor pagination walks ranked search results"""
+        first = self.search('ödemesi', page_size=1)
+        second = self.client.get(first.data['next'])
+        
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        ids = [first.data['results'][0]['id'], second.data['results'][0]['id']]
+        self.assertEqual(len(set(ids)), 2)
+        self.assertIsNone(second.data['next'])
+    
+    def test_category_filter_matches_known_categories(self):
+        """Test the category filter resolves to known category names"""
+        Transaction.objects.filter(description__startswith='Elektrik').update(category='Utilities')
+        response = self.client.get(reverse('transaction-list'), {'category': 'util'})
+        
+        self.assertTrue(response.data['results'])
+        self.assertTrue(all(row['category'] == 'Utilities' for row in response.data['results']))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TransactionFacetsTest(TestCase):
+    """Test the transaction facets endpoint"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        rows = [
+            (date(2025, 6, 10), '100.00', 'TRY', 'credit', 'Sales'),
+            (date(2025, 6, 20), '50.00', 'TRY', 'debit', 'Rent'),
+            (date(2025, 7, 5), '30.00', 'USD', 'debit', 'Rent'),
+            (date(2025, 7, 6), '20.00', 'TRY', 'debit', 'Groceries'),
+        ]
+        for index, (day, amount, currency, transaction_type, category) in enumerate(rows):
+            Transaction.objects.create(
+                user=self.user,
+                date=day,
+                amount=Decimal(amount),
+                currency=currency,
+                description=f'Transaction {index}',
+                type=transaction_type,
+                category=category
+            )
+    
+    def test_facet_counts_and_totals(self):
+        """Test facets group counts and per-currency totals"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transaction-facets'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['total_count'], 4)
+        facets = response.data['facets']
+        self.assertEqual(facets['type'][0], {'value': 'debit', 'count': 3, 'totals': {'TRY': '70.00', 'USD': '30.00'}})
+        self.assertEqual([facet['value'] for facet in facets['month']], ['2025-07', '2025-06'])
+        self.assertEqual(facets['category'][0]['value'], 'Rent')
+        self.assertEqual(facets['currency'][0], {'value': 'TRY', 'count': 3, 'totals': {'TRY': '170.00'}})
+    
+    def test_facets_apply_list_filters(self):
+        """Test facets use the same filters as the list"""
+        response = self.client.get(reverse('transaction-facets'), {'currency': 'TRY', 'start_date': '2025-07-01'})
+        
+        self.assertEqual(response.data['total_count'], 1)
+        self.assertEqual(response.data['facets']['category'][0]['value'], 'Groceries')
+    
+    def test_uncategorized_facet_matches_filter(self):
+        """Test rows without a category get their own facet that the list filter reproduces"""
+        for category in (None, 'Other'):
+            Transaction.objects.create(
+                user=self.user,
+                date=date(2025, 7, 8),
+                amount=Decimal('5.00'),
+                currency='TRY',
+                description=f'Row {category}',
+                type='debit',
+                category=category
+            )
+        
+        facets = self.client.get(reverse('transaction-facets')).data['facets']['category']
+        counts = {facet['value']: facet['count'] for facet in facets}
+        self.assertEqual(counts['Uncategorized'], 1)
+        self.assertEqual(counts['Other'], 1)
+        
+        for value in ('Uncategorized', 'Other'):
+            response = self.client.get(reverse('transaction-list'), {'category': value})
+            self.assertEqual(len(response.data['results']), counts[value])
+    
+    def test_facets_cached_until_import(self):
+        """Test cached facets are reused until new data is imported"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.client.get(reverse('transaction-facets'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transaction-facets'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data['total_count'], 4)
+        
+        csv_content = "date,amount,currency,description,type\n2025-07-10,15.00,TRY,Market,debit\n"
+        csv_file = io.BytesIO(csv_content.encode('utf-8'))
+        csv_file.name = 'test.csv'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('upload-transactions'), {'file': csv_file}, format='multipart')
+        
+        response = self.client.get(reverse('transaction-facets'))
+        self.assertEqual(response.data['total_count'], 5)
+
+
+class TransactionReadPathTest(TestCase):
+    """Test the values-based transaction read path"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        for index in range(3):
+            Transaction.objects.create(
+                user=self.user,
+                date=date(2025, 7, 1 + index),
+                amount=Decimal('10.5') * (index + 1),
+                currency='TRY',
+                description=f'Ödeme {index}',
+                type='debit',
+                category='Other'
+            )
+    
+    def test_matches_model_serializer(self):
+        """Test list rows are identical to TransactionSerializer output"""
+        from .serializers import TransactionSerializer
+        
+        response = self.client.get(reverse('transaction-list'))
+        expected = TransactionSerializer(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-created_at', '-id'),
+            many=True
+        ).data
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [dict(row) for row in expected])
+    
+    def test_sparse_fieldsets(self):
+        """Test fields limits the returned keys"""
+        response = self.client.get(reverse('transaction-list'), {'fields': 'amount,id,date'})
+        
+        self.assertEqual(list(response.data['results'][0]), ['id', 'date', 'amount'])
+        self.assertEqual(response.data['results'][0]['amount'], '31.50')
+    
+    def test_unknown_fields_rejected(self):
+        """Test unknown sparse fields return 400"""
+        response = self.client.get(reverse('transaction-list'), {'fields': 'id,secret'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_orjson_renderer_matches_json_renderer(self):
+        """Test the orjson renderer produces the same bytes as DRF's renderer"""
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+        
+        response = self.client.get(reverse('transaction-list'))
+        
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(ORJSONRenderer().render(response.data), JSONRenderer().render(response.data))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ConditionalGetTest(CSVUploadMixin, TestCase):
+    """Test ETag and Last-Modified handling on polled endpoints"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user,
+            date=date(2025, 7, 1),
+            amount=Decimal('100.00'),
+            currency='TRY',
+            description='Test transaction',
+            type='credit'
+        )
+    
+    def test_unchanged_list_returns_304_without_queries(self):
+        """Test If-None-Match answers 304 without reading transactions"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        url = reverse('transaction-list')
+        response = self.client.get(url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(any('transactions_transaction' in query['sql'] for query in queries.captured_queries))
+    
+    def test_import_changes_etag(self):
+        """Test an import invalidates previously issued ETags"""
+        url = reverse('transaction-list')
+        etag = self.client.get(url)['ETag']
+        
+        self.upload(['2025-07-02,50.00,TRY,Kira,debit'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_etag_varies_with_query(self):
+        """Test different filters get different ETags"""
+        url = reverse('transaction-list')
+        
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'type': 'debit'})['ETag'])
+    
+    def test_summary_report_if_modified_since(self):
+        """Test the summary report honours If-Modified-Since"""
+        url = reverse('summary-report')
+        params = {'start_date': '2025-07-01', 'end_date': '2025-07-31'}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        response = self.client.get(url, params, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_change_in_same_second_is_not_modified_since(self):
+        """Test a bump in the same second as the last response moves Last-Modified forward"""
+        from unittest import mock
+        from transactions.versioning import bump_data_version
+        
+        url = reverse('summary-report')
+        params = {'start_date': '2025-07-01', 'end_date': '2025-07-31'}
+        with mock.patch('transactions.versioning.time.time_ns', return_value=1_750_000_000_100_000_000):
+            bump_data_version(self.user.id)
+            last_modified = self.client.get(url, params)['Last-Modified']
+        with mock.patch('transactions.versioning.time.time_ns', return_value=1_750_000_000_900_000_000):
+            bump_data_version(self.user.id)
+            response = self.client.get(url, params, HTTP_IF_MODIFIED_SINCE=last_modified)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+    
+    def test_admin_delete_changes_etag(self):
+        """Test deleting through the admin invalidates ETags"""
+        from django.contrib.admin.sites import site
+        
+        url = reverse('transaction-list')
+        etag = self.client.get(url)['ETag']
+        
+        site._registry[Transaction].delete_queryset(None, Transaction.objects.filter(pk=self.transaction.pk))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+class TransactionChangesTest(CSVUploadMixin, TestCase):
+    """Test the delta-sync changes endpoint"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def sync(self, **params):
+        response = self.client.get(reverse('transaction-changes'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_incremental_sync(self):
+        """Test a sync token only returns later changes"""
+        self.upload(['2025-07-01,100.00,TRY,Kira,debit', '2025-07-02,50.00,TRY,Market,debit'])
+        first = self.sync()
+        self.assertEqual(len(first['upserted']), 2)
+        self.assertEqual(first['deleted'], [])
+        
+        self.assertEqual(self.sync(since=first['since'])['upserted'], [])
+        
+        self.upload(['2025-07-03,25.00,TRY,Yemek,debit'])
+        second = self.sync(since=first['since'])
+        self.assertEqual([row['description'] for row in second['upserted']], ['Yemek'])
+    
+    def test_admin_deletes_are_tombstoned(self):
+        """Test rows deleted in the admin are reported as deleted"""
+        from django.contrib.admin.sites import site
+        
+        self.upload(['2025-07-01,100.00,TRY,Kira,debit', '2025-07-02,50.00,TRY,Market,debit'])
+        token = self.sync()['since']
+        transaction = Transaction.objects.get(description='Kira')
+        
+        site._registry[Transaction].delete_queryset(None, Transaction.objects.filter(pk=transaction.pk))
+        changes = self.sync(since=token)
+        
+        self.assertEqual(changes['upserted'], [])
+        self.assertEqual(changes['deleted'], [transaction.pk])
+    
+    def test_limit_pages_through_changes(self):
+        """Test has_more and the returned token page through the log"""
+        self.upload([f'2025-07-{day:02d},{day}.00,TRY,Row {day},debit' for day in range(1, 6)])
+        
+        seen = []
+        changes = self.sync(limit=2)
+        seen.extend(row['id'] for row in changes['upserted'])
+        while changes['has_more']:
+            changes = self.sync(since=changes['since'], limit=2)
+            seen.extend(row['id'] for row in changes['upserted'])
+        
+        self.assertEqual(sorted(seen), sorted(Transaction.objects.values_list('id', flat=True)))
+    
+    def test_late_commit_is_not_skipped(self):
+        """Test a change inserted earlier but committed later is numbered after the cursor"""
+        from .models import TransactionChange
+        
+        early, late = [
+            Transaction.objects.create(
+                user=self.user,
+                date=date(2025, 7, day),
+                amount=Decimal('10.00'),
+                currency='TRY',
+                description=f'Row {day}',
+                type='debit'
+            )
+            for day in (1, 2)
+        ]
+        TransactionChange.objects.create(id=500, user=self.user, transaction_id=late.id, op='create')
+        token = self.sync()['since']
+        
+        # A long transaction inserted its change first and only commits now.
+        TransactionChange.objects.create(id=100, user=self.user, transaction_id=early.id, op='create')
+        changes = self.sync(since=token)
+        
+        self.assertEqual([row['id'] for row in changes['upserted']], [early.id])
+        self.assertGreater(TransactionChange.objects.get(id=100).seq, TransactionChange.objects.get(id=500).seq)
+    
+    def test_invalid_token(self):
+        """Test a malformed sync token is rejected"""
+        response = self.client.get(reverse('transaction-changes'), {'since': 'garbage!'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ImportRollbackTest(CSVUploadMixin, TestCase):
+    """Test rolling back an import batch"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def test_rollback_deletes_batch_rows_in_chunks(self):
+        """Test rollback removes only the batch rows with chunked set deletes"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        keep = self.upload(['2025-06-01,10.00,TRY,Keep,debit'])
+        batch = self.upload([f'2025-07-{day:02d},{day}.00,TRY,Row {day},debit' for day in range(1, 8)])
+        
+        with override_settings(IMPORT_ROLLBACK_CHUNK_SIZE=3), CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(reverse('rollback-import', args=[batch.pk]))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted_count'], 7)
+        self.assertEqual(response.data['batch']['rolled_back_rows'], 7)
+        self.assertIsNotNone(response.data['batch']['rolled_back_at'])
+        self.assertEqual(list(Transaction.objects.values_list('import_batch', flat=True)), [keep.pk])
+        deletes = [query for query in queries.captured_queries if query['sql'].startswith('DELETE FROM "transactions_transaction"')]
+        self.assertEqual(len(deletes), 3)
+    
+    def test_rollback_updates_sync_and_etags(self):
+        """Test rollback tombstones rows and invalidates cached responses"""
+        batch = self.upload(['2025-07-01,10.00,TRY,Kira,debit'])
+        transaction_id = Transaction.objects.get().pk
+        token = self.client.get(reverse('transaction-changes')).data['since']
+        etag = self.client.get(reverse('transaction-list'))['ETag']
+        
+        self.client.delete(reverse('rollback-import', args=[batch.pk]))
+        
+        self.assertEqual(self.client.get(reverse('transaction-changes'), {'since': token}).data['deleted'], [transaction_id])
+        response = self.client.get(reverse('transaction-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+    
+    def test_rolled_back_file_can_be_reimported(self):
+        """Test the idempotency key is released by a rollback"""
+        batch = self.upload(['2025-07-01,10.00,TRY,Kira,debit'], idempotency_key='statement-1')
+        self.client.delete(reverse('rollback-import', args=[batch.pk]))
+        
+        reimported = self.upload(['2025-07-01,10.00,TRY,Kira,debit'], idempotency_key='statement-1')
+        
+        self.assertNotEqual(reimported.pk, batch.pk)
+        self.assertEqual(Transaction.objects.count(), 1)
+    
+    def test_other_users_batch_not_found(self):
+        """Test a user cannot roll back someone else's batch"""
+        batch = self.upload(['2025-07-01,10.00,TRY,Kira,debit'])
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=other)
+        
+        response = self.client.delete(reverse('rollback-import', args=[batch.pk]))
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+
+class TransactionAdminTest(TestCase):
+    """Test the transaction admin changelist"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='testpass123')
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:transactions_transaction_changelist')
+    
+    def create_transactions(self, count, start=0):
+        for index in range(start, start + count):
+            user = User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com', password='testpass123')
+            Transaction.objects.create(
+                user=user,
+                date=date(2025, 7, 1),
+                amount=Decimal('10.00'),
+                currency='TRY',
+                description=f'Elektrik faturası {index}',
+                type='debit',
+                category='Utilities'
+            )
+    
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test users are joined instead of fetched per row"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.create_transactions(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.create_transactions(8, start=2)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        
+        self.assertEqual(len(small), len(large))
+        self.assertFalse(any('DISTINCT "transactions_transaction"."category"' in query['sql'] for query in large.captured_queries))
+    
+    def test_search_uses_index(self):
+        """Test admin search goes through the indexed search backend"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.create_transactions(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'q': 'faturası 1'})
+        
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        self.assertTrue(any('transactions_transaction_fts' in query['sql'] for query in queries.captured_queries))
+    
+    def test_search_by_exact_username(self):
+        """Test an exact username narrows the list to that user"""
+        self.create_transactions(3)
+        
+        response = self.client.get(self.url, {'q': 'user2'})
+        
+        self.assertEqual([row.user.username for row in response.context['cl'].result_list], ['user2'])
+    
+    def test_static_filters(self):
+        """Test category and currency filters use fixed choices"""
+        self.create_transactions(2)
+        
+        response = self.client.get(self.url, {'category': 'Utilities', 'currency': 'TRY'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+
 class AuthenticationTest(TestCase):
     """Test authentication endpoints"""
     
@@ -246,10 +957,172 @@ class AuthenticationTest(TestCase):
         response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-
-
-class KPIReportTest(TestCase):
-    """Test KPI reporting endpoint"""
+    
+    def test_login_email_is_case_insensitive_single_query(self):
+        """Test login matches email case-insensitively with one user lookup"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        User.objects.create_user(username='testuser', email='Test@Example.com', password='testpass123')
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {'email': 'test@example.COM', 'password': 'testpass123'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([query for query in queries.captured_queries if 'FROM "auth_user"' in query['sql']]), 1)
+    
+    def test_unknown_email_still_hashes_password(self):
+        """Test unknown emails pay the same password hashing cost"""
+        from unittest import mock
+        
+        with mock.patch('django.contrib.auth.models.User.set_password') as set_password:
+            response = self.client.post(reverse('login'), {'email': 'nobody@example.com', 'password': 'testpass123'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        set_password.assert_called_once_with('testpass123')
+    
+    def test_register_rejects_duplicate_email(self):
+        """Test registration rejects an email that differs only in case"""
+        User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        data = {
+            'username': 'another',
+            'email': 'TEST@example.com',
+            'password': 'testpass123',
+            'password2': 'testpass123'
+        }
+        response = self.client.post(reverse('register'), data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+    
+    def test_register_race_returns_400(self):
+        """Test a duplicate that slips past validation is still rejected with 400"""
+        from unittest import mock
+        
+        User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        data = {
+            'username': 'another',
+            'email': 'TEST@example.com',
+            'password': 'testpass123',
+            'password2': 'testpass123'
+        }
+        with mock.patch('accounts.serializers.email_taken', side_effect=[False, True]):
+            response = self.client.post(reverse('register'), data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+        self.assertEqual(User.objects.count(), 1)
+    
+    def test_resolve_duplicate_emails(self):
+        """Test the cleanup command keeps each email on its most recent user"""
+        from django.core.management import call_command
+        from django.db import connection
+        
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX auth_user_email_lower_uniq')
+        old = User.objects.create_user(username='old', email='same@example.com', password='testpass123')
+        recent = User.objects.create_user(username='recent', email='SAME@example.com', password='testpass123')
+        User.objects.filter(pk=recent.pk).update(last_login=timezone.now())
+        
+        output = io.StringIO()
+        call_command('resolve_duplicate_emails', stdout=output)
+        self.assertIn('--apply', output.getvalue())
+        self.assertEqual(User.objects.exclude(email='').count(), 2)
+        
+        call_command('resolve_duplicate_emails', '--apply', stdout=io.StringIO())
+        self.assertEqual(User.objects.get(pk=recent.pk).email, 'SAME@example.com')
+        self.assertEqual(User.objects.get(pk=old.pk).email, '')
+    
+    def test_email_index_enforces_uniqueness(self):
+        """Test the database rejects case-variant duplicate emails"""
+        from django.db import IntegrityError, transaction
+        
+        User.objects.create_user(username='first', email='same@example.com', password='testpass123')
+        User.objects.create_user(username='blank1', email='', password='testpass123')
+        User.objects.create_user(username='blank2', email='', password='testpass123')
+        
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='second', email='SAME@example.com', password='testpass123')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CachedJWTAuthenticationTest(TestCase):
+    """Test cached user resolution for JWT requests"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from accounts.authentication import cached_users
+        cache.clear()
+        cached_users.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('transaction-list')
+    
+    def user_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [query for query in queries.captured_queries if 'FROM "auth_user"' in query['sql']]
+    
+    def test_repeat_requests_skip_user_query(self):
+        """Test only the first request loads the user from the database"""
+        response, first = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first), 1)
+        
+        response, second = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second, [])
+    
+    def test_shared_cache_serves_cold_process(self):
+        """Test a process with an empty memory cache reads the shared cache"""
+        from accounts.authentication import cached_users
+        
+        self.user_queries()
+        cached_users.clear()
+        response, queries = self.user_queries()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+    
+    def test_deactivation_invalidates_cache(self):
+        """Test a deactivated user is rejected on the next request"""
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        
+        response, _ = self.user_queries()
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_password_change_revokes_cached_token(self):
+        """Test a password change is seen when revoke checks are enabled"""
+        from unittest import mock
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import RefreshToken
+        
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+            self.assertEqual(self.user_queries()[0].status_code, status.HTTP_200_OK)
+            self.assertEqual(self.user_queries()[0].status_code, status.HTTP_200_OK)
+            
+            self.user.set_password('newpass456')
+            self.user.save()
+            
+            self.assertEqual(self.user_queries()[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class KPIReportTest(TestCase):
+    """Test KPI reporting endpoint"""
     
     def setUp(self):
         self.user = User.objects.create_user(
@@ -312,3 +1185,1426 @@ class KPIReportTest(TestCase):
 
 
 
+
+
+@override_settings(THROTTLE_ENABLED=True)
+class TokenBucketThrottleTest(TestCase):
+    """Test Redis token-bucket throttling of heavy endpoints"""
+    
+    def setUp(self):
+        from config.throttling import throttle_breaker
+        throttle_breaker.reset()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('summary-report')
+    
+    def tearDown(self):
+        from config.throttling import throttle_breaker
+        throttle_breaker.reset()
+    
+    def test_wide_reports_cost_more(self):
+        """Test report cost grows with the date range"""
+        from unittest import mock
+        
+        bucket = mock.Mock(return_value=[1, '0'])
+        with mock.patch('config.throttling.get_token_bucket', return_value=bucket):
+            self.client.get(self.url, {'start_date': '2025-01-01', 'end_date': '2025-01-31'})
+            self.client.get(self.url, {'start_date': '2024-01-01', 'end_date': '2025-01-01'})
+        
+        narrow, wide = bucket.call_args_list
+        self.assertEqual(narrow.kwargs['keys'], [f'throttle:reports:{self.user.pk}'])
+        self.assertEqual(narrow.kwargs['args'][2], 1)
+        self.assertEqual(wide.kwargs['args'][2], 5)
+    
+    def test_empty_bucket_returns_429(self):
+        """Test an empty bucket rejects with Retry-After"""
+        from unittest import mock
+        
+        with mock.patch('config.throttling.get_token_bucket', return_value=mock.Mock(return_value=[0, '2.5'])):
+            response = self.client.get(self.url, {'start_date': '2025-01-01', 'end_date': '2025-01-31'})
+        
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '3')
+    
+    def test_redis_outage_fails_open(self):
+        """Test requests pass and Redis is skipped once the breaker opens"""
+        from unittest import mock
+        import redis
+        
+        bucket = mock.Mock(side_effect=redis.ConnectionError('down'))
+        with mock.patch('config.throttling.get_token_bucket', return_value=bucket):
+            for _ in range(5):
+                response = self.client.get(self.url, {'start_date': '2025-01-01', 'end_date': '2025-01-31'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(bucket.call_count, 3)
+    
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled_throttle_skips_redis(self):
+        """Test no bucket is consulted while throttling is disabled"""
+        from unittest import mock
+        
+        with mock.patch('config.throttling.get_token_bucket') as get_token_bucket:
+            response = self.client.get(self.url, {'start_date': '2025-01-01', 'end_date': '2025-01-31'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        get_token_bucket.assert_not_called()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'config.metrics.InstrumentedLocMemCache'}})
+class MetricsTest(TestCase):
+    """Test request instrumentation and the metrics endpoint"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def test_requests_record_latency_and_queries(self):
+        """Test the middleware records latency, status and SQL per endpoint"""
+        from config.metrics import db_queries, http_latency, http_requests
+        
+        before = http_latency.count('GET', 'transaction-list')
+        requests_before = http_requests.value('GET', 'transaction-list', '200')
+        queries_before = db_queries.count('transaction-list')
+        self.client.get(reverse('transaction-list'))
+        
+        self.assertEqual(http_latency.count('GET', 'transaction-list'), before + 1)
+        self.assertEqual(http_requests.value('GET', 'transaction-list', '200'), requests_before + 1)
+        self.assertEqual(db_queries.count('transaction-list'), queries_before + 1)
+    
+    def test_cache_lookups_are_labelled_by_endpoint(self):
+        """Test shared cache hits and misses are attributed to the endpoint"""
+        from config.metrics import cache_requests
+        
+        misses = cache_requests.value('default', 'transaction-facets', 'miss')
+        hits = cache_requests.value('default', 'transaction-facets', 'hit')
+        self.client.get(reverse('transaction-facets'))
+        self.client.get(reverse('transaction-facets'))
+        
+        self.assertGreater(cache_requests.value('default', 'transaction-facets', 'miss'), misses)
+        self.assertGreater(cache_requests.value('default', 'transaction-facets', 'hit'), hits)
+    
+    def test_import_stages_are_timed(self):
+        """Test CSV imports record parse, dedup and insert durations"""
+        from config.metrics import import_stage_seconds
+        
+        before = {stage: import_stage_seconds.count(stage) for stage in ('parse', 'dedup', 'insert')}
+        csv_file = io.BytesIO(b"date,amount,currency,description,type\n2025-07-01,10.00,TRY,Kira,debit\n")
+        csv_file.name = 'test.csv'
+        self.client.post(reverse('upload-transactions'), {'file': csv_file}, format='multipart')
+        
+        for stage, count in before.items():
+            self.assertEqual(import_stage_seconds.count(stage), count + 1)
+    
+    def test_celery_tasks_are_timed(self):
+        """Test Celery task durations are recorded by state"""
+        from config.metrics import celery_task_seconds, connect_celery_signals
+        from reports.tasks import send_weekly_report_chunk
+        
+        connect_celery_signals()
+        name = send_weekly_report_chunk.name
+        before = celery_task_seconds.count(name, 'SUCCESS')
+        send_weekly_report_chunk.apply(args=[[], '2025-07-07', '2025-07-13'])
+        
+        self.assertEqual(celery_task_seconds.count(name, 'SUCCESS'), before + 1)
+    
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        """Test /metrics exposes Prometheus text format"""
+        self.client.get(reverse('transaction-list'))
+        
+        staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        body = response.content.decode()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",endpoint="transaction-list",le="+Inf"}', body)
+        self.assertIn('memory_cache_entries{cache="exchange_rate_tables"}', body)
+    
+    def test_metrics_requires_staff_without_token(self):
+        """Test the metrics endpoint is closed to anonymous and non-staff users by default"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+    
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Test the metrics endpoint can require a bearer token"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    DATABASE_REPLICAS=['replica']
+)
+class ReplicaRoutingTest(TestCase):
+    """Test safe reads are routed to replicas with sticky-primary after imports"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from django.db import connections
+        
+        cache.clear()
+        connections['replica'] = connections['default']
+        self.addCleanup(connections.__delitem__, 'replica')
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Transaction.objects.create(
+            user=self.user,
+            date=date(2025, 7, 1),
+            amount=Decimal('100.00'),
+            currency='TRY',
+            description='Market',
+            type='debit',
+            unique_hash='replica-1'
+        )
+    
+    def routed_reads(self, method, url, data=None):
+        from unittest import mock
+        from config.db_router import ReplicaRouter
+        
+        routed = []
+        original = ReplicaRouter.db_for_read
+        
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            routed.append((model._meta.label, alias))
+            return alias
+        
+        with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            response = getattr(self.client, method)(url, data)
+        return response, routed
+    
+    def test_router_decisions(self):
+        """Test only app data reads inside a replica context leave the primary"""
+        from config.db_router import ReplicaRouter, replica_reads_enabled
+        
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Transaction), 'default')
+        token = replica_reads_enabled.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Transaction), 'replica')
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(Transaction), 'default')
+        finally:
+            replica_reads_enabled.reset(token)
+        self.assertFalse(router.allow_migrate('replica', 'transactions'))
+        self.assertIsNone(router.allow_migrate('default', 'transactions'))
+    
+    def test_list_and_summary_read_from_replica(self):
+        """Test list, facets and summary reads go to the replica"""
+        for url, data in [
+            (reverse('transaction-list'), None),
+            (reverse('transaction-facets'), None),
+            (reverse('summary-report'), {'start_date': '2025-07-01', 'end_date': '2025-07-31'}),
+        ]:
+            response, routed = self.routed_reads('get', url, data)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(('transactions.Transaction', 'replica'), routed)
+    
+    def test_reads_are_sticky_after_import(self):
+        """Test a user's reads stay on the primary after their own import"""
+        csv_file = io.BytesIO(b"date,amount,currency,description,type\n2025-07-02,50.00,TRY,Kira,debit\n")
+        csv_file.name = 'test.csv'
+        with self.captureOnCommitCallbacks(execute=True):
+            response, routed = self.routed_reads('post', reverse('upload-transactions'), {'file': csv_file})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('replica', {alias for label, alias in routed})
+        
+        response, routed = self.routed_reads('get', reverse('transaction-list'))
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertNotIn('replica', {alias for label, alias in routed})
+        
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response, routed = self.routed_reads('get', reverse('transaction-list'))
+        self.assertIn(('transactions.Transaction', 'replica'), routed)
+    
+    def test_reads_are_sticky_after_admin_delete(self):
+        """Test any data version bump, not only imports, keeps the user's reads on the primary"""
+        from django.contrib.admin.sites import site
+        from config.db_router import is_primary_sticky
+        
+        self.assertFalse(is_primary_sticky(self.user.id))
+        site._registry[Transaction].delete_queryset(None, Transaction.objects.filter(user=self.user))
+        
+        self.assertTrue(is_primary_sticky(self.user.id))
+        response, routed = self.routed_reads('get', reverse('transaction-facets'))
+        self.assertNotIn('replica', {alias for label, alias in routed})
+    
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """Test everything stays on the primary without replicas"""
+        response, routed = self.routed_reads('get', reverse('transaction-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({alias for label, alias in routed}, {'default'})
+
+
+class TransactionPartitioningTest(TestCase):
+    """Test date partition planning and the partition command outside PostgreSQL"""
+    
+    def test_partition_ranges(self):
+        """Test monthly and yearly partitions cover contiguous ranges"""
+        from transactions.partitioning import partition_range, partition_ranges
+        
+        self.assertEqual(
+            partition_range(date(2024, 12, 15), 'month'),
+            (date(2024, 12, 1), date(2025, 1, 1), 'transactions_transaction_p2024_12')
+        )
+        self.assertEqual(
+            partition_range(date(2024, 12, 15), 'year'),
+            (date(2024, 1, 1), date(2025, 1, 1), 'transactions_transaction_p2024')
+        )
+        
+        ranges = partition_ranges(date(2024, 11, 30), date(2025, 2, 1), 'month')
+        self.assertEqual([name[-7:] for start, end, name in ranges], ['2024_11', '2024_12', '2025_01', '2025_02'])
+        for previous, following in zip(ranges, ranges[1:]):
+            self.assertEqual(previous[1], following[0])
+    
+    def test_detect_interval(self):
+        """Test the interval is inferred from existing partition names"""
+        from transactions.partitioning import detect_interval
+        
+        self.assertEqual(detect_interval({'transactions_transaction_p2025', 'transactions_transaction_default'}), 'year')
+        self.assertEqual(detect_interval({'transactions_transaction_p2025_07'}), 'month')
+    
+    def test_unpartitioned_database_is_left_alone(self):
+        """Test the beat task is a no-op and conversion is refused outside PostgreSQL"""
+        from django.core.management import CommandError, call_command
+        from django.db import connection
+        from transactions.partitioning import PartitioningError, partition_transactions_table
+        from transactions.tasks import ensure_transaction_partitions
+        
+        if connection.vendor == 'postgresql':
+            self.skipTest('Conversion is covered by TransactionPartitionConversionTest')
+        self.assertIn('not partitioned', ensure_transaction_partitions())
+        with self.assertRaisesMessage(PartitioningError, 'requires PostgreSQL'):
+            partition_transactions_table()
+        with self.assertRaisesMessage(CommandError, 'not partitioned'):
+            call_command('partition_transactions')
+        with self.assertRaisesMessage(CommandError, 'requires PostgreSQL'):
+            call_command('partition_transactions', '--convert')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Table partitioning requires PostgreSQL')
+class TransactionPartitionConversionTest(TestCase):
+    """Test converting a populated transactions table to date partitions on PostgreSQL"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.rows = [
+            Transaction.objects.create(
+                user=self.user,
+                date=day,
+                amount=Decimal('100.00'),
+                currency='TRY',
+                description=f'Row {index}',
+                type='debit'
+            )
+            for index, day in enumerate([date(2023, 5, 1), date(2024, 2, 29), date(2025, 7, 1)])
+        ]
+    
+    def test_convert_keeps_rows_ids_and_uniqueness(self):
+        """Test conversion keeps data, id generation and the duplicate hash guard"""
+        from django.core.management import call_command
+        from django.db import IntegrityError, transaction as db_transaction
+        from transactions.partitioning import (
+            DEFAULT_PARTITION,
+            ensure_partitions,
+            existing_partitions,
+            is_partitioned,
+        )
+        
+        out = io.StringIO()
+        call_command('partition_transactions', '--convert', '--interval', 'month', '--ahead', '2', stdout=out)
+        self.assertIn('now partitioned', out.getvalue())
+        
+        self.assertTrue(is_partitioned())
+        with connection.cursor() as cursor:
+            partitions = existing_partitions(cursor)
+        self.assertIn(DEFAULT_PARTITION, partitions)
+        self.assertIn('transactions_transaction_p2024_02', partitions)
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('id', flat=True)),
+            sorted(row.id for row in self.rows)
+        )
+        
+        created = Transaction.objects.create(
+            user=self.user,
+            date=date(2024, 3, 1),
+            amount=Decimal('5.00'),
+            currency='TRY',
+            description='After conversion',
+            type='credit'
+        )
+        self.assertGreater(created.id, max(row.id for row in self.rows))
+        
+        duplicate = Transaction(
+            user=self.user,
+            date=self.rows[0].date,
+            amount=Decimal('1.00'),
+            currency='TRY',
+            description='Duplicate',
+            type='debit',
+            unique_hash=self.rows[0].unique_hash
+        )
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            duplicate.save()
+        
+        self.assertEqual(ensure_partitions(ahead=2), [])
+    
+    def test_new_partition_takes_rows_from_default(self):
+        """Test rows beyond the last partition move out of the default partition"""
+        from django.core.management import call_command
+        from transactions.partitioning import DEFAULT_PARTITION, ensure_partitions, partition_transactions_table
+        
+        partition_transactions_table(interval='month', ahead=0)
+        today = timezone.now().date()
+        future = (today.replace(day=1) + timedelta(days=62)).replace(day=1)
+        row = Transaction.objects.create(
+            user=self.user,
+            date=future,
+            amount=Decimal('7.00'),
+            currency='TRY',
+            description='Future',
+            type='credit'
+        )
+        
+        created = ensure_partitions(ahead=2, today=today)
+        
+        self.assertIn(f'transactions_transaction_p{future:%Y_%m}', created)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertTrue(Transaction.objects.filter(id=row.id).exists())
+        call_command('partition_transactions', '--ahead', '2', stdout=io.StringIO())
+
+
+class TransactionArchiveTest(TestCase):
+    """Test cold archival, rollup-backed summaries and restores"""
+    
+    def setUp(self):
+        import tempfile
+        
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'transaction_archive': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': archive_dir.name},
+            },
+        }
+        settings_override = override_settings(
+            STORAGES=storages,
+            TRANSACTION_ARCHIVE_FORMAT='csv.gz',
+            TRANSACTION_ARCHIVE_DELETE_CHUNK_SIZE=2,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        rows = [
+            (date(2022, 3, 1), '4500.00', 'TRY', 'Satış: Fatura #1023', 'credit', 'Sales'),
+            (date(2022, 3, 2), '1200.00', 'TRY', 'Kira Ödemesi', 'debit', 'Rent'),
+            (date(2022, 4, 5), '300.00', 'USD', 'SaaS: CRM Aylık', 'debit', None),
+            (date(2022, 4, 6), '200.00', 'TRY', 'Kira Ödemesi', 'debit', 'Rent'),
+            (date(2025, 7, 1), '100.00', 'TRY', 'Market', 'debit', 'Groceries'),
+        ]
+        for day, amount, currency, description, transaction_type, category in rows:
+            Transaction.objects.create(
+                user=self.user,
+                date=day,
+                amount=Decimal(amount),
+                currency=currency,
+                description=description,
+                type=transaction_type,
+                category=category
+            )
+    
+    def summary(self):
+        response = self.client.get(reverse('summary-report'), {'start_date': '2022-01-01', 'end_date': '2025-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+    
+    def archive(self):
+        from transactions.archive import archive_old_transactions
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            archives, failed_user_ids = archive_old_transactions(date(2023, 1, 1))
+        self.assertEqual(failed_user_ids, [])
+        self.assertEqual(len(archives), 1)
+        return archives[0]
+    
+    def test_scheduled_archiving_is_opt_in(self):
+        """Test the beat task leaves rows alone unless archiving is enabled"""
+        from transactions.tasks import archive_old_transactions
+        
+        with override_settings(TRANSACTION_ARCHIVE_ENABLED=False):
+            self.assertIn('disabled', archive_old_transactions())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 5)
+        
+        with override_settings(TRANSACTION_ARCHIVE_ENABLED=True, TRANSACTION_ARCHIVE_AFTER_MONTHS=1), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertIn('Archived', archive_old_transactions())
+        self.assertLess(Transaction.objects.filter(user=self.user).count(), 5)
+    
+    def test_archive_moves_rows_and_keeps_summary(self):
+        """Test old rows leave the hot table while summary totals stay the same"""
+        from transactions.models import DailyTransactionRollup
+        
+        before = self.summary()
+        archive = self.archive()
+        
+        self.assertEqual(archive.row_count, 4)
+        self.assertEqual(archive.format, 'csv.gz')
+        self.assertEqual(archive.end_date, date(2022, 12, 31))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(DailyTransactionRollup.objects.filter(archive=archive).count(), 4)
+        self.assertEqual(self.summary(), before)
+        
+        response = self.client.get(reverse('summary-report'), {'start_date': '2022-04-01', 'end_date': '2022-04-30'})
+        self.assertEqual(response.json()['total_expense'], 500.0)
+        self.assertEqual(
+            response.json()['top_expense_categories'],
+            [{'category': 'Uncategorized', 'amount': 300.0, 'count': 1}, {'category': 'Rent', 'amount': 200.0, 'count': 1}]
+        )
+    
+    def test_archive_rows_stream(self):
+        """Test archived rows can be streamed back as CSV"""
+        archive = self.archive()
+        
+        response = self.client.get(reverse('transaction-archives'))
+        self.assertEqual([item['id'] for item in response.json()], [archive.id])
+        
+        response = self.client.get(reverse('archive-rows', args=[archive.id]), {'start_date': '2022-04-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['date'] for row in rows], ['2022-04-05', '2022-04-06'])
+        self.assertEqual(rows[0]['amount'], '300.00')
+        self.assertEqual(rows[0]['category'], '')
+        
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(reverse('archive-rows', args=[archive.id])).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_import_into_archived_period_is_rejected(self):
+        """Test re-importing archived history does not duplicate it"""
+        self.archive()
+        csv_file = io.BytesIO(
+            "date,amount,currency,description,type\n2022-03-02,1200.00,TRY,Kira Ödemesi,debit\n2025-07-02,50.00,TRY,Kira,debit\n".encode()
+        )
+        csv_file.name = 'test.csv'
+        response = self.client.post(reverse('upload-transactions'), {'file': csv_file}, format='multipart')
+        
+        self.assertEqual(response.data['imported_count'], 1)
+        self.assertIn('archived period', response.data['errors'][0])
+    
+    def test_restore_archive(self):
+        """Test restoring an archive brings rows back and drops its rollups"""
+        from django.core.management import call_command
+        from transactions.models import DailyTransactionRollup
+        
+        before = self.summary()
+        archive = self.archive()
+        
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_transactions', '--restore', str(archive.id), stdout=output)
+        
+        self.assertIn('Restored 4 transactions', output.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 5)
+        self.assertFalse(DailyTransactionRollup.objects.exists())
+        self.assertEqual(self.summary(), before)
+        archive.refresh_from_db()
+        self.assertIsNotNone(archive.restored_at)
+
+    
+    def test_archive_and_restore_are_synced(self):
+        """Test archived rows are tombstoned and restored rows are upserted for delta sync"""
+        from transactions.archive import restore_archive
+        
+        old_ids = set(Transaction.objects.filter(date__lt=date(2023, 1, 1)).values_list('id', flat=True))
+        token = self.client.get(reverse('transaction-changes')).data['since']
+        archive = self.archive()
+        
+        changes = self.client.get(reverse('transaction-changes'), {'since': token}).data
+        self.assertEqual(set(changes['deleted']), old_ids)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            restore_archive(archive)
+        changes = self.client.get(reverse('transaction-changes'), {'since': changes['since']}).data
+        self.assertEqual({row['id'] for row in changes['upserted']}, old_ids)
+        self.assertEqual(changes['deleted'], [])
+
+    
+    def test_restore_counts_only_inserted_rows(self):
+        """Test rows skipped by the conflict guard are not reported as restored"""
+        from transactions.archive import restore_archive
+        
+        archive = self.archive()
+        Transaction.objects.create(
+            user=self.user,
+            date=date(2022, 3, 2),
+            amount=Decimal('1200.00'),
+            currency='TRY',
+            description='Kira Ödemesi',
+            type='debit'
+        )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(restore_archive(archive), 3)
+    
+    def test_archive_command_fails_when_a_user_fails(self):
+        """Test the archive command exits with an error naming users that could not be archived"""
+        from unittest import mock
+        from django.core.management import CommandError, call_command
+        
+        with mock.patch('transactions.archive.archive_user_transactions', side_effect=RuntimeError('storage down')):
+            with self.assertRaisesMessage(CommandError, f'Archiving failed for users: {self.user.id}'):
+                call_command('archive_transactions', '--months', '24', stdout=io.StringIO())
+
+
+QUERY_BUDGET_SIZES = (5, 50)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BalanceCheckpointTest(CSVUploadMixin, TestCase):
+    """Test month-end balance checkpoints and running balances"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def checkpoints(self):
+        from .models import BalanceCheckpoint
+        return list(
+            BalanceCheckpoint.objects.filter(user=self.user)
+            .order_by('currency', 'date')
+            .values_list('currency', 'date', 'balance')
+        )
+    
+    def test_import_creates_month_end_checkpoints(self):
+        """Test an import stores a cumulative balance per currency and month"""
+        self.upload([
+            '2025-01-05,1000.00,TRY,Satış,credit',
+            '2025-01-20,250.00,TRY,Kira,debit',
+            '2025-03-02,100.00,TRY,Market,debit',
+            '2025-01-10,40.00,USD,SaaS,debit',
+        ])
+        
+        self.assertEqual(self.checkpoints(), [
+            ('TRY', date(2025, 1, 31), Decimal('750.00')),
+            ('TRY', date(2025, 3, 31), Decimal('650.00')),
+            ('USD', date(2025, 1, 31), Decimal('-40.00')),
+        ])
+    
+    def test_backdated_import_updates_later_checkpoints(self):
+        """Test late rows shift every later checkpoint and match a full rebuild"""
+        from .balances import rebuild_balance_checkpoints
+        
+        self.upload(['2025-03-10,500.00,TRY,Satış,credit', '2025-05-10,100.00,TRY,Kira,debit'])
+        self.upload(['2025-02-15,50.00,TRY,Market,debit', '2025-04-01,20.00,TRY,Yemek,debit'])
+        
+        incremental = self.checkpoints()
+        self.assertEqual(incremental, [
+            ('TRY', date(2025, 2, 28), Decimal('-50.00')),
+            ('TRY', date(2025, 3, 31), Decimal('450.00')),
+            ('TRY', date(2025, 4, 30), Decimal('430.00')),
+            ('TRY', date(2025, 5, 31), Decimal('330.00')),
+        ])
+        rebuild_balance_checkpoints(self.user.id)
+        self.assertEqual(self.checkpoints(), incremental)
+    
+    def test_conflicting_rows_do_not_move_checkpoints(self):
+        """Test rows dropped by the insert conflict guard are not counted"""
+        from unittest import mock
+        
+        self.upload(['2025-01-05,1000.00,TRY,Satış,credit'])
+        # Simulate a concurrent import that wrote the row after the duplicate check
+        with mock.patch('transactions.utils.existing_transaction_hashes', return_value=set()):
+            batch = self.upload(['2025-01-05,1000.00,TRY,Satış,credit', '2025-01-06,100.00,TRY,Market,debit'])
+        
+        self.assertEqual(batch.imported_rows, 1)
+        self.assertEqual(batch.failed_rows, 1)
+        self.assertEqual(self.checkpoints(), [('TRY', date(2025, 1, 31), Decimal('900.00'))])
+    
+    def test_migration_backfills_existing_history(self):
+        """Test the checkpoint migration rebuilds balances for existing transactions"""
+        import importlib
+        from django.apps import apps
+        from .balances import rebuild_balance_checkpoints
+        from .models import BalanceCheckpoint
+        
+        self.upload([
+            '2025-01-05,1000.00,TRY,Satış,credit',
+            '2025-03-02,100.00,TRY,Market,debit',
+            '2025-01-10,40.00,USD,SaaS,debit',
+        ])
+        rebuild_balance_checkpoints(self.user.id)
+        expected = self.checkpoints()
+        BalanceCheckpoint.objects.all().delete()
+        
+        migration = importlib.import_module('transactions.migrations.0008_balance_checkpoint')
+        migration.backfill_checkpoints(apps, None)
+        
+        self.assertEqual(self.checkpoints(), expected)
+    
+    def test_rollback_reverses_checkpoints(self):
+        """Test rolling back an import removes its amounts from the checkpoints"""
+        self.upload(['2025-01-05,1000.00,TRY,Satış,credit'])
+        batch = self.upload(['2024-12-20,300.00,TRY,Kira,debit', '2025-01-06,200.00,TRY,Market,debit'])
+        
+        self.client.delete(reverse('rollback-import', args=[batch.pk]))
+        
+        self.assertEqual(self.checkpoints(), [
+            ('TRY', date(2024, 12, 31), Decimal('0.00')),
+            ('TRY', date(2025, 1, 31), Decimal('1000.00')),
+        ])
+    
+    def test_running_balance_starts_from_nearest_checkpoint(self):
+        """Test running balances only scan rows after the previous month-end"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.upload([
+            '2025-01-05,1000.00,TRY,Satış,credit',
+            '2025-02-03,200.00,TRY,Kira,debit',
+            '2025-02-03,50.00,TRY,Market,debit',
+            '2025-02-10,300.00,TRY,Fatura,credit',
+            '2025-02-11,99.00,USD,SaaS,debit',
+        ])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transaction-running-balance'), {
+                'currency': 'try', 'start_date': '2025-02-01', 'end_date': '2025-02-28'
+            })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['opening_balance'], '1000.00')
+        self.assertEqual([row['balance'] for row in response.data['results']], ['800.00', '750.00', '1050.00'])
+        self.assertEqual(response.data['closing_balance'], '1050.00')
+        window_queries = [query['sql'] for query in queries.captured_queries if 'OVER' in query['sql']]
+        self.assertEqual(len(window_queries), 1)
+        self.assertIn("'2025-02-01'", window_queries[0])
+    
+    def test_balances_at_any_date(self):
+        """Test point-in-time balances per currency"""
+        self.upload([
+            '2025-01-05,1000.00,TRY,Satış,credit',
+            '2025-02-03,200.00,TRY,Kira,debit',
+            '2025-02-11,99.00,USD,SaaS,debit',
+        ])
+        
+        response = self.client.get(reverse('transaction-balances'), {'date': '2025-02-05'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['balances'], [{'currency': 'TRY', 'balance': '800.00'}])
+        response = self.client.get(reverse('transaction-balances'), {'date': '2025-03-01', 'currency': 'USD'})
+        self.assertEqual(response.data['balances'], [{'currency': 'USD', 'balance': '-99.00'}])
+    
+    def test_balance_history(self):
+        """Test month-end and daily balance series"""
+        self.upload([
+            '2025-01-05,1000.00,TRY,Satış,credit',
+            '2025-03-03,200.00,TRY,Kira,debit',
+            '2025-03-04,50.00,TRY,Market,debit',
+        ])
+        url = reverse('transaction-balance-history')
+        
+        response = self.client.get(url, {'currency': 'TRY', 'start_date': '2025-01-01', 'end_date': '2025-03-15'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['points'], [
+            {'date': '2025-01-31', 'balance': '1000.00'},
+            {'date': '2025-02-28', 'balance': '1000.00'},
+            {'date': '2025-03-15', 'balance': '750.00'},
+        ])
+        
+        response = self.client.get(url, {'currency': 'TRY', 'start_date': '2025-02-01', 'end_date': '2025-03-31', 'interval': 'day'})
+        self.assertEqual(response.data['opening_balance'], '1000.00')
+        self.assertEqual(response.data['points'], [
+            {'date': '2025-03-03', 'balance': '800.00'},
+            {'date': '2025-03-04', 'balance': '750.00'},
+        ])
+    
+    def test_balance_endpoints_validate_parameters(self):
+        """Test missing currency, bad dates and unknown intervals are rejected"""
+        self.assertEqual(self.client.get(reverse('transaction-running-balance')).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('transaction-balance-history'), {'currency': 'TRY', 'interval': 'week'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('transaction-balances'), {'date': '2025-13-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('transaction-running-balance'), {
+            'currency': 'TRY', 'start_date': '2025-02-01', 'end_date': '2025-01-01'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent writers need a database with row-level locking')
+class BalanceCheckpointConcurrencyTest(TransactionTestCase):
+    """Test concurrent imports for one user do not lose checkpoint updates"""
+    
+    def test_earlier_month_waits_for_new_later_checkpoint(self):
+        """Test a delta for an earlier month reaches a checkpoint another import is creating"""
+        import threading
+        from django.db import transaction as db_transaction
+        from transactions.balances import apply_balance_deltas
+        from transactions.models import BalanceCheckpoint
+        
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        created = threading.Event()
+        release = threading.Event()
+        
+        def import_later_month():
+            try:
+                with db_transaction.atomic():
+                    apply_balance_deltas(user.id, {('TRY', date(2025, 7, 31)): Decimal('10.00')})
+                    created.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+        
+        def import_earlier_month():
+            try:
+                with db_transaction.atomic():
+                    apply_balance_deltas(user.id, {('TRY', date(2025, 5, 31)): Decimal('-3.00')})
+            finally:
+                connection.close()
+        
+        later = threading.Thread(target=import_later_month)
+        later.start()
+        self.assertTrue(created.wait(10))
+        earlier = threading.Thread(target=import_earlier_month)
+        earlier.start()
+        earlier.join(0.5)
+        self.assertTrue(earlier.is_alive())
+        release.set()
+        later.join()
+        earlier.join()
+        
+        self.assertEqual(
+            dict(BalanceCheckpoint.objects.filter(user=user).values_list('date', 'balance')),
+            {date(2025, 5, 31): Decimal('-3.00'), date(2025, 7, 31): Decimal('7.00')}
+        )
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class QueryBudgetTest(TestCase):
+    """Test endpoints and tasks stay within a fixed query budget as data grows"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def seed_transactions(self, count, user=None, day=date(2025, 7, 1)):
+        user = user or self.user
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                date=day - timedelta(days=index % 28),
+                amount=Decimal('10.00') + index,
+                currency=['TRY', 'USD', 'EUR'][index % 3],
+                description=f'Budget row {index}',
+                type=['credit', 'debit'][index % 2],
+                category=CATEGORIES[index % len(CATEGORIES)],
+                unique_hash=f'budget-{user.id}-{index}'
+            )
+            for index in range(count)
+        ])
+    
+    def assertQueryBudget(self, budget, prepare, action):
+        """Run action at each dataset size and check the budget and that the count is flat"""
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        counts = []
+        for size in QUERY_BUDGET_SIZES:
+            with self.subTest(size=size):
+                Transaction.objects.all().delete()
+                cache.clear()
+                argument = prepare(size)
+                with CaptureQueriesContext(connection) as queries:
+                    action(argument)
+                self.assertLessEqual(
+                    len(queries), budget,
+                    f'{len(queries)} queries at size {size}:\n' + '\n'.join(q['sql'] for q in queries.captured_queries)
+                )
+                counts.append(len(queries))
+        self.assertEqual(len(set(counts)), 1, f'Query count grows with data size: {dict(zip(QUERY_BUDGET_SIZES, counts))}')
+    
+    def test_upload_budget(self):
+        """Test CSV upload does not query per row"""
+        from benchmarks.statements import statement_csv
+        
+        def prepare(size):
+            self.seed_transactions(size)
+            csv_file = io.BytesIO(statement_csv(size, seed=size, duplicate_ratio=0.2))
+            csv_file.name = 'budget.csv'
+            return csv_file
+        
+        self.assertQueryBudget(
+            12, prepare,
+            lambda csv_file: self.client.post(reverse('upload-transactions'), {'file': csv_file}, format='multipart')
+        )
+    
+    def test_list_page_budget(self):
+        """Test a list page costs the same regardless of history size"""
+        self.assertQueryBudget(
+            1, self.seed_transactions,
+            lambda size: self.client.get(reverse('transaction-list'), {'page_size': 10})
+        )
+    
+    def test_list_page_with_count_budget(self):
+        """Test the estimated count adds a single query"""
+        self.assertQueryBudget(
+            2, self.seed_transactions,
+            lambda size: self.client.get(reverse('transaction-list'), {'page_size': 10, 'include_count': 'true'})
+        )
+    
+    def test_summary_budget(self):
+        """Test the summary report runs a fixed number of aggregate queries"""
+        self.assertQueryBudget(
+            4, self.seed_transactions,
+            lambda size: self.client.get(reverse('summary-report'), {'start_date': '2025-06-01', 'end_date': '2025-07-31'})
+        )
+    
+    def test_facets_budget(self):
+        """Test facets are computed with one grouped query"""
+        self.assertQueryBudget(
+            1, self.seed_transactions,
+            lambda size: self.client.get(reverse('transaction-facets'))
+        )
+    
+    def test_weekly_report_budget(self):
+        """Test the weekly report does not query per user"""
+        from unittest import mock
+        from reports.tasks import send_weekly_report
+        
+        def prepare(size):
+            User.objects.exclude(pk=self.user.pk).delete()
+            for index in range(size):
+                user = User.objects.create(username=f'weekly{size}_{index}', email=f'weekly{size}_{index}@example.com')
+                self.seed_transactions(2, user=user, day=timezone.now().date())
+        
+        def action(argument):
+            with mock.patch('reports.tasks.group') as group:
+                send_weekly_report()
+                for signature in group.call_args[0][0]:
+                    signature.apply()
+        
+        self.assertQueryBudget(3, prepare, action)
+
+
+class BenchmarkStatementTest(TestCase):
+    """Test the synthetic statement generator used by the benchmark suite"""
+    
+    def test_statement_is_deterministic(self):
+        """Test the same seed produces the same statement"""
+        from benchmarks.statements import statement_csv
+        
+        self.assertEqual(statement_csv(200, seed=3), statement_csv(200, seed=3))
+        self.assertNotEqual(statement_csv(200, seed=3), statement_csv(200, seed=4))
+    
+    def test_statement_imports_with_duplicates(self):
+        """Test generated statements import and duplicates are dropped"""
+        from benchmarks.statements import statement_csv
+        from .utils import process_csv_file
+        
+        user = User.objects.create_user(username='benchuser', password='testpass123')
+        csv_file = io.BytesIO(statement_csv(300, seed=1, duplicate_ratio=0.2))
+        csv_file.name = 'bench.csv'
+        batch, imported, failed, errors = process_csv_file(csv_file, user)
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(imported + failed, 300)
+        stored = Transaction.objects.filter(user=user)
+        self.assertLess(stored.count(), 300)
+        self.assertGreater(stored.exclude(category='Other').count(), 0)
+        self.assertEqual(set(stored.values_list('currency', flat=True)) - {'TRY', 'USD', 'EUR', 'GBP'}, set())
+
+
+class WeeklyReportTaskTest(TestCase):
+    """Test batched weekly report generation and delivery"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        Transaction.objects.create(
+            user=self.user,
+            date=date(2025, 7, 1),
+            amount=Decimal('4500.00'),
+            currency='TRY',
+            description='Satış: Fatura #1023',
+            type='credit',
+            category='Sales'
+        )
+        Transaction.objects.create(
+            user=self.user,
+            date=date(2025, 7, 2),
+            amount=Decimal('1200.00'),
+            currency='TRY',
+            description='Kira Ödemesi',
+            type='debit',
+            category='Rent'
+        )
+        Transaction.objects.create(
+            user=self.other_user,
+            date=date(2025, 7, 3),
+            amount=Decimal('300.00'),
+            currency='USD',
+            description='SaaS: CRM Aylık',
+            type='debit',
+            category='Software/Subscriptions'
+        )
+    
+    def test_build_weekly_reports_single_query(self):
+        """Test reports for all users come from one grouped query"""
+        from reports.tasks import build_weekly_reports
+        
+        with self.assertNumQueries(1):
+            reports = list(build_weekly_reports(date(2025, 7, 1), date(2025, 7, 7)))
+        
+        self.assertEqual(len(reports), 2)
+        report = next(r for r in reports if r['user_id'] == self.user.id)
+        self.assertEqual(report['totals']['TRY']['income'], '4500.00')
+        self.assertEqual(report['totals']['TRY']['expense'], '1200.00')
+        self.assertEqual(report['totals']['TRY']['net'], '3300.00')
+        self.assertEqual(report['top_categories'][0]['category'], 'Rent')
+    
+    def test_send_weekly_report_chunk_is_resumable(self):
+        """Test a chunk sends one email per user and skips users already sent"""
+        from django.core import mail
+        from reports.models import WeeklyReportDelivery
+        from reports.tasks import build_weekly_reports, send_weekly_report_chunk
+        
+        reports = list(build_weekly_reports(date(2025, 7, 1), date(2025, 7, 7)))
+        send_weekly_report_chunk(reports, '2025-07-01', '2025-07-07')
+        
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Rent', mail.outbox[0].body + mail.outbox[1].body)
+        self.assertEqual(WeeklyReportDelivery.objects.filter(week_start=date(2025, 7, 1)).count(), 2)
+        
+        send_weekly_report_chunk(reports, '2025-07-01', '2025-07-07')
+        self.assertEqual(len(mail.outbox), 2)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+STUB_RATES = {'USD': 1, 'TRY': 40.0, 'EUR': 0.8, 'GBP': 0.5}
+
+
+class StubRateProvider:
+    """Local HTTP server standing in for the exchange rate provider"""
+    
+    def __init__(self, rates=None, statuses=None, delay=0):
+        self.rates = rates if rates is not None else STUB_RATES
+        self.statuses = list(statuses or [])
+        self.delay = delay
+        self.requests = []
+    
+    def __enter__(self):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        provider = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                import time
+                time.sleep(provider.delay)
+                provider.requests.append(self.path)
+                status_code = provider.statuses.pop(0) if provider.statuses else 200
+                body = json.dumps({'base': 'USD', 'rates': provider.rates}).encode()
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings = override_settings(
+            EXCHANGE_RATE_API_URL=f'http://127.0.0.1:{self.server.server_port}'
+        )
+        self.settings.enable()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExchangeRateStoreTest(TestCase):
+    """Test exchange rate tables are stored locally and triangulated"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from reports.currency_converter import rate_tables
+        from reports.rate_providers import provider_breaker
+        cache.clear()
+        rate_tables.clear()
+        provider_breaker.reset()
+    
+    def test_historical_table_fetched_once_and_triangulated(self):
+        """Test one fetch serves every cross rate for a date"""
+        from reports.currency_converter import get_exchange_rate, convert_currency
+        from reports.models import ExchangeRate
+        
+        with StubRateProvider() as provider:
+            self.assertEqual(get_exchange_rate('EUR', 'TRY', '2025-07-01'), Decimal('50'))
+            self.assertEqual(get_exchange_rate('GBP', 'EUR', '2025-07-01'), Decimal('1.6'))
+            self.assertEqual(convert_currency(Decimal('100'), 'TRY', 'USD', '2025-07-01'), Decimal('2.50'))
+        
+        self.assertEqual(provider.requests, ['/historical/USD/2025-07-01'])
+        self.assertEqual(ExchangeRate.objects.filter(date=date(2025, 7, 1)).count(), 4)
+    
+    def test_stored_historical_rates_need_no_network(self):
+        """Test stored rates are reused without calling the provider"""
+        from reports.currency_converter import get_exchange_rate
+        from reports.models import ExchangeRate
+        
+        ExchangeRate.objects.create(base='USD', currency='USD', date=date(2025, 7, 1), rate=Decimal('1'))
+        ExchangeRate.objects.create(base='USD', currency='TRY', date=date(2025, 7, 1), rate=Decimal('40'))
+        
+        with StubRateProvider() as provider:
+            self.assertEqual(get_exchange_rate('USD', 'TRY', '2025-07-01'), Decimal('40'))
+        
+        self.assertEqual(provider.requests, [])
+    
+    def test_repeat_conversions_are_memory_lookups(self):
+        """Test rates already loaded are served from the in-process tier"""
+        from reports.currency_converter import convert_currency, rate_tables
+        
+        with StubRateProvider():
+            convert_currency(Decimal('100'), 'TRY', 'USD', '2025-07-01')
+        
+        with self.assertNumQueries(0):
+            for _ in range(50):
+                convert_currency(Decimal('100'), 'EUR', 'TRY', '2025-07-01')
+        
+        self.assertEqual(rate_tables.hits, 50)
+        self.assertGreater(rate_tables.hit_ratio, 0.9)
+    
+    def test_shared_tier_repopulates_memory_tier(self):
+        """Test a cold process reads rates from the shared cache without DB queries"""
+        from reports.currency_converter import get_exchange_rate, rate_tables
+        
+        with StubRateProvider():
+            get_exchange_rate('EUR', 'TRY', '2025-07-01')
+        rate_tables.clear()
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(get_exchange_rate('EUR', 'TRY', '2025-07-01'), Decimal('50'))
+    
+    def test_transient_provider_error_is_retried(self):
+        """Test the pooled session retries a 503 before giving up"""
+        from reports.currency_converter import get_exchange_rate
+        
+        with StubRateProvider(statuses=[503]) as provider:
+            self.assertEqual(get_exchange_rate('EUR', 'TRY', '2025-07-01'), Decimal('50'))
+        
+        self.assertEqual(len(provider.requests), 2)
+    
+    def test_failures_are_negative_cached(self):
+        """Test a failed fetch is not repeated while the failure is cached"""
+        from reports.currency_converter import convert_currency
+        
+        with StubRateProvider(statuses=[404]) as provider:
+            self.assertIsNone(convert_currency(Decimal('100'), 'EUR', 'TRY', '2025-07-01'))
+            self.assertIsNone(convert_currency(Decimal('100'), 'EUR', 'TRY', '2025-07-01'))
+        
+        self.assertEqual(len(provider.requests), 1)
+    
+    def test_circuit_breaker_fails_fast(self):
+        """Test repeated provider errors open the circuit"""
+        from reports.currency_converter import get_exchange_rate
+        from reports.rate_providers import provider_breaker
+        
+        with StubRateProvider(statuses=[404] * 10) as provider:
+            for day in range(1, provider_breaker.failure_threshold + 3):
+                self.assertIsNone(get_exchange_rate('EUR', 'TRY', f'2025-07-{day:02d}'))
+        
+        self.assertEqual(len(provider.requests), provider_breaker.failure_threshold)
+        self.assertEqual(provider_breaker.state, provider_breaker.OPEN)
+    
+    def test_convert_many_matches_scalar_conversion(self):
+        """Test bulk conversion resolves each rate once and rounds like convert_currency"""
+        from reports.currency_converter import convert_currency, convert_many
+        
+        amounts = [Decimal('100.00'), Decimal('0.07'), Decimal('19.99'), 0, Decimal('12.34')]
+        currencies = ['EUR', 'GBP', 'EUR', 'EUR', 'XXX']
+        dates = ['2025-07-01'] * 5
+        
+        with StubRateProvider() as provider:
+            converted = convert_many(amounts, currencies, dates, 'TRY')
+            expected = [convert_currency(a, c, 'TRY', d) for a, c, d in zip(amounts, currencies, dates)]
+        
+        self.assertEqual(converted, expected)
+        self.assertEqual(converted[:4], [Decimal('5000.00'), Decimal('5.60'), Decimal('999.50'), Decimal('0.0')])
+        self.assertIsNone(converted[4])
+        self.assertEqual(len(provider.requests), 1)
+    
+    def test_summary_report_flags_unavailable_rates(self):
+        """Test the summary report reports missing rates instead of using 1.0"""
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        Transaction.objects.create(
+            user=user,
+            date=date(2025, 7, 1),
+            amount=Decimal('100.00'),
+            currency='EUR',
+            description='Satış',
+            type='credit'
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        
+        with StubRateProvider(statuses=[404]):
+            response = client.get(reverse('summary-report'), {
+                'start_date': '2025-07-01',
+                'end_date': '2025-07-31',
+                'target_currency': 'TRY'
+            })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['rate_unavailable'])
+        self.assertEqual(response.data['unavailable_currencies'], ['EUR'])
+        self.assertEqual(response.data['total_income'], 0.0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TransactionListConversionTest(TestCase):
+    """Test exchange rates for a list page are prefetched together"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from reports.currency_converter import rate_tables
+        from reports.rate_providers import provider_breaker
+        cache.clear()
+        rate_tables.clear()
+        provider_breaker.reset()
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        
+        for day in range(1, 6):
+            Transaction.objects.create(
+                user=self.user,
+                date=date(2025, 7, day),
+                amount=Decimal('100.00'),
+                currency='EUR',
+                description=f'Satış {day}',
+                type='credit'
+            )
+    
+    def test_list_fetches_page_rates_concurrently(self):
+        """Test one round of parallel fetches serves the whole page"""
+        import time
+        
+        with StubRateProvider(delay=0.3) as provider:
+            started = time.monotonic()
+            response = self.client.get(reverse('transaction-list'), {'target_currency': 'TRY'})
+            elapsed = time.monotonic() - started
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(provider.requests), 5)
+        self.assertLess(elapsed, 1.2)
+        for row in response.data['results']:
+            self.assertEqual(row['converted_amount'], 5000.0)
+            self.assertFalse(row['rate_unavailable'])
+    
+    def test_retrieve_uses_prefetched_rate(self):
+        """Test retrieving one transaction converts with its own date"""
+        transaction = Transaction.objects.get(date=date(2025, 7, 3))
+        
+        with StubRateProvider() as provider:
+            response = self.client.get(
+                reverse('transaction-detail', args=[transaction.id]),
+                {'target_currency': 'TRY'}
+            )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['converted_amount'], 5000.0)
+        self.assertEqual(provider.requests, ['/historical/USD/2025-07-03'])
+
+    
+    def test_model_serializer_converts_in_bulk(self):
+        """Test TransactionSerializer converts many rows with one batched rate lookup"""
+        from unittest import mock
+        from types import SimpleNamespace
+        from reports import currency_converter
+        from .serializers import TransactionSerializer
+        
+        request = SimpleNamespace(target_currency='TRY')
+        with StubRateProvider(), \
+                mock.patch.object(currency_converter, 'convert_many', wraps=currency_converter.convert_many) as convert_many, \
+                mock.patch.object(currency_converter, 'convert_currency') as convert_currency:
+            data = TransactionSerializer(
+                Transaction.objects.filter(user=self.user), many=True, context={'request': request}
+            ).data
+        
+        self.assertEqual(convert_many.call_count, 1)
+        convert_currency.assert_not_called()
+        self.assertEqual([row['converted_amount'] for row in data], [5000.0] * 5)
+        self.assertEqual({row['converted_currency'] for row in data}, {'TRY'})
+
+ECB_CSV = """Date,USD,JPY,TRY,GBP,
+2025-07-04,1.1750,169.50,46.90,0.8620,
+2025-07-03,1.1780,N/A,46.95,0.8630,
+2025-07-02,1.1800,170.10,47.00,0.8640,
+"""
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OfflineRateProviderTest(TestCase):
+    """Test the file-based rate provider and the rate warmer"""
+    
+    def setUp(self):
+        import tempfile
+        from django.core.cache import cache
+        from reports.currency_converter import rate_tables
+        from reports.rate_providers import load_rate_provider
+        
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        csv_file.write(ECB_CSV)
+        csv_file.close()
+        self.addCleanup(os.remove, csv_file.name)
+        
+        settings_override = override_settings(
+            EXCHANGE_RATE_PROVIDER='reports.rate_providers.CSVRateProvider',
+            EXCHANGE_RATE_CSV_PATH=csv_file.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(load_rate_provider.cache_clear)
+        load_rate_provider.cache_clear()
+        cache.clear()
+        rate_tables.clear()
+    
+    def test_converts_offline_from_csv(self):
+        """Test conversions are served from the CSV history"""
+        from reports.currency_converter import get_exchange_rate, convert_currency
+        
+        self.assertEqual(get_exchange_rate('EUR', 'TRY', '2025-07-02'), Decimal('47.00'))
+        self.assertEqual(convert_currency(Decimal('100'), 'USD', 'EUR', '2025-07-02'), Decimal('84.74'))
+        self.assertIsNone(get_exchange_rate('JPY', 'EUR', '2025-07-03'))
+    
+    def test_missing_dates_use_previous_fixing(self):
+        """Test weekends fall back to the most recent earlier rates"""
+        from reports.currency_converter import get_exchange_rate
+        
+        self.assertEqual(get_exchange_rate('EUR', 'USD', '2025-07-06'), Decimal('1.175'))
+        self.assertIsNone(get_exchange_rate('EUR', 'USD', '2025-07-01'))
+    
+    def test_warm_exchange_rates_stores_recent_days(self):
+        """Test the warmer loads the latest and recent historical tables"""
+        from unittest import mock
+        from reports.models import ExchangeRate
+        from reports.tasks import warm_exchange_rates
+        
+        with mock.patch('reports.currency_converter.timezone.now', return_value=timezone.make_aware(datetime(2025, 7, 5, 12))), \
+                mock.patch('reports.tasks.timezone.now', return_value=timezone.make_aware(datetime(2025, 7, 5, 12))):
+            warm_exchange_rates(days=3)
+        
+        self.assertEqual(
+            sorted(set(ExchangeRate.objects.filter(base='EUR').values_list('date', flat=True))),
+            [date(2025, 7, 2), date(2025, 7, 3), date(2025, 7, 4)]
+        )
+
+
+class LRUCacheTest(TestCase):
+    """Test the in-process LRU cache"""
+    
+    def test_evicts_least_recently_used(self):
+        """Test the size bound evicts the oldest untouched entry"""
+        from reports.memory_cache import LRUCache
+        
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+        self.assertEqual(lru.stats()['hits'], 3)
+        self.assertEqual(lru.stats()['misses'], 1)
+    
+    def test_ttl_expiry_and_pinning(self):
+        """Test entries expire after their TTL unless pinned"""
+        from unittest import mock
+        from reports.memory_cache import LRUCache
+        
+        lru = LRUCache(maxsize=10, ttl=60)
+        with mock.patch('reports.memory_cache.time.monotonic', return_value=1000):
+            lru.set('latest', 1)
+            lru.set('historical', 2, pin=True)
+        
+        with mock.patch('reports.memory_cache.time.monotonic', return_value=2000):
+            self.assertIsNone(lru.get('latest'))
+            self.assertEqual(lru.get('historical'), 2)
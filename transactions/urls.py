@@ -1,12 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet, upload_transactions
+from .views import TransactionViewSet, upload_transactions, rollback_import, transaction_archives, archive_rows
 
 router = DefaultRouter()
 router.register(r'', TransactionViewSet, basename='transaction')
 
 urlpatterns = [
     path('upload/', upload_transactions, name='upload-transactions'),
+    path('imports/<int:pk>/', rollback_import, name='rollback-import'),
+    path('archives/', transaction_archives, name='transaction-archives'),
+    path('archives/<int:pk>/rows/', archive_rows, name='archive-rows'),
     path('', include(router.urls)),
 ]
 
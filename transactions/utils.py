@@ -2,8 +2,31 @@ import csv
 import io
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
+from django.conf import settings
 from django.db import transaction as db_transaction
+from django.utils import timezone
+from config.db_router import mark_primary_sticky
+from config.metrics import import_stage
+from .archive import archived_until
+from .balances import apply_balance_deltas, balance_deltas
 from .models import Transaction, ImportBatch
+from .sync import record_changes
+from .versioning import bump_data_version
+
+CATEGORIES = [
+    'Sales',
+    'Rent',
+    'Salary',
+    'Utilities',
+    'Telecommunications',
+    'Software/Subscriptions',
+    'Office Supplies',
+    'Groceries',
+    'Food & Dining',
+    'Transportation',
+    'Other',
+]
+UNCATEGORIZED = 'Uncategorized'
 
 
 def categorize_transaction(description):
@@ -42,6 +65,22 @@ def categorize_transaction(description):
     return 'Other'
 
 
+def existing_transaction_hashes(hashes, chunk_size=None, dates=None):
+    chunk_size = chunk_size or settings.IMPORT_DEDUP_CHUNK_SIZE
+    hashes = list(dict.fromkeys(hashes))
+    queryset = Transaction.objects.order_by()
+    if dates:
+        queryset = queryset.filter(date__range=(min(dates), max(dates)))
+    existing = set()
+    for start in range(0, len(hashes), chunk_size):
+        existing.update(
+            queryset
+            .filter(unique_hash__in=hashes[start:start + chunk_size])
+            .values_list('unique_hash', flat=True)
+        )
+    return existing
+
+
 def process_csv_file(file, user, idempotency_key=None):
     errors = []
     imported_count = 0
@@ -52,35 +91,91 @@ def process_csv_file(file, user, idempotency_key=None):
         if existing_batch:
             return existing_batch, existing_batch.imported_rows, existing_batch.failed_rows, []
     
-    try:
-        if hasattr(file, 'seek'):
-            file.seek(0)
-        content = file.read()
-        if isinstance(content, bytes):
-            content = content.decode('utf-8-sig')
-        else:
-            content = content.encode('utf-8').decode('utf-8-sig')
-        if hasattr(file, 'seek'):
-            file.seek(0)
-    except Exception as e:
-        errors.append(f"Error reading file: {str(e)}")
-        return None, 0, 0, errors
+    with import_stage('parse'):
+        try:
+            if hasattr(file, 'seek'):
+                file.seek(0)
+            content = file.read()
+            if isinstance(content, bytes):
+                content = content.decode('utf-8-sig')
+            else:
+                content = content.encode('utf-8').decode('utf-8-sig')
+            if hasattr(file, 'seek'):
+                file.seek(0)
+        except Exception as e:
+            errors.append(f"Error reading file: {str(e)}")
+            return None, 0, 0, errors
     
-    try:
-        csv_reader = csv.DictReader(io.StringIO(content))
-        rows = list(csv_reader)
-        fieldnames = csv_reader.fieldnames
-        if fieldnames:
-            fieldnames = [field.strip().strip('\ufeff').strip() for field in fieldnames]
-            csv_reader.fieldnames = fieldnames
-    except Exception as e:
-        errors.append(f"Error parsing CSV: {str(e)}")
-        return None, 0, 0, errors
+        try:
+            csv_reader = csv.DictReader(io.StringIO(content))
+            rows = list(csv_reader)
+            fieldnames = csv_reader.fieldnames
+            if fieldnames:
+                fieldnames = [field.strip().strip('\ufeff').strip() for field in fieldnames]
+                csv_reader.fieldnames = fieldnames
+        except Exception as e:
+            errors.append(f"Error parsing CSV: {str(e)}")
+            return None, 0, 0, errors
+    
+        required_columns = ['date', 'amount', 'currency', 'description', 'type']
+        if not fieldnames or not all(col in fieldnames for col in required_columns):
+            errors.append(f"Missing required columns. Expected: {', '.join(required_columns)}. Found: {', '.join(fieldnames or [])}")
+            return None, 0, 0, errors
     
-    required_columns = ['date', 'amount', 'currency', 'description', 'type']
-    if not fieldnames or not all(col in fieldnames for col in required_columns):
-        errors.append(f"Missing required columns. Expected: {', '.join(required_columns)}. Found: {', '.join(fieldnames or [])}")
-        return None, 0, 0, errors
+        archived_through = archived_until(user.id)
+        transactions_to_create = []
+        
+        for row_num, row in enumerate(rows, start=2):
+            try:
+                row = {k.strip().strip('\ufeff').strip(): v for k, v in row.items() if k}
+                try:
+                    date = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+                except ValueError:
+                    errors.append(f"Row {row_num}: Invalid date format. Expected YYYY-MM-DD")
+                    failed_count += 1
+                    continue
+            
+                if archived_through and date <= archived_through:
+                    errors.append(f"Row {row_num}: Date falls in an archived period (until {archived_through})")
+                    failed_count += 1
+                    continue
+            
+                try:
+                    amount = Decimal(str(row['amount']).strip())
+                except (InvalidOperation, ValueError):
+                    errors.append(f"Row {row_num}: Invalid amount format")
+                    failed_count += 1
+                    continue
+            
+                transaction_type = row['type'].strip().lower()
+                if transaction_type not in ['credit', 'debit']:
+                    errors.append(f"Row {row_num}: Invalid type. Must be 'credit' or 'debit'")
+                    failed_count += 1
+                    continue
+            
+                currency = row['currency'].strip().upper()
+                description = row['description'].strip()
+            
+                unique_hash = Transaction.generate_unique_hash(
+                    user.id, str(date), str(amount), description, transaction_type
+                )
+            
+                transaction = Transaction(
+                    user=user,
+                    date=date,
+                    amount=abs(amount),
+                    currency=currency,
+                    description=description,
+                    type=transaction_type,
+                    category=categorize_transaction(description),
+                    unique_hash=unique_hash
+                )
+                transactions_to_create.append(transaction)
+            
+            except Exception as e:
+                errors.append(f"Row {row_num}: {str(e)}")
+                failed_count += 1
+                continue
     
     batch = ImportBatch.objects.create(
         user=user,
@@ -88,72 +183,47 @@ def process_csv_file(file, user, idempotency_key=None):
         total_rows=len(rows),
         idempotency_key=idempotency_key
     )
+    for transaction in transactions_to_create:
+        transaction.import_batch = batch
     
     try:
         with db_transaction.atomic():
-            transactions_to_create = []
-            
-            for row_num, row in enumerate(rows, start=2):
-                try:
-                    row = {k.strip().strip('\ufeff').strip(): v for k, v in row.items() if k}
-                    try:
-                        date = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
-                    except ValueError:
-                        errors.append(f"Row {row_num}: Invalid date format. Expected YYYY-MM-DD")
-                        failed_count += 1
-                        continue
-                    
-                    try:
-                        amount = Decimal(str(row['amount']).strip())
-                    except (InvalidOperation, ValueError):
-                        errors.append(f"Row {row_num}: Invalid amount format")
-                        failed_count += 1
-                        continue
-                    
-                    transaction_type = row['type'].strip().lower()
-                    if transaction_type not in ['credit', 'debit']:
-                        errors.append(f"Row {row_num}: Invalid type. Must be 'credit' or 'debit'")
+            with import_stage('dedup'):
+                seen_hashes = existing_transaction_hashes(
+                    [transaction.unique_hash for transaction in transactions_to_create],
+                    dates=[transaction.date for transaction in transactions_to_create]
+                )
+                unique_transactions = []
+                for transaction in transactions_to_create:
+                    if transaction.unique_hash in seen_hashes:
                         failed_count += 1
                         continue
-                    
-                    currency = row['currency'].strip().upper()
-                    description = row['description'].strip()
-                    
-                    unique_hash = Transaction.generate_unique_hash(
-                        user.id, str(date), str(amount),                         description, transaction_type
-                    )
-                    
-                    if Transaction.objects.filter(unique_hash=unique_hash).exists():
-                        failed_count += 1
-                        continue
-                    
-                    category = categorize_transaction(description)
-                    
-                    transaction = Transaction(
-                        user=user,
-                        date=date,
-                        amount=abs(amount),
-                        currency=currency,
-                        description=description,
-                        type=transaction_type,
-                        category=category,
-                        unique_hash=unique_hash,
-                        import_batch=batch
-                    )
-                    transactions_to_create.append(transaction)
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
-                    failed_count += 1
-                    continue
+                    seen_hashes.add(transaction.unique_hash)
+                    unique_transactions.append(transaction)
+                transactions_to_create = unique_transactions
+                imported_count = len(transactions_to_create)
             
             if transactions_to_create:
-                Transaction.objects.bulk_create(transactions_to_create, ignore_conflicts=True)
+                with import_stage('insert'):
+                    Transaction.objects.bulk_create(transactions_to_create, ignore_conflicts=True)
+                    # ignore_conflicts drops rows another import wrote first, so
+                    # only rows that landed in this batch are recorded.
+                    inserted = list(
+                        Transaction.objects
+                        .filter(import_batch=batch)
+                        .order_by()
+                        .values_list('id', 'currency', 'date', 'type', 'amount')
+                    )
+                    record_changes(user.id, [row[0] for row in inserted], 'create')
+                    apply_balance_deltas(user.id, balance_deltas(row[1:] for row in inserted))
+                    failed_count += imported_count - len(inserted)
+                    imported_count = len(inserted)
+                db_transaction.on_commit(lambda: bump_data_version(user.id))
             
             batch.imported_rows = imported_count
             batch.failed_rows = failed_count
             batch.save()
+            db_transaction.on_commit(lambda: mark_primary_sticky(user.id))
             
     except Exception as e:
         errors.append(f"Error during import: {str(e)}")
@@ -162,4 +232,31 @@ def process_csv_file(file, user, idempotency_key=None):
     return batch, imported_count, failed_count, errors
 
 
+def rollback_import_batch(batch, chunk_size=None):
+    chunk_size = chunk_size or settings.IMPORT_ROLLBACK_CHUNK_SIZE
+    deleted_count = 0
+
+    while True:
+        with db_transaction.atomic():
+            rows = list(
+                Transaction.objects
+                .filter(import_batch=batch)
+                .values_list('id', 'currency', 'date', 'type', 'amount')[:chunk_size]
+            )
+            if not rows:
+                break
+            transaction_ids = [row[0] for row in rows]
+            Transaction.objects.filter(id__in=transaction_ids).delete()
+            record_changes(batch.user_id, transaction_ids, 'delete')
+            apply_balance_deltas(batch.user_id, balance_deltas(
+                (currency, day, transaction_type, -amount) for _, currency, day, transaction_type, amount in rows
+            ))
+        deleted_count += len(transaction_ids)
+        bump_data_version(batch.user_id)
 
+    batch.rolled_back_at = timezone.now()
+    batch.rolled_back_rows += deleted_count
+    batch.idempotency_key = None
+    batch.save(update_fields=['rolled_back_at', 'rolled_back_rows', 'idempotency_key'])
+    bump_data_version(batch.user_id)
+    return deleted_count
@@ -0,0 +1,79 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import cache
+from config.db_router import mark_primary_sticky
+
+
+def _data_version_key(user_id):
+    return f'transaction_data_version_{user_id}'
+
+
+def get_data_version(user_id):
+    cache_key = _data_version_key(user_id)
+    try:
+        version = cache.get(cache_key)
+        if version is None:
+            cache.add(cache_key, time.time_ns(), None)
+            version = cache.get(cache_key)
+        return version
+    except Exception:
+        return None
+
+
+def _whole_seconds(version):
+    return -(-version // 1_000_000_000)
+
+
+def bump_data_version(user_id):
+    # Reads right after a change must not cache replica data under the new version.
+    mark_primary_sticky(user_id)
+    cache_key = _data_version_key(user_id)
+    try:
+        version = time.time_ns()
+        previous = cache.get(cache_key)
+        if previous is not None and _whole_seconds(version) <= _whole_seconds(previous):
+            # Last-Modified has one-second resolution, so a bump within the same
+            # second must still move it forward or If-Modified-Since would match.
+            version = _whole_seconds(previous) * 1_000_000_000 + 1
+        cache.set(cache_key, version, None)
+    except Exception:
+        pass
+
+
+def _rate_window(request):
+    if not request.GET.get('target_currency', '').strip():
+        return None
+    window = min(settings.EXCHANGE_RATE_LATEST_TTL, settings.EXCHANGE_RATE_NEGATIVE_TTL)
+    return int(time.time() // window) * window
+
+
+def data_version_etag(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    version = get_data_version(request.user.id)
+    if version is None:
+        return None
+    variant = '|'.join([
+        str(request.user.id),
+        str(version),
+        str(_rate_window(request)),
+        request.path,
+        request.GET.urlencode(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return hashlib.sha1(variant.encode()).hexdigest()
+
+
+def data_version_last_modified(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    version = get_data_version(request.user.id)
+    if version is None:
+        return None
+    modified = _whole_seconds(version)
+    rate_window = _rate_window(request)
+    if rate_window is not None:
+        modified = max(modified, rate_window)
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
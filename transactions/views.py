@@ -1,27 +1,94 @@
-from rest_framework import status, viewsets, filters
-from rest_framework.decorators import api_view, permission_classes
+import csv
+import logging
+from datetime import datetime
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.conf import settings
-from .models import Transaction, ImportBatch
-from .serializers import TransactionSerializer, ImportBatchSerializer
-from .utils import process_csv_file
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from config.db_router import replica_reads
+from config.throttling import ReportRateThrottle, UploadRateThrottle
+from .archive import iter_archive_rows
+from .balances import HISTORY_INTERVALS, balance_history, balances_at, running_balances
+from .facets import get_transaction_facets
+from .models import Transaction, ImportBatch, TransactionArchive
+from .pagination import TransactionCursorPagination
+from .renderers import ORJSONRenderer
+from .serializers import (
+    CENT,
+    TransactionSerializer,
+    ImportBatchSerializer,
+    TransactionArchiveSerializer,
+    convert_transaction_rows,
+    parse_requested_fields,
+    serialize_transaction_rows,
+    transaction_row,
+    transaction_value_fields,
+)
+from .search import TransactionSearchFilter, TransactionOrderingFilter
+from .sync import decode_sync_token, encode_sync_token, get_changes
+from .utils import CATEGORIES, UNCATEGORIZED, process_csv_file, rollback_import_batch
+from .versioning import data_version_etag, data_version_last_modified
 from reports.currency_converter import get_supported_currencies
 
+logger = logging.getLogger(__name__)
+
+
+def _balance_value(value):
+    return str(value.quantize(CENT))
+
+
+def _balance_dates(request, default_start):
+    try:
+        end_date = request.query_params.get('end_date')
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else timezone.now().date()
+        start_date = request.query_params.get('start_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else default_start(end_date)
+    except ValueError:
+        return None, None, Response(
+            {'error': 'Invalid date format. Use YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if start_date > end_date:
+        return None, None, Response(
+            {'error': 'start_date must be before or equal to end_date'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return start_date, end_date, None
+
+
+def _balance_currency(request):
+    currency = request.query_params.get('currency', '').upper().strip()
+    if not currency:
+        return None, Response(
+            {'error': 'currency is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return currency, None
+
 
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TransactionSearchFilter, TransactionOrderingFilter]
     filterset_fields = ['type', 'currency']
     search_fields = ['description']
     ordering_fields = ['date', 'amount', 'created_at']
-    ordering = ['-date']
+    ordering = ['-date', '-created_at', '-id']
+    pagination_class = TransactionCursorPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
     
     @swagger_auto_schema(
         manual_parameters=[
@@ -48,8 +115,24 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
                 required=False,
                 description='Filter transactions until this date (YYYY-MM-DD)'
             ),
+            openapi.Parameter(
+                'include_count',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description='Include an approximate total count of matching transactions'
+            ),
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Comma-separated fields to return (e.g., id,date,amount,currency)'
+            ),
         ]
     )
+    @method_decorator(condition(etag_func=data_version_etag, last_modified_func=data_version_last_modified))
+    @method_decorator(replica_reads)
     def list(self, request, *args, **kwargs):
         target_currency = request.query_params.get('target_currency', '').upper().strip()
         if target_currency:
@@ -59,7 +142,18 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             request.target_currency = target_currency
-        return super().list(request, *args, **kwargs)
+        
+        fields = parse_requested_fields(request.query_params.get('fields'))
+        queryset = self.filter_queryset(self.get_queryset())
+        extra_fields = ['search_rank'] if 'search_rank' in queryset.query.annotations else []
+        queryset = queryset.values(*transaction_value_fields(fields, extra_fields))
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        data = self.serialize_rows(rows, fields)
+        
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
     
     @swagger_auto_schema(
         manual_parameters=[
@@ -70,8 +164,16 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
                 required=False,
                 description='Target currency code for conversion (e.g., USD, EUR, TRY). If provided, amounts will be converted to this currency.'
             ),
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Comma-separated fields to return (e.g., id,date,amount,currency)'
+            ),
         ]
     )
+    @method_decorator(replica_reads)
     def retrieve(self, request, *args, **kwargs):
         target_currency = request.query_params.get('target_currency', '').upper().strip()
         if target_currency:
@@ -81,7 +183,273 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             request.target_currency = target_currency
-        return super().retrieve(request, *args, **kwargs)
+        
+        fields = parse_requested_fields(request.query_params.get('fields'))
+        rows = [transaction_row(self.get_object())]
+        return Response(self.serialize_rows(rows, fields)[0])
+
+    @swagger_auto_schema(
+        operation_description='Counts and per-currency totals by type, currency, category and month for the current filters',
+        manual_parameters=[
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Filter transactions from this date (YYYY-MM-DD)'
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Filter transactions until this date (YYYY-MM-DD)'
+            ),
+            openapi.Parameter(
+                'category',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Filter by category'
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    @method_decorator(condition(etag_func=data_version_etag, last_modified_func=data_version_last_modified))
+    @method_decorator(replica_reads)
+    def facets(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(get_transaction_facets(queryset, request.user.id, request.query_params))
+
+    @swagger_auto_schema(
+        operation_description='Balance per currency at the end of a day, from the nearest month-end checkpoint',
+        manual_parameters=[
+            openapi.Parameter(
+                'date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Balance date (YYYY-MM-DD). Defaults to today.'
+            ),
+            openapi.Parameter(
+                'currency',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Only return this currency'
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    @method_decorator(condition(etag_func=data_version_etag, last_modified_func=data_version_last_modified))
+    @method_decorator(replica_reads)
+    def balances(self, request):
+        try:
+            day = request.query_params.get('date')
+            day = datetime.strptime(day, '%Y-%m-%d').date() if day else timezone.now().date()
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        currency = request.query_params.get('currency', '').upper().strip()
+        balances = balances_at(request.user.id, day, [currency] if currency else None)
+        return Response({
+            'date': day.isoformat(),
+            'balances': [
+                {'currency': code, 'balance': _balance_value(balance)}
+                for code, balance in sorted(balances.items())
+            ],
+        })
+
+    @swagger_auto_schema(
+        operation_description='Transactions in one currency with the running balance after each of them',
+        manual_parameters=[
+            openapi.Parameter(
+                'currency',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description='Currency code (e.g., TRY)'
+            ),
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='First day (YYYY-MM-DD). Defaults to the first day of the end_date month.'
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Last day (YYYY-MM-DD). Defaults to today.'
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None, url_path='running-balance')
+    @method_decorator(condition(etag_func=data_version_etag, last_modified_func=data_version_last_modified))
+    @method_decorator(replica_reads)
+    def running_balance(self, request):
+        currency, error = _balance_currency(request)
+        if error:
+            return error
+        start_date, end_date, error = _balance_dates(request, lambda end_date: end_date.replace(day=1))
+        if error:
+            return error
+        
+        opening, rows = running_balances(request.user.id, currency, start_date, end_date)
+        return Response({
+            'currency': currency,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'opening_balance': _balance_value(opening),
+            'closing_balance': _balance_value(rows[-1]['balance'] if rows else opening),
+            'results': [
+                {
+                    'id': row['id'],
+                    'date': row['date'].isoformat(),
+                    'amount': _balance_value(row['amount']),
+                    'type': row['type'],
+                    'description': row['description'],
+                    'category': row['category'],
+                    'balance': _balance_value(row['balance']),
+                }
+                for row in rows
+            ],
+        })
+
+    @swagger_auto_schema(
+        operation_description='Balance over time in one currency, per month-end or per day with activity',
+        manual_parameters=[
+            openapi.Parameter(
+                'currency',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description='Currency code (e.g., TRY)'
+            ),
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='First day (YYYY-MM-DD). Defaults to one year before end_date.'
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Last day (YYYY-MM-DD). Defaults to today.'
+            ),
+            openapi.Parameter(
+                'interval',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='month (default) or day'
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None, url_path='balance-history')
+    @method_decorator(condition(etag_func=data_version_etag, last_modified_func=data_version_last_modified))
+    @method_decorator(replica_reads)
+    def balance_history(self, request):
+        currency, error = _balance_currency(request)
+        if error:
+            return error
+        start_date, end_date, error = _balance_dates(
+            request, lambda end_date: end_date.replace(year=end_date.year - 1, day=1)
+        )
+        if error:
+            return error
+        
+        interval = request.query_params.get('interval', 'month').strip().lower()
+        if interval not in HISTORY_INTERVALS:
+            return Response(
+                {'error': f'Unknown interval: {interval}. Use one of {", ".join(HISTORY_INTERVALS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        opening, points = balance_history(request.user.id, currency, start_date, end_date, interval)
+        return Response({
+            'currency': currency,
+            'interval': interval,
+            'opening_balance': _balance_value(opening),
+            'points': [{'date': day.isoformat(), 'balance': _balance_value(balance)} for day, balance in points],
+        })
+
+    @swagger_auto_schema(
+        operation_description='Transactions created, updated or deleted since a sync token',
+        manual_parameters=[
+            openapi.Parameter(
+                'since',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Sync token from a previous response. Omit for a full initial sync.'
+            ),
+            openapi.Parameter(
+                'limit',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description='Maximum number of changes to return'
+            ),
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Comma-separated fields to return (e.g., id,date,amount,currency)'
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def changes(self, request):
+        target_currency = request.query_params.get('target_currency', '').upper().strip()
+        if target_currency:
+            if target_currency not in get_supported_currencies():
+                return Response(
+                    {'error': f'Unsupported currency: {target_currency}. Supported currencies: {", ".join(get_supported_currencies())}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            request.target_currency = target_currency
+        
+        try:
+            limit = int(request.query_params.get('limit', settings.TRANSACTION_SYNC_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.TRANSACTION_SYNC_MAX_PAGE_SIZE))
+        
+        fields = parse_requested_fields(request.query_params.get('fields'))
+        since = decode_sync_token(request.query_params.get('since'))
+        upserted_ids, deleted_ids, next_seq, has_more = get_changes(request.user, since, limit)
+        
+        rows = list(
+            Transaction.objects
+            .filter(user=request.user, id__in=upserted_ids)
+            .order_by('id')
+            .values(*transaction_value_fields(fields))
+        )
+        missing_ids = set(upserted_ids) - {row['id'] for row in rows}
+        
+        return Response({
+            'upserted': self.serialize_rows(rows, fields),
+            'deleted': sorted(set(deleted_ids) | missing_ids),
+            'since': encode_sync_token(next_seq),
+            'has_more': has_more,
+        })
 
     def get_queryset(self):
         queryset = Transaction.objects.filter(user=self.request.user)
@@ -96,7 +464,13 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
         
         category = self.request.query_params.get('category', '').strip()
         if category:
-            queryset = queryset.filter(category__icontains=category)
+            matching_categories = [name for name in CATEGORIES if category.lower() in name.lower()]
+            if category.lower() == UNCATEGORIZED.lower():
+                queryset = queryset.filter(Q(category__isnull=True) | Q(category=''))
+            elif matching_categories:
+                queryset = queryset.filter(category__in=matching_categories)
+            else:
+                queryset = queryset.filter(category__icontains=category)
         
         target_currency = self.request.query_params.get('target_currency', '').upper().strip()
         if target_currency:
@@ -107,14 +481,15 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
     
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['request'] = self.request
-        return context
+    def serialize_rows(self, rows, fields):
+        target_currency = getattr(self.request, 'target_currency', None)
+        converted_amounts = convert_transaction_rows(rows, fields, target_currency)
+        return serialize_transaction_rows(rows, fields, target_currency, converted_amounts)
 
 
 class UploadTransactionsView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [UploadRateThrottle]
     parser_classes = [MultiPartParser, FormParser]
     
     @swagger_auto_schema(
@@ -164,7 +539,7 @@ class UploadTransactionsView(APIView):
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
-            print(f"Error processing CSV: {error_trace}")
+            logger.error("Error processing CSV: %s", error_trace)
             error_message = f'Dosya işlenirken hata oluştu: {str(e)}'
             if settings.DEBUG:
                 error_message += f' | Detay: {error_trace[:200]}'
@@ -203,5 +578,124 @@ class UploadTransactionsView(APIView):
         return Response(response_data, status=status_code)
 
 
+class ImportBatchRollbackView(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [UploadRateThrottle]
+    
+    @swagger_auto_schema(
+        operation_description='Delete every transaction imported by a batch and record the rollback on the batch',
+        responses={
+            200: ImportBatchSerializer,
+            404: 'Not Found',
+        }
+    )
+    def delete(self, request, pk):
+        batch = ImportBatch.objects.filter(pk=pk, user=request.user).first()
+        if batch is None:
+            return Response(
+                {'error': 'Import batch not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        deleted_count = rollback_import_batch(batch)
+        
+        return Response({
+            'batch': ImportBatchSerializer(batch).data,
+            'deleted_count': deleted_count,
+        }, status=status.HTTP_200_OK)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+ARCHIVE_EXPORT_FIELDS = ['id', 'date', 'amount', 'currency', 'description', 'type', 'category', 'created_at']
+
+
+def _export_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class TransactionArchiveListView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    @swagger_auto_schema(
+        operation_description='Archived periods of transaction history. Summary reports keep covering them through daily rollups.',
+        responses={200: TransactionArchiveSerializer(many=True)}
+    )
+    def get(self, request):
+        archives = TransactionArchive.objects.filter(user=request.user)
+        return Response(TransactionArchiveSerializer(archives, many=True).data)
+
+
+class TransactionArchiveRowsView(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ReportRateThrottle]
+    
+    @swagger_auto_schema(
+        operation_description='Stream the transactions stored in an archive as CSV',
+        manual_parameters=[
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Only rows from this date (YYYY-MM-DD)'
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=False,
+                description='Only rows until this date (YYYY-MM-DD)'
+            ),
+        ],
+        responses={
+            200: 'CSV stream',
+            400: 'Bad Request',
+            404: 'Not Found',
+        }
+    )
+    def get(self, request, pk):
+        archive = TransactionArchive.objects.filter(pk=pk, user=request.user, restored_at__isnull=True).first()
+        if archive is None:
+            return Response(
+                {'error': 'Archive not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            start_date = request.query_params.get('start_date')
+            end_date = request.query_params.get('end_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        writer = csv.writer(Echo())
+        
+        def stream():
+            yield writer.writerow(ARCHIVE_EXPORT_FIELDS)
+            for row in iter_archive_rows(archive, start_date, end_date):
+                yield writer.writerow([_export_value(row[field]) for field in ARCHIVE_EXPORT_FIELDS])
+        
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="transactions-archive-{archive.id}.csv"'
+        return response
+
+
 upload_transactions = UploadTransactionsView.as_view()
+rollback_import = ImportBatchRollbackView.as_view()
+transaction_archives = TransactionArchiveListView.as_view()
+archive_rows = TransactionArchiveRowsView.as_view()
 